@@ -0,0 +1,91 @@
+'''
+Concurrency benchmark of async handlers: many concurrent requests to a resource whose backend takes a while
+to answer (simulated with a sleep), served by the ASGI application (flask_rest.utils.asgi) with a synchronous
+handler (run in the ASGI application's thread pool, like a threaded WSGI server) and with an async handler
+(awaited on the event loop).
+
+The ASGI application is called directly, without a server or sockets. Run from the repository root:
+
+	python benchmarks/async_benchmark.py [concurrent_requests] [backend_latency_ms]
+'''
+
+import asyncio, os, sys, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask_rest import app
+from flask_rest.utils.asgi import ASGIApp
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+
+BACKEND_LATENCY = 0.05
+
+class FakeSlowBackend(object):
+
+	'''
+	A backend (e.g. database) that takes BACKEND_LATENCY seconds per query, with blocking and asyncio clients.
+	'''
+
+	def query(self, obj_id):
+		time.sleep(BACKEND_LATENCY)
+		return {'example_obj_id': obj_id}
+
+	async def query_async(self, obj_id):
+		await asyncio.sleep(BACKEND_LATENCY)
+		return {'example_obj_id': obj_id}
+
+backend = FakeSlowBackend()
+
+class SyncSlowHandler(RESTView):
+
+	share_handler_instance = True
+	auto_etag = False
+
+	def __init__(self):
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, obj_id=None):
+		return ('ALL_OK', backend.query(obj_id))
+
+class AsyncSlowHandler(SyncSlowHandler):
+
+	async def get(self, auth_data_obj, obj_id=None):
+		return ('ALL_OK', await backend.query_async(obj_id))
+
+async def call(application, path):
+	# Sends a GET request to the ASGI application, returns the response status code
+	scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'scheme': 'http', 'path': path, 'root_path': '',
+			'query_string': b'', 'headers': [(b'host', b'localhost')], 'server': ('localhost', 80), 'client': ('127.0.0.1', 1234)}
+	messages = []
+	async def receive():
+		return {'type': 'http.request', 'body': b'', 'more_body': False}
+	async def send(message):
+		messages.append(message)
+	await application(scope, receive, send)
+	return messages[0]['status']
+
+async def run_case(application, path, concurrent_requests):
+	start = time.time()
+	statuses = await asyncio.gather(*[call(application, '%s%d' % (path, i)) for i in range(concurrent_requests)])
+	elapsed = time.time() - start
+	assert statuses == [200] * concurrent_requests, set(statuses)
+	return elapsed
+
+def run(concurrent_requests, max_threads=32):
+	app.debug = False
+	app.add_url_rule('/bench/sync/<int:obj_id>', view_func=SyncSlowHandler.as_view('bench_sync'), methods=['GET'])
+	app.add_url_rule('/bench/async/<int:obj_id>', view_func=AsyncSlowHandler.as_view('bench_async'), methods=['GET'])
+	application = ASGIApp(app, max_threads=max_threads)
+
+	print('%d concurrent requests, %d ms backend latency, %d threads for sync handlers' % (concurrent_requests, BACKEND_LATENCY * 1000, max_threads))
+	print('%-15s %10s %10s' % ('handler', 'seconds', 'req/s'))
+	for case_name, path in (('sync', '/bench/sync/'), ('async', '/bench/async/')):
+		elapsed = asyncio.run(run_case(application, path, concurrent_requests))
+		print('%-15s %10.2f %10.0f' % (case_name, elapsed, concurrent_requests / elapsed))
+
+if __name__ == '__main__':
+	if len(sys.argv) > 2:
+		BACKEND_LATENCY = int(sys.argv[2]) / 1000.0
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
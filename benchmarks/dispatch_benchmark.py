@@ -0,0 +1,100 @@
+'''
+Micro-benchmark of RESTView.dispatch_request: the precompiled per-method dispatch plans compared with the
+original dispatcher (per-request handler instance, method/auth/throttle lookups on every request). The plans save
+those lookups, but RESTView now also does work the original dispatcher never did (IP access lists, schema
+validation, conditional requests, response caching, admission control, metrics), so the plan timings are not
+lower overall: a "speedup" below 1x is the cost of those features, not a regression of the plans themselves.
+
+The view functions are called directly inside a pushed request context, so URL routing and the WSGI layer
+are not included in the timings. Run from the repository root:
+
+	python benchmarks/dispatch_benchmark.py [iterations]
+'''
+
+import os, sys, time, timeit
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import request
+from flask_rest import app
+from flask_rest.utils.http_utils import rf
+from flask_rest.utils.restview import RequestContext
+from flask_rest.utils.throttle import example_rate_limit_throttle
+from flask_rest.example_api_v2.example_handler import ExampleHandler
+
+class LegacyDispatchHandler(ExampleHandler):
+
+	'''
+	ExampleHandler with the dispatcher as it was before dispatch plans were compiled (kept here for reference).
+	'''
+
+	def dispatch_request(self, *args, **kwargs):
+		try:
+			processing_start = time.time()
+			extra_request_info = {}
+			log_request = lambda response_name: self._RESTView__log_request(RequestContext(request_method, processing_start), response_name)
+
+			request_method = request.method.upper()
+			if request_method not in (self.allowed_methods + ('OPTIONS', 'HEAD')):
+				log_request('NOT_ALLOWED')
+				headers = {'Allow': sorted(request.url_rule.methods)}
+				return rf.get_response('NOT_ALLOWED', None, headers)
+
+			handler_method = getattr(self, request_method.lower(), None)
+			if handler_method is None:
+				log_request('NOT_IMPLEMENTED')
+				return rf.get_response('NOT_IMPLEMENTED')
+
+			authenticator = self.auth_methods.get(request_method, self.auth_methods['ALL'])
+			is_authorized, auth_data_obj = authenticator.is_authenticated()
+			extra_request_info['auth_data_obj'] = auth_data_obj
+			if not is_authorized:
+				log_request('UNAUTHORIZED')
+				return authenticator.get_challenge()
+
+			method_throttle_options = self.throttle_options.get(request_method, self.throttle_options['ALL'])
+			throttler, throttle_override = method_throttle_options
+			is_throttled, throttle_headers = throttler.check(self.__class__.__name__, request_method, throttle_override, auth_data_obj)
+			if is_throttled:
+				log_request('THROTTLED')
+				return rf.get_response('THROTTLED', None, throttle_headers)
+
+			try:
+				handler_return = handler_method(auth_data_obj, *args, **kwargs)
+			except:
+				log_request('INTERNAL_ERROR')
+				return rf.get_response('INTERNAL_ERROR')
+
+			response_name, response_data = handler_return[:2]
+			if response_name == 'UNAUTHORIZED' and response_data is None:
+				log_request('UNAUTHORIZED')
+				return authenticator.get_challenge()
+
+			response_headers = dict(throttle_headers)
+			if len(handler_return) == 3:
+				response_headers.update(handler_return[2])
+			response = rf.get_response(response_name, response_data, response_headers)
+			log_request(response_name)
+			return response
+		except:
+			return rf.get_response('INTERNAL_ERROR')
+
+def run(iterations):
+	app.debug = False
+	example_rate_limit_throttle.throttle_enabled = False # Measure dispatching, not a client being rate limited
+	compiled_view = ExampleHandler.as_view('bench_compiled')
+	legacy_view = lambda **kwargs: LegacyDispatchHandler().dispatch_request(**kwargs) # One instance per request, as before
+
+	cases = [('GET /v2/rest_example/3', '/v2/rest_example/3', 'GET', {'example_resource_id': 3}),
+			('OPTIONS /v2/rest_example/3', '/v2/rest_example/3', 'OPTIONS', {'example_resource_id': 3}),
+			('POST /v2/rest_example/ (unauthorized)', '/v2/rest_example/', 'POST', {})]
+	print('%-40s %14s %14s %9s' % ('case', 'legacy us/req', 'plan us/req', 'speedup'))
+	for case_name, url, method, view_args in cases:
+		with app.test_request_context(url, method=method, headers={'Authorization': 'ExampleAuth not-so-random-access-key-qwerty'} if method == 'OPTIONS' else {}):
+			timings = []
+			for view in (legacy_view, compiled_view):
+				view(**view_args) # Warm up
+				timings.append(min(timeit.repeat(lambda: view(**view_args), number=iterations, repeat=5)) / iterations * 1e6)
+		print('%-40s %14.2f %14.2f %8.2fx' % (case_name, timings[0], timings[1], timings[0] / timings[1]))
+
+if __name__ == '__main__':
+	run(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
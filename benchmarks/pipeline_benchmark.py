@@ -0,0 +1,214 @@
+'''
+Load test and regression benchmark of the full request pipeline (routing, RESTView, authentication, throttling,
+ResponseFactory), driving the real flask_rest.app:
+
+	client: through the Flask (WSGI) test client, in this process; also measures the peak memory allocated
+	        per request (with tracemalloc)
+	server: through a local multi-worker HTTP server (Werkzeug, one process per worker sharing the listening
+	        socket), loaded by several client processes over keep-alive connections
+
+For every case, the throughput (requests per second), the p50/p99 latencies and (client mode) the allocations per
+request are reported and compared with a stored baseline; the exit status is 1 if any metric regressed by more
+than the tolerance, so changes can be gated on it. Baselines are machine specific, so none is in the repository:
+create one on the machine the comparisons run on (e.g. a CI job running the base branch with --save-baseline);
+without a baseline, the results are only reported. Run from the repository root:
+
+	python benchmarks/pipeline_benchmark.py [--mode client|server|all] [--duration seconds] [--workers n]
+		[--clients n] [--baseline path] [--save-baseline] [--tolerance fraction] [--response-cache]
+
+The per-client rate limit of the v2 example resource is turned off, so its requests are not throttled, and so
+are the response caches (unless --response-cache is given, which needs the shared cache of FLASK_REST_REDIS_URL,
+see flask_rest.utils.response_cache), so every request runs its handler and serializer.
+'''
+
+import argparse, http.client, json, logging, multiprocessing, os, socket, sys, time, tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask_rest import app
+from flask_rest.utils.router import load_handlers
+from flask_rest.utils.throttle import example_rate_limit_throttle
+
+AUTH_HEADERS = {'Authorization': 'ExampleAuth not-so-random-access-key-qwerty'}
+
+CASES = [('ping', 'GET', '/ping', {}, 200), # (<name>, <method>, <path>, <headers>, <expected status>)
+		('v1 GET', 'GET', '/v1/rest_example/', {}, 200),
+		('v2 GET single', 'GET', '/v2/rest_example/3', {}, 200),
+		('v2 GET range 10', 'GET', '/v2/rest_example/1;11', {}, 200),
+		('v2 GET range 100', 'GET', '/v2/rest_example/1;101', {}, 200),
+		('v2 GET range 1000', 'GET', '/v2/rest_example/1;1001', {}, 200),
+		('v2 POST auth', 'POST', '/v2/rest_example/', AUTH_HEADERS, 201),
+		('v2 HEAD', 'HEAD', '/v2/rest_example/3', AUTH_HEADERS, 200),
+		('v2 OPTIONS', 'OPTIONS', '/v2/rest_example/3', AUTH_HEADERS, 200)]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pipeline_baseline.json')
+
+def disable_response_caches():
+	load_handlers()
+	for view_func in app.view_functions.values():
+		handler_config = getattr(getattr(view_func, 'view_class', None), 'handler_config', None)
+		if handler_config is not None:
+			for plan in handler_config.dispatch_plans.values():
+				plan.response_cache = None
+
+def get_percentile(sorted_latencies, fraction):
+	return sorted_latencies[min(len(sorted_latencies) - 1, int(len(sorted_latencies) * fraction))]
+
+def summarize(latencies, elapsed):
+	latencies = sorted(latencies)
+	return {'throughput': len(latencies) / elapsed, 'p50_ms': get_percentile(latencies, 0.5) * 1000, 'p99_ms': get_percentile(latencies, 0.99) * 1000}
+
+def run_client_case(client, method, path, headers, expected_status, duration):
+	request = lambda: client.open(path, method=method, headers=headers, buffered=True) # Streamed bodies are generated too
+	response = request()
+	assert response.status_code == expected_status, (path, response.status)
+	for i in range(50): # Warm up
+		request().close()
+
+	latencies = []
+	start = time.perf_counter()
+	end = start + duration
+	now = start
+	while now < end:
+		request().close()
+		finished = time.perf_counter()
+		latencies.append(finished - now)
+		now = finished
+	results = summarize(latencies, now - start)
+
+	# Peak memory allocated while handling a request, measured separately (tracemalloc slows everything down)
+	tracemalloc.start()
+	peaks = []
+	for i in range(200):
+		current = tracemalloc.get_traced_memory()[0]
+		tracemalloc.reset_peak()
+		request().close()
+		peaks.append(tracemalloc.get_traced_memory()[1] - current)
+	tracemalloc.stop()
+	results['alloc_kib'] = sum(peaks) / len(peaks) / 1024.0
+	return results
+
+def serve(listening_socket):
+	# Worker process of the local server
+	from werkzeug.serving import make_server, WSGIRequestHandler
+	WSGIRequestHandler.protocol_version = 'HTTP/1.1' # Keep-alive connections
+	logging.getLogger('werkzeug').setLevel(logging.ERROR)
+	host, port = listening_socket.getsockname()
+	make_server(host, port, app, threaded=True, fd=listening_socket.fileno()).serve_forever()
+
+def load(port, method, path, headers, duration):
+	# Client process: sends requests one after another on a keep-alive connection, returns the latencies
+	connection = http.client.HTTPConnection('127.0.0.1', port)
+	latencies = []
+	now = time.perf_counter()
+	end = now + duration
+	while now < end:
+		connection.request(method, path, headers=headers)
+		connection.getresponse().read()
+		finished = time.perf_counter()
+		latencies.append(finished - now)
+		now = finished
+	connection.close()
+	return latencies
+
+def run_server_cases(duration, workers, clients):
+	context = multiprocessing.get_context('fork')
+	listening_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	listening_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+	listening_socket.bind(('127.0.0.1', 0))
+	listening_socket.listen(1024)
+	port = listening_socket.getsockname()[1]
+	servers = [context.Process(target=serve, args=(listening_socket,)) for i in range(workers)]
+	for server in servers:
+		server.daemon = True
+		server.start()
+
+	results = {}
+	try:
+		with context.Pool(clients) as pool:
+			for name, method, path, headers, expected_status in CASES:
+				connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+				connection.request(method, path, headers=headers)
+				response = connection.getresponse()
+				response.read()
+				connection.close()
+				assert response.status == expected_status, (path, response.status)
+				pool.starmap(load, [(port, method, path, headers, 0.2)] * clients) # Warm up
+				start = time.perf_counter()
+				latencies_per_client = pool.starmap(load, [(port, method, path, headers, duration)] * clients)
+				elapsed = time.perf_counter() - start
+				results[name] = summarize([latency for latencies in latencies_per_client for latency in latencies], elapsed)
+	finally:
+		for server in servers:
+			server.terminate()
+		listening_socket.close()
+	return results
+
+def compare(mode, results, baseline, tolerance):
+	# Prints the results next to the baseline, returns the number of regressions
+	regressions = 0
+	print('\n[%s]' % (mode))
+	print('%-20s %12s %10s %10s %12s  %s' % ('case', 'req/s', 'p50 ms', 'p99 ms', 'alloc KiB', 'vs baseline'))
+	for name, method, path, headers, expected_status in CASES:
+		result = results[name]
+		base = baseline.get(mode, {}).get(name)
+		notes = []
+		if base:
+			changes = [('req/s', base['throughput'] / result['throughput'] - 1), # Positive: worse
+					('p50', result['p50_ms'] / base['p50_ms'] - 1),
+					('p99', result['p99_ms'] / base['p99_ms'] - 1)]
+			if 'alloc_kib' in result and base.get('alloc_kib'):
+				changes.append(('alloc', result['alloc_kib'] / base['alloc_kib'] - 1))
+			for metric, change in changes:
+				if change > tolerance:
+					notes.append('%s REGRESSED %+.0f%%' % (metric, change * 100))
+					regressions += 1
+			if not notes:
+				notes.append('ok (req/s %+.0f%%)' % (-changes[0][1] * 100))
+		print('%-20s %12.0f %10.3f %10.3f %12s  %s' % (name, result['throughput'], result['p50_ms'], result['p99_ms'],
+													'%.1f' % (result['alloc_kib']) if 'alloc_kib' in result else '-', ', '.join(notes) or 'no baseline'))
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description='Full request pipeline benchmark')
+	parser.add_argument('--mode', choices=('client', 'server', 'all'), default='all')
+	parser.add_argument('--duration', type=float, default=2.0, help='seconds per case')
+	parser.add_argument('--workers', type=int, default=2, help='server worker processes')
+	parser.add_argument('--clients', type=int, default=4, help='load generating client processes')
+	parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+	parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+	parser.add_argument('--tolerance', type=float, default=0.15, help='relative change reported as a regression')
+	parser.add_argument('--response-cache', action='store_true', help='keep the response caches on (cached GETs, if FLASK_REST_REDIS_URL is set)')
+	args = parser.parse_args()
+
+	app.debug = False
+	example_rate_limit_throttle.throttle_enabled = False # Measure the pipeline, not a client being rate limited
+	if not args.response_cache:
+		disable_response_caches()
+	baseline = {}
+	if os.path.exists(args.baseline):
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+
+	all_results = {}
+	if args.mode in ('client', 'all'):
+		client = app.test_client()
+		all_results['client'] = dict([(name, run_client_case(client, method, path, headers, expected_status, args.duration))
+									for name, method, path, headers, expected_status in CASES])
+	if args.mode in ('server', 'all'):
+		all_results['server'] = run_server_cases(args.duration, args.workers, args.clients)
+
+	regressions = 0
+	for mode, results in all_results.items():
+		regressions += compare(mode, results, baseline, args.tolerance)
+
+	if args.save_baseline:
+		baseline.update(all_results)
+		with open(args.baseline, 'w') as f:
+			json.dump(baseline, f, indent=1, sort_keys=True)
+		print('\nBaseline saved to %s' % (args.baseline))
+	elif regressions:
+		print('\n%d regression(s) beyond %.0f%%' % (regressions, args.tolerance * 100))
+		sys.exit(1)
+
+if __name__ == '__main__':
+	main()
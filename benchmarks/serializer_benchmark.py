@@ -0,0 +1,51 @@
+'''
+Benchmark of the JSON serializer backends available in this environment (see flask_rest.utils.data_utils),
+on list payloads shaped like the v2 ExampleHandler ranged GET response, with and without datetime fields.
+"original" is the original json.dumps(data, cls=FlexibleJSONEncoder) call, with time.mktime per datetime.
+
+	python benchmarks/serializer_benchmark.py
+'''
+
+import os, sys, datetime, time, timeit
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask_rest.utils.data_utils import json, JSON_SERIALIZER_PREFERENCE, get_json_serializer
+
+class OriginalFlexibleJSONEncoder(json.JSONEncoder):
+
+	def default(self, obj):
+		if isinstance(obj, datetime.datetime):
+			return int(time.mktime(obj.timetuple()))
+		return json.JSONEncoder.default(self, obj)
+
+def ranged_payload(size, with_datetimes):
+	payload = []
+	for i in range(size):
+		resource_data = {'example_obj_id': i,
+						'example_obj_data': 'API v2 example handler text data for ID ' + str(i)}
+		if with_datetimes:
+			resource_data['created'] = datetime.datetime(2015, 1, 1, 12, 0, 0) + datetime.timedelta(seconds=i)
+		payload.append(resource_data)
+	return payload
+
+def run():
+	backends = [('original', lambda data: json.dumps(data, cls=OriginalFlexibleJSONEncoder))]
+	for name in JSON_SERIALIZER_PREFERENCE:
+		try:
+			backends.append((name, get_json_serializer(name).dumps))
+		except ImportError:
+			print('%s: not available' % (name))
+
+	print('%-28s %8s %10s %14s %9s' % ('backend', 'items', 'datetimes', 'us/payload', 'speedup'))
+	for size in (5, 100, 1000, 10000):
+		for with_datetimes in (False, True):
+			payload = ranged_payload(size, with_datetimes)
+			number = max(1, 20000 // size)
+			baseline = None
+			for name, dumps in backends:
+				took = min(timeit.repeat(lambda: dumps(payload), number=number, repeat=5)) / number * 1e6
+				baseline = baseline or took
+				print('%-28s %8d %10s %14.1f %8.2fx' % (name, size, with_datetimes, took, baseline / took))
+
+if __name__ == '__main__':
+	run()
@@ -0,0 +1,112 @@
+'''
+Startup benchmark for large APIs: generates a package of handler modules (one REST resource each), then, in a
+fresh process per case, measures the time to import the app and register all resources, the latency of the
+first request, and the URL routing (matching) time, with:
+
+	legacy: handlers imported at startup, registered with the original overlapping URL rules (4 per resource)
+	eager:  handlers imported at startup, registered from a route manifest with non-overlapping URL schemes
+	lazy:   registered from a route manifest, handler modules imported on their first request (the default)
+
+Run from the repository root:
+
+	python benchmarks/startup_benchmark.py [resources]
+'''
+
+import json, os, shutil, subprocess, sys, tempfile, time, timeit
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+HANDLER_TEMPLATE = """from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+
+class Handler(RESTView):
+
+	share_handler_instance = True
+
+	def __init__(self):
+		self.allowed_methods = ('GET', 'POST', 'PUT', 'DELETE')
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, resource_id=None, lower_cut=None, upper_cut=None):
+		if resource_id is not None:
+			return ('ALL_OK', {'resource': %(i)d, 'id': resource_id})
+		return ('ALL_OK', [{'resource': %(i)d, 'id': i} for i in range(lower_cut or 0, upper_cut or 10)])
+
+	def post(self, auth_data_obj):
+		return ('CREATED', None)
+
+	def put(self, auth_data_obj, resource_id=None):
+		return ('ALL_OK', {'resource': %(i)d, 'id': resource_id})
+
+	def delete(self, auth_data_obj, resource_id=None):
+		return ('DELETED', None)
+"""
+
+def generate_package(directory, resources):
+	package_dir = os.path.join(directory, 'bench_api')
+	os.makedirs(package_dir)
+	open(os.path.join(package_dir, '__init__.py'), 'w').close()
+	for i in range(resources):
+		with open(os.path.join(package_dir, 'resource_%d.py' % (i)), 'w') as f:
+			f.write(HANDLER_TEMPLATE % {'i': i})
+
+def register_legacy(app, resources):
+	# The original registration: eager imports, and RESTView.register_handler's original URL rules
+	import importlib
+	for i in range(resources):
+		handler_class = importlib.import_module('bench_api.resource_%d' % (i)).Handler
+		url = '/bench/resource_%d/' % (i)
+		view_func = handler_class.as_view('bench_resource_%d' % (i))
+		app.add_url_rule(url, defaults={'resource_id': None}, view_func=view_func, methods=['GET', 'HEAD', 'OPTIONS'])
+		app.add_url_rule('%s<int:lower_cut>;<int:upper_cut>' % (url), view_func=view_func, methods=['GET', 'HEAD', 'OPTIONS'])
+		app.add_url_rule(url, view_func=view_func, methods=['GET', 'POST', 'HEAD', 'OPTIONS'])
+		app.add_url_rule('%s<int:resource_id>' % (url), view_func=view_func, methods=['GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS'])
+
+def run_case(case, resources):
+	# Runs in a fresh process, prints the measurements as JSON
+	start = time.time()
+	from flask_rest import app
+	from flask_rest.utils import router
+	if case == 'legacy':
+		register_legacy(app, resources)
+	else:
+		router.ROUTE_MANIFEST['bench'] = dict([('resource_%d' % (i), ('bench_api.resource_%d.Handler' % (i), 'resource', 'resource_id', 'int')) for i in range(resources)])
+		router.register_handlers('bench', lazy=(case == 'lazy'))
+	startup = time.time() - start
+
+	client = app.test_client()
+	start = time.time()
+	client.get('/bench/resource_%d/1' % (resources - 1)).data
+	first_request = time.time() - start
+
+	adapter = app.url_map.bind('localhost')
+	requests = [(path % (i), method) for i in range(0, resources, max(1, resources // 50))
+				for path, method in (('/bench/resource_%d/', 'GET'), ('/bench/resource_%d/7', 'PUT'), ('/bench/resource_%d/1;5', 'GET'))]
+	match = lambda: [adapter.match(path, method) for path, method in requests]
+	routing = min(timeit.repeat(match, number=20, repeat=5)) / 20 / len(requests)
+	print(json.dumps({'startup': startup, 'first_request': first_request, 'routing': routing, 'rules': len(list(app.url_map.iter_rules()))}))
+
+def run(resources):
+	directory = tempfile.mkdtemp()
+	try:
+		generate_package(directory, resources)
+		env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT_DIR, directory]))
+		print('%d resources' % (resources))
+		print('%-8s %8s %14s %18s %14s' % ('case', 'rules', 'startup ms', 'first request ms', 'routing us'))
+		for case in ('legacy', 'eager', 'lazy'):
+			results = []
+			for i in range(4): # The first run compiles the modules, the best of the others is reported
+				output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--case', case, str(resources)], env=env)
+				results.append(json.loads(output.decode('utf-8').strip().splitlines()[-1]))
+			best = lambda key: min([result[key] for result in results[1:]])
+			print('%-8s %8d %14.1f %18.2f %14.2f' % (case, results[-1]['rules'], best('startup') * 1000, best('first_request') * 1000, best('routing') * 1e6))
+	finally:
+		shutil.rmtree(directory)
+
+if __name__ == '__main__':
+	if len(sys.argv) > 2 and sys.argv[1] == '--case':
+		sys.path.insert(0, ROOT_DIR)
+		run_case(sys.argv[2], int(sys.argv[3]))
+	else:
+		run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
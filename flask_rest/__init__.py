@@ -1,9 +1,25 @@
+import os
 from flask import Flask
 
 app = Flask(__name__)
-app.debug = True # Switch to False for production
+app.debug = os.environ.get('FLASK_REST_ENV', 'development') != 'production' # FLASK_REST_ENV=production for production (set by runserver_prefork.py)
 app.config['MAX_CONTENT_LENGTH'] = 8388608 # Limit file upload to 8MB (8x1024x1024)
 
+# Secret key signing pagination cursors (see flask_rest.utils.pagination), shared by all worker processes and restarts
+app.secret_key = os.environ.get('FLASK_REST_SECRET_KEY') or None
+if app.secret_key is None:
+	if not app.debug:
+		raise RuntimeError('The FLASK_REST_SECRET_KEY environment variable must be set in production')
+	app.secret_key = os.urandom(32) # Development only: generated before any worker is forked, but changes on restart
+
+# Request logging is done in the background, turn it on by adding sinks, e.g.:
+# from flask_rest.utils.request_logger import request_logger, RotatingFileSink
+# request_logger.add_sink(RotatingFileSink('/var/log/flask_rest/requests.log'))
+
+# Request profiling is off by default, turn it on with a sample rate and/or a secret for signed profiling tokens, e.g.:
+# from flask_rest.utils.profiler import request_profiler
+# request_profiler.configure(output_dir='/var/log/flask_rest/profiles', sample_rate=0.001, secret='<secret>')
+
 from flask_rest.utils.error_handlers import *
 from flask_rest.utils.monitor_handlers import *
 from flask_rest.utils.router import register_handlers
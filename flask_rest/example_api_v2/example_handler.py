@@ -1,12 +1,27 @@
 try: import simplejson as json
 except ImportError: import json
-from flask_rest import app
 from flask_rest.utils.restview import RESTView
 from flask_rest.utils.auth import NoopAuthorization, ExampleAuthorization
-from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.throttle import strict_throttle, example_rate_limit_throttle
+from flask_rest.utils.pagination import KeysetPaginator
+from flask_rest.utils.response_cache import example_response_cache
+from flask_rest.utils.schema import Field
+from flask_rest.utils.admission import example_admission_controller
 
 class ExampleHandler(RESTView):
 
+	share_handler_instance = True # No per-request state is kept on self, so one instance serves all requests
+
+	# Routed with the "resource" URL scheme (see the route manifest in flask_rest.utils.router): "/url/", "/url/<int ID>"
+	# (GET, PUT, DELETE) and "/url/<int>;<int>" (ranged GET); the ID is not passed on "/url/", so it defaults to None
+
+	# GET on the plain URL pages through the resources by ID, 5 per page by default (up to 100)
+	paginator = KeysetPaginator(key_fields=('example_obj_id',), default_page_size=5, max_page_size=100)
+
+	# The body of PUT is validated before the request is authenticated, and passed to put as request_data
+	request_schemas = {'PUT': {'example_obj_data': Field(str, max_length=1000),
+								'example_obj_tags': Field(list, required=False, default=list, max_length=20, items=Field(str))}}
+
 	def __init__(self):
 		self.allowed_methods = ('GET', 'POST', 'PUT', 'DELETE') # 4 methods are allowed here
 
@@ -14,27 +29,24 @@ class ExampleHandler(RESTView):
 							'GET': NoopAuthorization()} # ... Except for GET, which uses NoopAuthorization
 
 		self.throttle_options = {'ALL': (strict_throttle, False), # All methods use strict_throttle for traffic control, with throttling override to off
-								'GET': (strict_throttle, False)} # Can be customized per method (not done here)
+								'GET': (example_rate_limit_throttle, None)} # Can be customized per method (GET is rate limited per client here)
 
-		self.default_cut_size = 5 # Default range of resources to retrieve if range not specified (prevent retrieving too many objects)
+		self.cache_options = {'ALL': (None, 0), # Responses are not cached by default...
+							'GET': (example_response_cache, 30)} # ... Except for GET, cached for 30 seconds (until modified by PUT/POST/DELETE) if a shared cache is configured
 
-	@classmethod
-	def register_handler(clss, endpoint_name, url, resource_id_name, resource_id_type):
-		view_func = clss.as_view(endpoint_name) # Register endpoint name
+		# Under overload, excess requests are shed early (503 with Retry-After), anonymous clients first, keeping the admitted ones fast
+		self.admission_options = {'ALL': example_admission_controller}
 
-		# Plain URL with optional resource ID after it (i.e. "/url" or "/url/resource_id"); GET, PUT, DELETE, HEAD, and OPTIONS allowed
-		app.add_url_rule(url, defaults={'example_resource_id': None}, view_func=view_func, methods=['GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS'])
-
-		# Plain URL (i.e. "/url"); POST uses this
-		app.add_url_rule(url, view_func=view_func, methods=['GET', 'POST', 'HEAD', 'OPTIONS'])
-
-		# URL with int resource ID following it (i.e. "/url/4")
-		app.add_url_rule('%s<%s:%s>' % (url, 'int', 'example_resource_id'), view_func=view_func, methods=['GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS'])
+		self.default_cut_size = 5 # Default range of resources to retrieve if range not specified (prevent retrieving too many objects)
+		self.max_cut_size = 1000 # Maximum range of resources that can be retrieved in a ranged query
 
-		# URL with range following it (i.e. "/url/1;3"), for retrieving a range of resources. Starts at 1
-		app.add_url_rule('%s<%s:%s>;<%s:%s>' % (url, 'int', 'lower_cut', 'int', 'upper_cut'), view_func=view_func, methods=['GET', 'HEAD', 'OPTIONS'])
+	def get_resource_version(self, auth_data_obj, example_resource_id=None, lower_cut=None, upper_cut=None, page=None):
+		# Cheap version lookup for conditional requests (e.g. a row version column), the example data never changes
+		if example_resource_id is not None:
+			return ('example-%d-v1' % (example_resource_id), None)
+		return (None, None) # Unknown for ranges, the ETag is computed from the response body instead
 
-	def get(self, auth_data_obj, example_resource_id=None, lower_cut=None, upper_cut=None):
+	def get(self, auth_data_obj, example_resource_id=None, lower_cut=None, upper_cut=None, page=None):
 		if example_resource_id is not None:
 			# Retrieve resource by known ID
 			resource_data = {'example_obj_id': example_resource_id,
@@ -42,6 +54,10 @@ class ExampleHandler(RESTView):
 
 			# Every method
 			return ('ALL_OK', resource_data)
+		elif page is not None:
+			# Paginated query on resource: the resources following the cursor position, in ID order (seek, not offset)
+			first_id = page.after[0] + 1 if page.after is not None else 0
+			return ('ALL_OK', self.__iter_range(first_id, first_id + page.limit))
 		else:
 			# Ranged query on resource
 			if lower_cut is None:
@@ -50,27 +66,28 @@ class ExampleHandler(RESTView):
 				upper_cut = self.default_cut_size
 			lower_cut -= 1
 			upper_cut -= 1
-			if lower_cut >= upper_cut or lower_cut < 0:
+			if lower_cut >= upper_cut or lower_cut < 0 or upper_cut - lower_cut > self.max_cut_size:
 				# Invalid ranged query, return error
 				return ('BAD_REQUEST', None)
-			return_data = []
-			for i in range(lower_cut, upper_cut):
-				resource_data = {'example_obj_id': i,
-								'example_obj_data': 'API v2 example handler text data for ID ' + str(i)}
-				return_data.append(resource_data)
+			# Return a generator, so the resources are streamed to the client as they are retrieved (not generated at all for HEAD)
+			return ('ALL_OK', self.__iter_range(lower_cut, upper_cut))
 
-			return ('ALL_OK', return_data)
+	def __iter_range(self, lower_cut, upper_cut):
+		for i in range(lower_cut, upper_cut):
+			resource_data = {'example_obj_id': i,
+							'example_obj_data': 'API v2 example handler text data for ID ' + str(i)}
+			yield resource_data
 
 	def post(self, auth_data_obj):
 		# Creating a new resource. Not done here, but showing how authentication data can be used here
 		return ('CREATED', auth_data_obj['user_name'])
 
-	def put(self, auth_data_obj, example_resource_id=None):
+	def put(self, auth_data_obj, example_resource_id=None, request_data=None):
 		if example_resource_id is None:
 			# For modification, resource ID must be provided.
 			return ('BAD_REQUEST', None)
 
-		# Data modification done here
+		# Data modification done here, with the validated request_data (e.g. request_data['example_obj_data'])
 		pass
 
 		# Call get to retrieve the updated resource data
@@ -0,0 +1,157 @@
+import math, threading, time
+from flask import request
+
+class EndpointLimit(object):
+
+	'''
+	Concurrency limit state of one endpoint: the number of requests in flight, the current (adaptive) limit and
+	the latency averages the limit is adjusted from. Guarded by its own lock, so endpoints never contend.
+	'''
+
+	__slots__ = ('lock', 'limit', 'in_flight', 'short_latency', 'long_latency', 'last_decrease')
+
+	def __init__(self, limit):
+		self.lock = threading.Lock()
+		self.limit = float(limit)
+		self.in_flight = 0
+		self.short_latency = None # Fast moving average of the latency (recent requests)
+		self.long_latency = None # Slow moving average of the latency (the endpoint's normal latency when not overloaded)
+		self.last_decrease = 0.0 # Time of the last multiplicative decrease (AIMD)
+
+class AdmissionController(object):
+
+	'''
+	Adaptive load shedding: limits the number of requests each endpoint processes concurrently (per worker
+	process), rejecting the excess early with THROTTLED and a Retry-After header, so the latency of the admitted
+	requests stays bounded under overload instead of every request slowing down until it times out.
+
+	The limit of each endpoint adapts to the latency of its requests (measured from admission to the response
+	being built), between min_limit and max_limit, with one of:
+
+		'aimd':     additive increase (by 1 per <limit> fast requests) while the endpoint is busy, multiplicative
+		            decrease (by backoff_ratio) on requests slower than latency_threshold seconds, at most once
+		            per latency_threshold (the slow requests in flight together are one overload signal)
+		'gradient': the limit follows the ratio of the endpoint's normal (long term average) latency to its
+		            current (short term average) latency, shrinking as requests queue up and get slower, growing
+		            (by a headroom of sqrt(limit)) while latency stays normal
+
+	Clients are prioritized by get_priority (authenticated clients over anonymous ones, premium clients over
+	everyone by default): each priority can only fill its share of the limit (priority_shares), so lower priority
+	requests are shed first. With max_queue_time, requests that already waited longer than that (in seconds) in
+	front of the app, per the X-Request-Start header set by the proxy, are rejected right away: their client has
+	likely given up on them.
+	'''
+
+	def __init__(self, algorithm='aimd', initial_limit=20, min_limit=1, max_limit=200, latency_threshold=0.5, backoff_ratio=0.9,
+				smoothing=0.2, tolerance=1.5, priority_shares=(0.5, 0.8, 1.0), priority_field='premium', max_queue_time=None, retry_after=1):
+		if algorithm not in ('aimd', 'gradient'):
+			raise ValueError('Unknown concurrency limit algorithm: %s' % (algorithm))
+		self.algorithm = algorithm
+		self.initial_limit = initial_limit
+		self.min_limit = min_limit
+		self.max_limit = max_limit
+		self.latency_threshold = latency_threshold # AIMD: requests slower than this (seconds) decrease the limit
+		self.backoff_ratio = backoff_ratio # AIMD: multiplicative decrease factor
+		self.smoothing = smoothing # Gradient: weight of each new limit estimate (0-1)
+		self.tolerance = tolerance # Gradient: current/normal latency ratio tolerated before the limit shrinks
+		self.priority_shares = priority_shares # Share of the limit each priority (0: lowest) can fill
+		self.priority_field = priority_field # Field of the auth_data_obj marking premium clients
+		self.max_queue_time = max_queue_time
+		self.retry_after = retry_after # Seconds, sent to rejected clients in the Retry-After header
+		self.__lock = threading.Lock()
+		self.__limits = {} # {<endpoint>: <EndpointLimit>}
+
+	def get_priority(self, auth_data_obj):
+
+		'''
+		Returns the priority of the client making the request, an index into priority_shares: 2 for premium
+		clients (priority_field set in the auth_data_obj), 1 for other authenticated clients, 0 otherwise.
+		Override to prioritize clients differently.
+		'''
+
+		if not auth_data_obj:
+			return 0
+		return 2 if auth_data_obj.get(self.priority_field) else 1
+
+	def get_queue_time(self):
+		# Returns how long (in seconds) the request waited in front of the app, from the proxy's X-Request-Start header ("t=<time>", in seconds, milli- or microseconds), or None
+		request_start = request.headers.get('X-Request-Start')
+		if not request_start:
+			return None
+		try:
+			start = float(request_start[2:] if request_start.startswith('t=') else request_start)
+		except ValueError:
+			return None
+		while start > 1e11: # Milli- or microseconds since the epoch
+			start /= 1000.0
+		return max(0.0, time.time() - start)
+
+	def admit(self, endpoint, auth_data_obj):
+
+		'''
+		Called by RESTView before the request reaches the handler. Returns a 2-tuple, (<admission>, <headers>):
+		<admission> is the EndpointLimit to pass to release once the response is built, or None if the request is
+		rejected, with the Retry-After header in <headers>.
+		'''
+
+		if self.max_queue_time is not None:
+			queue_time = self.get_queue_time()
+			if queue_time is not None and queue_time > self.max_queue_time:
+				return (None, {'Retry-After': str(self.retry_after)})
+
+		endpoint_limit = self.__limits.get(endpoint)
+		if endpoint_limit is None:
+			with self.__lock:
+				endpoint_limit = self.__limits.setdefault(endpoint, EndpointLimit(self.initial_limit))
+		share = self.priority_shares[min(self.get_priority(auth_data_obj), len(self.priority_shares) - 1)]
+		with endpoint_limit.lock:
+			if endpoint_limit.in_flight >= max(self.min_limit, int(endpoint_limit.limit * share)):
+				return (None, {'Retry-After': str(self.retry_after)})
+			endpoint_limit.in_flight += 1
+		return (endpoint_limit, {})
+
+	def release(self, endpoint_limit, latency):
+		# Ends an admitted request, adjusting the endpoint's limit from its latency (seconds)
+		with endpoint_limit.lock:
+			in_flight = endpoint_limit.in_flight
+			endpoint_limit.in_flight -= 1
+			if self.algorithm == 'aimd':
+				limit = self.__aimd(endpoint_limit, in_flight, latency)
+			else:
+				limit = self.__gradient(endpoint_limit, in_flight, latency)
+			endpoint_limit.limit = min(self.max_limit, max(self.min_limit, limit))
+
+	def get_limits(self):
+		# Returns the current limit and number of requests in flight per endpoint, e.g. for monitoring
+		return dict([(endpoint, (endpoint_limit.limit, endpoint_limit.in_flight)) for endpoint, endpoint_limit in list(self.__limits.items())])
+
+	def __aimd(self, endpoint_limit, in_flight, latency):
+		limit = endpoint_limit.limit
+		if latency > self.latency_threshold:
+			now = time.time()
+			if now - endpoint_limit.last_decrease < self.latency_threshold:
+				return limit
+			endpoint_limit.last_decrease = now
+			return limit * self.backoff_ratio
+		if in_flight * 2 >= limit:
+			# Only grow while the limit is actually used, or an idle endpoint's limit would grow without bound
+			return limit + 1.0 / limit
+		return limit
+
+	def __gradient(self, endpoint_limit, in_flight, latency):
+		if endpoint_limit.long_latency is None:
+			endpoint_limit.short_latency = endpoint_limit.long_latency = latency
+			return endpoint_limit.limit
+		endpoint_limit.short_latency += (latency - endpoint_limit.short_latency) * 0.1
+		endpoint_limit.long_latency += (latency - endpoint_limit.long_latency) * 0.001
+		if endpoint_limit.long_latency > endpoint_limit.short_latency * 2:
+			# Recovering from an overload the long term average absorbed, let it come back down faster
+			endpoint_limit.long_latency *= 0.95
+		limit = endpoint_limit.limit
+		if in_flight * 2 < limit:
+			return limit
+		gradient = max(0.5, min(1.0, self.tolerance * endpoint_limit.long_latency / max(endpoint_limit.short_latency, 1e-6)))
+		new_limit = limit * gradient + math.sqrt(limit)
+		return limit * (1 - self.smoothing) + new_limit * self.smoothing
+
+example_admission_controller = AdmissionController('gradient', initial_limit=50, max_limit=500)
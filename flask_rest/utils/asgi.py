@@ -0,0 +1,172 @@
+import asyncio, contextvars, io, sys
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.exceptions import HTTPException, RequestEntityTooLarge
+
+class ASGIApp(object):
+
+	'''
+	ASGI application wrapping the Flask app, for ASGI servers (e.g. uvicorn, hypercorn; see runserver_asgi.py).
+
+	Requests to RESTView resources whose handler parts for the request method (HTTP method handler, resource
+	version hook, authenticator or throttle) include coroutine functions (async def) are processed on the
+	event loop, so a single process can keep thousands of slow requests (e.g. waiting on a database or a
+	downstream service) in flight. All other requests go through the regular WSGI app in a bounded thread pool
+	(max_threads), so synchronous handlers keep working unchanged, without blocking the event loop.
+	'''
+
+	def __init__(self, app, max_threads=32):
+		self.app = app
+		self.executor = ThreadPoolExecutor(max_workers=max_threads)
+
+	async def __call__(self, scope, receive, send):
+		if scope['type'] == 'lifespan':
+			while True:
+				message = await receive()
+				if message['type'] == 'lifespan.startup':
+					await send({'type': 'lifespan.startup.complete'})
+				elif message['type'] == 'lifespan.shutdown':
+					self.executor.shutdown(wait=False)
+					await send({'type': 'lifespan.shutdown.complete'})
+					return
+		if scope['type'] != 'http':
+			return # WebSockets are not supported
+
+		body = await self.__read_body(scope, receive)
+		if body is None:
+			# Larger than the app's MAX_CONTENT_LENGTH, answered by its error handler without reading the rest
+			await self.__send_error(scope, RequestEntityTooLarge(), send)
+			return
+		environ = self.get_environ(scope, body)
+
+		async_view = self.__get_async_view(environ)
+		if async_view is not None:
+			await self.__run_async(environ, async_view, send)
+		else:
+			await self.__run_wsgi(environ, send)
+
+	async def __read_body(self, scope, receive):
+		# Returns the request body, or None if it is larger than the app's MAX_CONTENT_LENGTH (checked before it is read, from Content-Length, and while it is read)
+		max_length = self.app.config.get('MAX_CONTENT_LENGTH')
+		if max_length is not None:
+			for name, value in scope.get('headers', ()):
+				if name.lower() == b'content-length' and value.isdigit() and int(value) > max_length:
+					return None
+		body = bytearray()
+		while True:
+			message = await receive()
+			body += message.get('body', b'')
+			if max_length is not None and len(body) > max_length:
+				return None
+			if not message.get('more_body'):
+				return bytes(body)
+
+	async def __send_error(self, scope, exception, send):
+		# Sends the app's response to an HTTP error raised before the request could be processed
+		environ = self.get_environ(scope, b'')
+		with self.app.request_context(environ):
+			response = self.app.finalize_request(self.app.handle_user_exception(exception))
+			await self.__send_app_iter(environ, response, send)
+
+	async def __send_response(self, status_code, headers, chunks, send):
+		# Sends the response, its body chunk by chunk as it is iterated (streamed bodies are never held in memory whole)
+		await send({'type': 'http.response.start', 'status': status_code, 'headers': self.__get_headers(headers)})
+		for chunk in chunks:
+			if chunk:
+				await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+		await send({'type': 'http.response.body', 'body': b''})
+
+	def get_environ(self, scope, body):
+		# Returns the WSGI environ of an ASGI HTTP request
+		server_name, server_port = scope.get('server') or ('localhost', 80)
+		environ = {'REQUEST_METHOD': scope['method'],
+					'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+					'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+					'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+					'SERVER_NAME': server_name,
+					'SERVER_PORT': str(server_port),
+					'SERVER_PROTOCOL': 'HTTP/%s' % (scope.get('http_version', '1.1')),
+					'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+					'CONTENT_LENGTH': str(len(body)),
+					'wsgi.version': (1, 0),
+					'wsgi.url_scheme': scope.get('scheme', 'http'),
+					'wsgi.input': io.BytesIO(body),
+					'wsgi.errors': sys.stderr,
+					'wsgi.multithread': True,
+					'wsgi.multiprocess': True,
+					'wsgi.run_once': False}
+		for name, value in scope.get('headers', ()):
+			name = name.decode('latin-1').upper().replace('-', '_')
+			value = value.decode('latin-1')
+			if name == 'CONTENT_TYPE':
+				environ['CONTENT_TYPE'] = value
+			elif name != 'CONTENT_LENGTH':
+				key = 'HTTP_' + name
+				environ[key] = environ[key] + ',' + value if key in environ else value
+		return environ
+
+	def __get_async_view(self, environ):
+		# Returns the async view function of the RESTView the request is routed to, if its plan for the method is async
+		try:
+			endpoint, view_args = self.app.url_map.bind_to_environ(environ).match()
+		except HTTPException:
+			return None
+		view_func = self.app.view_functions.get(endpoint)
+		if hasattr(view_func, 'load_view'):
+			view_func = view_func.load_view() # Handler not imported yet (see flask_rest.utils.router)
+		async_view = getattr(view_func, 'async_view', None)
+		handler_config = getattr(getattr(view_func, 'view_class', None), 'handler_config', None)
+		if async_view is None or handler_config is None:
+			return None
+		plan = handler_config.dispatch_plans.get(environ['REQUEST_METHOD'])
+		return async_view if plan is not None and plan.is_async else None
+
+	async def __run_async(self, environ, async_view, send):
+		# Processes the request on the event loop, with the same request hooks and error handling as Flask's own dispatch
+		with self.app.request_context(environ) as ctx:
+			try:
+				response = self.app.preprocess_request()
+				if response is None:
+					if ctx.request.routing_exception is not None:
+						raise ctx.request.routing_exception
+					response = await async_view(**ctx.request.view_args)
+			except Exception as e:
+				response = self.app.handle_user_exception(e)
+			response = self.app.finalize_request(response)
+			await self.__send_app_iter(environ, response, send) # Streamed bodies are generated here, within the request context
+
+	async def __send_app_iter(self, environ, response, send):
+		# Sends the response like a WSGI server would: no body for HEAD requests and 1xx, 204 and 304 responses
+		app_iter = response.get_app_iter(environ)
+		try:
+			await self.__send_response(response.status_code, response.headers.items(), app_iter, send)
+		finally:
+			if hasattr(app_iter, 'close'):
+				app_iter.close()
+			else:
+				response.close() # Body not sent
+
+	async def __run_wsgi(self, environ, send):
+		# Processes the request with the WSGI app in the thread pool, the body is iterated there one chunk at a time
+		loop = asyncio.get_running_loop()
+		context = contextvars.copy_context() # All the steps run in this context, the request context pushed by a streamed body (stream_with_context) is popped in it
+		start_response_args = []
+		def start_response(status, headers, exc_info=None):
+			start_response_args[:] = [status, headers]
+		body = await loop.run_in_executor(self.executor, context.run, self.app, environ, start_response)
+		try:
+			status, headers = start_response_args
+			await send({'type': 'http.response.start', 'status': int(status.split(' ', 1)[0]), 'headers': self.__get_headers(headers)})
+			iterator = iter(body)
+			while True:
+				chunk = await loop.run_in_executor(self.executor, context.run, next, iterator, None)
+				if chunk is None:
+					break
+				if chunk:
+					await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+			await send({'type': 'http.response.body', 'body': b''})
+		finally:
+			if hasattr(body, 'close'):
+				await loop.run_in_executor(self.executor, context.run, body.close)
+
+	def __get_headers(self, headers):
+		return [(name.lower().encode('latin-1'), str(value).encode('latin-1')) for name, value in headers]
@@ -1,5 +1,7 @@
+import collections, hashlib, hmac, math, threading, time
 from flask import request
-from flask_rest.utils.http_utils import rf
+from flask_rest.utils.http_utils import rf, get_remote_address
+from flask_rest.utils.throttle import LocalThrottleBackend
 
 class CommonAuthorization(object):
 
@@ -19,7 +21,10 @@ class CommonAuthorization(object):
 		boolean denoting whether the authorization was successful, and <auth_data_obj>
 		is a dict containing any information on the authorization (e.g. user data),
 		which can be passed along to the REST endpoint to reduce amount of DB reads (if
-		applicable).
+		applicable). Can be a coroutine function (async def) if the auth processing waits on I/O.
+		A failed authorization whose <auth_data_obj> has a 'retry_after' (in seconds) means
+		the client is rate limited rather than unauthorized: RESTView then returns THROTTLED,
+		with a Retry-After header, instead of the challenge.
 		'''
 
 		return (False, {})
@@ -46,12 +51,164 @@ class NoopAuthorization(CommonAuthorization):
 	def is_authenticated(self):
 		return (True, {})
 
-class ExampleAuthorization(CommonAuthorization):
+def credential_digest(credential):
+	# Returns the SHA-256 digest of a credential, used to index credentials so they are never compared directly
+	return hashlib.sha256(credential.encode('utf-8')).digest()
+
+class AuthCache(object):
+
+	'''
+	A bounded, least recently used cache of authentication results, indexed by credential digest. Valid
+	credentials are cached for ttl seconds, invalid ones (negative caching) for negative_ttl seconds.
+	'''
+
+	def __init__(self, max_entries=10000, ttl=300, negative_ttl=60):
+		self.max_entries = max_entries
+		self.ttl = ttl
+		self.negative_ttl = negative_ttl
+		self.__lock = threading.Lock()
+		self.__entries = collections.OrderedDict() # {<credential_digest>: (<expire_time>, <auth_data_obj or None>)}
+
+	def get(self, digest):
+		# Returns (<found>, <auth_data_obj or None if invalid credential>)
+		with self.__lock:
+			entry = self.__entries.get(digest)
+			if entry is None:
+				return (False, None)
+			if entry[0] <= time.time():
+				del self.__entries[digest]
+				return (False, None)
+			self.__entries.move_to_end(digest)
+			return (True, entry[1])
+
+	def set(self, digest, auth_data_obj):
+		ttl = self.ttl if auth_data_obj is not None else self.negative_ttl
+		with self.__lock:
+			self.__entries.pop(digest, None)
+			self.__entries[digest] = (time.time() + ttl, auth_data_obj)
+			if len(self.__entries) > self.max_entries:
+				self.__entries.popitem(last=False)
+
+	def delete(self, digest):
+		with self.__lock:
+			self.__entries.pop(digest, None)
+
+	def clear(self):
+		with self.__lock:
+			self.__entries.clear()
+
+shared_state_lock = threading.Lock()
+
+class CachedAuthorization(CommonAuthorization):
+
+	'''
+	Base class for authorizations whose credentials have to be looked up in a backend (e.g. a DB). Lookup results
+	are cached (see AuthCache), so a backend lookup is done only once per credential per TTL, and concurrent
+	requests with the same uncached credential share a single lookup (single-flight).
+
+	Lookups of uncached credentials are also rate limited per client IP address (lookup_rate per second, bursts
+	of up to lookup_burst), so a client guessing credentials can not flood the backend; over the limit, requests
+	are throttled without a lookup.
+
+	The cache, the lookup rate limits and the lookups in progress are shared by all instances of a class (created
+	on first use), so instances are cheap to create (e.g. by handlers created per request) and all use the same
+	cache. Subclasses implement get_credential and lookup_credential instead of is_authenticated. Since cached
+	<auth_data_obj> dicts are shared between requests, handlers must not modify them.
+	'''
+
+	def __init__(self, auth_cache=None, lookup_rate=1.0, lookup_burst=20):
+		self.name = 'CachedAuth'
+		shared_auth_cache, self.__lookup_limits, self.__lookups_lock, self.__lookups = self.get_shared_state()
+		self.auth_cache = auth_cache if auth_cache is not None else shared_auth_cache
+		self.lookup_rate = lookup_rate
+		self.lookup_burst = lookup_burst
+
+	@classmethod
+	def get_shared_state(clss):
+		# Returns the (<AuthCache>, <lookup rate limits>, <lookups lock>, <lookups in progress>) of the class, created on first use
+		state = clss.__dict__.get('_shared_state') # Not inherited, subclasses look credentials up differently
+		if state is None:
+			with shared_state_lock:
+				state = clss.__dict__.get('_shared_state')
+				if state is None:
+					# Lookups in progress are {<credential_digest>: [<done_event>, <auth_data_obj>, <retry_after>]}
+					state = clss._shared_state = (AuthCache(), LocalThrottleBackend(), threading.Lock(), {})
+		return state
+
+	def get_credential(self):
+
+		'''
+		Returns the credential of the current request (e.g. the raw Authorization header), or None if there is none.
+		Should be cheap, as it is called for every request.
+		'''
+
+		return None
+
+	def lookup_credential(self, credential):
+
+		'''
+		Looks the credential up in the backend, returns the <auth_data_obj> dict if it is valid, or None.
+		'''
+
+		return None
+
+	def is_authenticated(self):
+		credential = self.get_credential()
+		if not credential:
+			return (False, {})
+		digest = credential_digest(credential)
+		found, auth_data_obj = self.auth_cache.get(digest)
+		if not found:
+			auth_data_obj, retry_after = self.__single_flight_lookup(digest, credential)
+			if retry_after:
+				return (False, {'retry_after': retry_after}) # Too many lookups from this client
+		if auth_data_obj is None:
+			return (False, {})
+		return (True, auth_data_obj)
+
+	def revoke(self, credential):
+
+		'''
+		Removes a credential from the cache (e.g. when an access key is revoked), so it is looked up again on its
+		next use. Only affects the cache of this process, unless the AuthCache is shared.
+		'''
+
+		self.auth_cache.delete(credential_digest(credential))
+
+	def revoke_all(self):
+		self.auth_cache.clear()
+
+	def __single_flight_lookup(self, digest, credential):
+		with self.__lookups_lock:
+			lookup = self.__lookups.get(digest)
+			is_leader = lookup is None
+			if is_leader:
+				lookup = self.__lookups[digest] = [threading.Event(), None, 0]
+		if not is_leader:
+			# Another request is already looking this credential up, wait for its result
+			lookup[0].wait()
+			return (lookup[1], lookup[2])
+
+		try:
+			allowed, remaining, retry_after = self.__lookup_limits.token_bucket(get_remote_address(), self.lookup_burst, self.lookup_rate, time.time())
+			if allowed:
+				lookup[1] = self.lookup_credential(credential)
+				self.auth_cache.set(digest, lookup[1])
+			else:
+				lookup[2] = max(1, int(math.ceil(retry_after)))
+		finally:
+			with self.__lookups_lock:
+				del self.__lookups[digest]
+			lookup[0].set()
+		return (lookup[1], lookup[2])
+
+class ExampleAuthorization(CachedAuthorization):
 
 	'''
 	An example authorization class, only requests with the correct access key are allowed through.
 	Access keys and associated client information are stored in the class for this example. In
-	a real implementaion they will most likely come from DBs.
+	a real implementaion they will most likely come from DBs (lookup_credential is where the DB
+	would be queried, the results are cached by CachedAuthorization).
 
 	Takes an HTTP Authorization string in the format of:
 
@@ -60,21 +217,30 @@ class ExampleAuthorization(CommonAuthorization):
 	The <auth_data_obj> returned contains data on the user that the access key belongs to.
 	'''
 
+	# Shared by all instances, built once when the class is defined. Indexed by access key digest, so looking a key up
+	# does not leak how much of it matches through timing
+	_ALLOWED_USERS = dict([(credential_digest(access_key), (access_key, user_data)) for access_key, user_data in
+						{'not-so-random-access-key-qwerty': {'user_name': 'John',
+															'email': 'john@example.com'},
+						'not-so-random-access-key-123456': {'user_name': 'Jane',
+															'email': 'jane@example.com'}}.items()])
+
 	def __init__(self):
+		CachedAuthorization.__init__(self)
 		self.name = 'ExampleAuth'
-		self.__allowed_users = {'not-so-random-access-key-qwerty': {'user_name': 'John',
-																	'email': 'john@example.com'},
-								'not-so-random-access-key-123456': {'user_name': 'Jane',
-																	'email': 'jane@example.com'}}
+		self.__allowed_users = self._ALLOWED_USERS
 
-	def is_authenticated(self):
-		incoming_auth_str = request.headers.get('Authorization', None)
-		if (not incoming_auth_str):
-			return (False {})
+	def get_credential(self):
+		return request.headers.get('Authorization', None)
+
+	def lookup_credential(self, incoming_auth_str):
 		auth_str_split = incoming_auth_str.split(' ', 1)
 		if len(auth_str_split) != 2:
-			return (False, {})
+			return None
 		auth_method, incoming_access_key = auth_str_split
-		if auth_method.lower() != self.name.lower() or incoming_access_key not in self.__allowed_users:
-			return (False, {})
-		return (True, self.__allowed_users[incoming_access_key])
\ No newline at end of file
+		if auth_method.lower() != self.name.lower():
+			return None
+		access_key, user_data = self.__allowed_users.get(credential_digest(incoming_access_key), ('', None))
+		if not hmac.compare_digest(access_key.encode('utf-8'), incoming_access_key.encode('utf-8')):
+			return None
+		return user_data
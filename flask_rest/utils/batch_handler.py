@@ -0,0 +1,139 @@
+try: import simplejson as json
+except ImportError: import json
+try: from concurrent.futures import ThreadPoolExecutor
+except ImportError: ThreadPoolExecutor = None # Python 2 without the futures backport, batches always run sequentially
+import threading
+from flask import request
+from werkzeug.exceptions import MethodNotAllowed
+from werkzeug.test import EnvironBuilder
+from flask_rest import app
+from flask_rest.utils.restview import RESTView, BATCH_AUTH_RESULTS_KEY
+from flask_rest.utils.http_utils import rf, get_request_data, get_remote_address, REMOTE_ADDRESS_KEY
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+
+'''
+Batch endpoint, registered per API version (e.g. "/v2/batch"): runs several REST requests on the version's
+resources in one HTTP round trip. POST a JSON body such as:
+
+	{"requests": [{"method": "GET", "path": "/v2/rest_example/1"},
+				{"method": "PUT", "path": "/v2/rest_example/2", "body": {...}, "headers": {...}}],
+	"concurrent": false}
+
+Each sub-request is routed through the URL map to its RESTView handler, with the batch request's headers
+(sub-request headers can add to them, except Authorization), and goes through the handler's usual
+throttling, caching and logging. Authentication is done once per authenticator for the whole batch. The
+response is a list with one result per sub-request, in order:
+
+	[{"status": 200, "response": "ALL_OK", "headers": {...}, "body": <JSON data or text>}, ...]
+
+where "response" is the ResponseFactory response name, as the sub-request would have got on its own. With
+"concurrent" set, the sub-requests (which must then be independent of each other) run in a bounded thread pool.
+'''
+
+class BatchHandler(RESTView):
+
+	share_handler_instance = True
+	auto_etag = False
+
+	max_batch_size = 20 # Maximum number of sub-requests in a batch
+	max_workers = 4 # Size of the thread pool running concurrent batches (shared by all of them)
+
+	__executor = None
+	__executor_lock = threading.Lock()
+
+	# Headers of the batch request not passed on to the sub-requests (sub-responses are embedded as uncompressed JSON)
+	EXCLUDED_HEADERS = frozenset(('content-type', 'content-length', 'transfer-encoding', 'accept', 'accept-encoding'))
+
+	def __init__(self):
+		self.allowed_methods = ('POST',)
+		self.auth_methods = {'ALL': NoopAuthorization()} # Sub-requests are authenticated by their resources' authenticators
+		self.throttle_options = {'ALL': (strict_throttle, False)} # Sub-requests are also throttled individually
+
+	@classmethod
+	def get_executor(clss):
+		# Returns the thread pool shared by concurrent batches, created on first use
+		if BatchHandler.__executor is None:
+			with BatchHandler.__executor_lock:
+				if BatchHandler.__executor is None:
+					BatchHandler.__executor = ThreadPoolExecutor(max_workers=clss.max_workers)
+		return BatchHandler.__executor
+
+	def post(self, auth_data_obj):
+		batch = get_request_data() # JSON, or any other request data format
+		if isinstance(batch, list):
+			batch = {'requests': batch}
+		if not isinstance(batch, dict) or not isinstance(batch.get('requests'), list):
+			return ('BAD_REQUEST', 'Batch body must be a JSON list of requests, or an object with a "requests" list')
+		sub_requests = batch['requests']
+		if len(sub_requests) > self.max_batch_size:
+			return ('REQUEST_ENTITY_TOO_LARGE', 'At most %d requests per batch' % (self.max_batch_size))
+
+		# Authentication results shared by the sub-requests, starting with the batch's own
+		auth_results = {self.get_handler_config().dispatch_plans['POST'].authenticator: (True, auth_data_obj)}
+		api_prefix = request.path.rsplit('/', 1)[0] + '/' # Only resources of the batch endpoint's API version
+		headers = [(name, value) for name, value in request.headers.items() if name.lower() not in self.EXCLUDED_HEADERS]
+		remote_address = get_remote_address() # Sub-requests come from the batch's client, whatever their X-Forwarded-For headers
+		environ_base = {'REMOTE_ADDR': remote_address, REMOTE_ADDRESS_KEY: remote_address, BATCH_AUTH_RESULTS_KEY: auth_results}
+		args_list = [(sub_request, api_prefix, request.url_root, headers, environ_base) for sub_request in sub_requests]
+
+		if batch.get('concurrent') and ThreadPoolExecutor is not None and len(sub_requests) > 1:
+			results = list(self.get_executor().map(lambda args: self.__run_sub_request(*args), args_list))
+		else:
+			results = [self.__run_sub_request(*args) for args in args_list]
+		return ('ALL_OK', results)
+
+	def __run_sub_request(self, sub_request, api_prefix, base_url, headers, environ_base):
+		# Runs one sub-request through its RESTView handler, returns its result dict (may run in a pool thread, without the batch's request context)
+		if not isinstance(sub_request, dict) or not isinstance(sub_request.get('path'), str):
+			return self.__get_result('BAD_REQUEST')
+		path = sub_request['path']
+		if not path.startswith(api_prefix):
+			return self.__get_result('NOT_FOUND')
+
+		sub_headers = list(headers)
+		if isinstance(sub_request.get('headers'), dict):
+			sub_headers += [(name, str(value)) for name, value in sub_request['headers'].items() if name.lower() not in self.EXCLUDED_HEADERS and name.lower() != 'authorization']
+		body, content_type = sub_request.get('body'), None
+		if body is not None and not isinstance(body, str):
+			body, content_type = json.dumps(body), 'application/json'
+		try:
+			builder = EnvironBuilder(path=path, base_url=base_url, method=str(sub_request.get('method', 'GET')).upper(),
+									headers=sub_headers, data=body, content_type=content_type, environ_base=environ_base)
+			environ = builder.get_environ()
+		except (ValueError, TypeError):
+			return self.__get_result('BAD_REQUEST')
+
+		with app.request_context(environ):
+			if request.routing_exception is not None:
+				return self.__get_result('NOT_ALLOWED' if isinstance(request.routing_exception, MethodNotAllowed) else 'NOT_FOUND')
+			view_func = app.view_functions[request.url_rule.endpoint]
+			if hasattr(view_func, 'load_view'):
+				view_func = view_func.load_view() # Handler not imported yet (see flask_rest.utils.router)
+			view_class = getattr(view_func, 'view_class', None)
+			if view_class is None or not issubclass(view_class, RESTView) or issubclass(view_class, BatchHandler):
+				return self.__get_result('NOT_FOUND') # Only REST resources can be batched
+			try:
+				response = view_func(**request.view_args)
+				try:
+					response.direct_passthrough = False
+					data = response.get_data() # Streamed bodies are generated here, inside the sub-request's context
+				finally:
+					response.close()
+			except:
+				return self.__get_result('INTERNAL_ERROR')
+			return self.__get_result(rf.get_response_name(response.status_code), response, data)
+
+	def __get_result(self, response_name, response=None, data=None):
+		if response is None:
+			response = rf.get_response(response_name)
+			data = response.get_data()
+		if response.mimetype in ('application/json', 'application/x-ndjson') and data:
+			if response.mimetype == 'application/json':
+				body = json.loads(data.decode('utf-8'))
+			else:
+				body = [json.loads(line) for line in data.decode('utf-8').splitlines() if line]
+		else:
+			body = data.decode('utf-8') if data else None
+		headers = dict([(name, value) for name, value in response.headers.items() if name.lower() not in self.EXCLUDED_HEADERS])
+		return {'status': response.status_code, 'response': response_name, 'headers': headers, 'body': body}
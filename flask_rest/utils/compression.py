@@ -0,0 +1,73 @@
+try: import brotli
+except ImportError: brotli = None # Brotli is optional, only gzip is offered without it
+import zlib
+from flask import request
+
+class ResponseCompressor(object):
+
+	'''
+	Content-Encoding negotiation and compression of response bodies, used by ResponseFactory. Bodies smaller than
+	min_size bytes are sent as is (compressing them costs more than it saves); larger ones are compressed with
+	the best encoding accepted by the client (per Accept-Encoding): brotli ("br", if the brotli package is
+	installed) or gzip. Streamed bodies are compressed chunk by chunk as they are sent.
+
+	Compressible responses get a "Vary: Accept-Encoding" header, so HTTP caches keep the variants apart (as does
+	flask_rest.utils.response_cache, which stores the compressed variants, so they are not compressed again).
+
+	Parameters:
+		min_size: minimum body size to compress, in bytes
+		gzip_level: zlib compression level, 1 (fastest) to 9 (smallest)
+		brotli_quality: brotli quality, 0 (fastest) to 11 (smallest); low values suit dynamic responses
+		encodings: encodings offered, in order of server preference
+	'''
+
+	def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4, encodings=None):
+		self.min_size = min_size
+		self.gzip_level = gzip_level
+		self.brotli_quality = brotli_quality
+		if encodings is None:
+			encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+		self.encodings = tuple(encodings)
+
+	def get_encoding(self):
+
+		'''
+		Returns the content encoding to use for the current request's response, or None (identity).
+		'''
+
+		if 'Accept-Encoding' not in request.headers:
+			return None
+		return request.accept_encodings.best_match(self.encodings)
+
+	def compress(self, data, encoding):
+		# Returns the compressed bytes of a whole body
+		if encoding == 'br':
+			return brotli.compress(data, quality=self.brotli_quality)
+		compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31) # 31: gzip container, no time stamp (same body, same bytes)
+		return compressor.compress(data) + compressor.flush()
+
+	def iter_compress(self, chunks, encoding):
+
+		'''
+		Compresses a streamed body, yielding compressed chunks. Every chunk is flushed, so the client receives the
+		data as it is produced (the chunks should not be too small, e.g. serialized items are batched).
+		'''
+
+		try:
+			if encoding == 'br':
+				compressor = brotli.Compressor(quality=self.brotli_quality)
+				for chunk in chunks:
+					compressed = compressor.process(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')) + compressor.flush()
+					if compressed:
+						yield compressed
+				yield compressor.finish()
+			else:
+				compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+				for chunk in chunks:
+					compressed = compressor.compress(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+					if compressed:
+						yield compressed
+				yield compressor.flush()
+		finally:
+			if hasattr(chunks, 'close'):
+				chunks.close()
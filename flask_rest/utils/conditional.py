@@ -0,0 +1,64 @@
+import calendar, datetime
+from flask import request
+from werkzeug.http import http_date
+
+'''
+HTTP conditional request handling (ETag / Last-Modified), used by RESTView. Resource handlers can define a
+cheap version hook:
+
+	def get_resource_version(self, auth_data_obj, *args, **kwargs):
+		return (<etag>, <last_modified>)
+
+called with the same arguments as the HTTP method handler, before it. <etag> is a str (e.g. a row version
+or hash) and <last_modified> a datetime (UTC if naive) or an Epoch time stamp; either can be None if
+unknown. The hook returns None instead if the resource does not exist. With it, GET/HEAD requests whose If-None-Match/If-Modified-Since match are answered 304 Not
+Modified without running the handler, and PUT/PATCH/DELETE requests whose If-Match/If-Unmodified-Since do
+not match are rejected with 412 Precondition Failed.
+'''
+
+def to_epoch(last_modified):
+	# Returns the integer Epoch time stamp of a last modified datetime (naive datetimes are assumed to be UTC) or number
+	if last_modified is None:
+		return None
+	if isinstance(last_modified, datetime.datetime):
+		if last_modified.tzinfo is not None:
+			return calendar.timegm(last_modified.utctimetuple())
+		return calendar.timegm(last_modified.timetuple())
+	return int(last_modified)
+
+def get_version_headers(etag, last_modified):
+	# Returns the ETag and Last-Modified response headers for a resource version
+	headers = {}
+	if etag is not None:
+		headers['ETag'] = '"%s"' % (etag)
+	if last_modified is not None:
+		headers['Last-Modified'] = http_date(to_epoch(last_modified))
+	return headers
+
+def is_not_modified(etag, last_modified):
+
+	'''
+	Returns whether the client's cached copy (per If-None-Match, or If-Modified-Since if no If-None-Match was
+	sent) is still current, i.e. a GET/HEAD request can be answered with 304 Not Modified.
+	'''
+
+	if request.if_none_match:
+		return etag is not None and request.if_none_match.contains_weak(etag)
+	if request.if_modified_since is not None and last_modified is not None:
+		return to_epoch(last_modified) <= to_epoch(request.if_modified_since)
+	return False
+
+def is_precondition_failed(etag, last_modified, exists=True):
+
+	'''
+	Returns whether the If-Match/If-Unmodified-Since preconditions of a modifying request fail for the current
+	version of the resource (the modification must then be rejected with 412 Precondition Failed).
+	'''
+
+	if request.if_match:
+		if request.if_match.star_tag:
+			return not exists # "*" matches any current version, even without an ETag
+		return etag is None or not request.if_match.contains(etag) # Strong comparison
+	if request.if_unmodified_since is not None and last_modified is not None:
+		return to_epoch(last_modified) > to_epoch(request.if_unmodified_since)
+	return False
@@ -1,6 +1,51 @@
 try: import simplejson as json
 except ImportError: import json
-import time, datetime
+import base64, codecs, decimal, re, time, datetime, uuid
+
+_hour_epoch_cache = {} # {(<year>, <month>, <day>, <hour>): <Epoch time stamp of the start of the hour>}
+
+def datetime_to_epoch(obj):
+
+	'''
+	Returns the Epoch time stamp of a datetime (or date), same as int(time.mktime(obj.timetuple())) but much
+	faster for many datetimes: time.mktime is only called once per distinct hour, and cached. (Times inside
+	a half-hour daylight saving shift, as in Australia/Lord_Howe, may resolve to the other side of the shift.)
+	'''
+
+	if not isinstance(obj, datetime.datetime):
+		obj = datetime.datetime(obj.year, obj.month, obj.day)
+	hour_key = (obj.year, obj.month, obj.day, obj.hour)
+	hour_epoch = _hour_epoch_cache.get(hour_key)
+	if hour_epoch is None:
+		if len(_hour_epoch_cache) > 8192:
+			_hour_epoch_cache.clear()
+		hour_epoch = _hour_epoch_cache[hour_key] = int(time.mktime((obj.year, obj.month, obj.day, obj.hour, 0, 0, 0, 0, -1)))
+	return hour_epoch + obj.minute * 60 + obj.second
+
+def json_default(obj):
+
+	'''
+	Serializes the objects that JSON does not support natively into values it does. Shared by every JSON
+	serializer backend, so all of them produce the same data: Decimals are serialized as floats and bytes in
+	base64 (simplejson's exact Decimal and UTF-8 bytes output are turned off), and integers beyond 64 bits,
+	which orjson and ujson do not support, are serialized exactly by the json module instead. Only the
+	formatting differs (e.g. escaping of non-ASCII characters), and NaN and Infinity, which are not valid JSON:
+	orjson writes them as null, ujson and the json module as NaN/Infinity, simplejson (4.x) rejects them.
+	'''
+
+	if isinstance(obj, datetime.date):
+		# Serialize datetime (and date) objects to Epoch time stamps
+		# Timezone is assumed to be UTC
+		return datetime_to_epoch(obj)
+	if isinstance(obj, decimal.Decimal):
+		return float(obj)
+	if isinstance(obj, uuid.UUID):
+		return str(obj)
+	if isinstance(obj, (set, frozenset)):
+		return list(obj)
+	if isinstance(obj, (bytes, bytearray)):
+		return base64.b64encode(obj).decode('ascii')
+	raise TypeError('Object of type %s is not JSON serializable' % (type(obj).__name__))
 
 class FlexibleJSONEncoder(json.JSONEncoder):
 
@@ -9,11 +54,348 @@ class FlexibleJSONEncoder(json.JSONEncoder):
 	that the default encoder does not (e.g. datetime objects).
 	'''
 
+	def __init__(self, *args, **kwargs):
+		if json.__name__ == 'simplejson':
+			# Decimals and bytes through json_default (as floats and base64), as with the other backends
+			kwargs.setdefault('use_decimal', False)
+			kwargs.setdefault('encoding', None)
+		json.JSONEncoder.__init__(self, *args, **kwargs)
+
 	def default(self, obj):
-		if isinstance(obj, datetime.datetime):
-			# Serialize datetime objects to Epoch time stamps
-			# Timezone is assumed to be UTC
-			return int(time.mktime(obj.timetuple()))
-		return json.JSONEncoder.default(self, obj)
+		return json_default(obj)
+
+# JSON serializer backends. Each one serializes with json_default semantics, and raises ImportError when
+# constructed if it can not be used in this environment.
+
+class StdlibJSONSerializer(object):
+
+	'''
+	The json (or simplejson, if installed) module, with a single FlexibleJSONEncoder instance reused for all calls.
+	'''
+
+	name = 'json'
+
+	def __init__(self):
+		self.__encoder = FlexibleJSONEncoder()
+
+	def dumps(self, data):
+		return self.__encoder.encode(data)
+
+class SimplejsonSerializer(object):
+
+	'''
+	simplejson, which has C speedups.
+	'''
+
+	name = 'simplejson'
+
+	def __init__(self):
+		import simplejson
+		self.__encoder = simplejson.JSONEncoder(default=json_default, use_decimal=False, encoding=None) # Decimals and bytes through json_default, like the other backends
+
+	def dumps(self, data):
+		return self.__encoder.encode(data)
+
+class UjsonSerializer(object):
+
+	'''
+	ujson, much faster than the json module. Requires ujson 5.x or later (for the default hook).
+	'''
+
+	name = 'ujson'
+
+	def __init__(self):
+		import ujson
+		self.__dumps = ujson.dumps
+		try:
+			self.dumps({'probe': datetime.datetime.now()})
+		except TypeError:
+			raise ImportError('ujson version does not support the default hook')
+
+	def dumps(self, data):
+		try:
+			return self.__dumps(data, default=json_default, escape_forward_slashes=False, ensure_ascii=False)
+		except OverflowError:
+			return get_json_serializer('json').dumps(data) # Integers beyond 64 bits
+
+class OrjsonSerializer(object):
+
+	'''
+	orjson, the fastest backend. Returns bytes. Datetimes are passed through to json_default so they are
+	still serialized to Epoch time stamps.
+	'''
+
+	name = 'orjson'
+
+	def __init__(self):
+		import orjson
+		self.__dumps = orjson.dumps
+		self.__options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+		self.__encode_error = orjson.JSONEncodeError
+
+	def dumps(self, data):
+		try:
+			return self.__dumps(data, default=json_default, option=self.__options)
+		except self.__encode_error:
+			# Integers beyond 64 bits are not supported (objects json_default does not support fail again there)
+			return get_json_serializer('json').dumps(data).encode('utf-8')
+
+JSON_SERIALIZERS = {'orjson': OrjsonSerializer, # {<backend_name>: <serializer_class>}
+					'ujson': UjsonSerializer,
+					'simplejson': SimplejsonSerializer,
+					'json': StdlibJSONSerializer}
+
+JSON_SERIALIZER_PREFERENCE = ('orjson', 'ujson', 'simplejson', 'json') # Fastest first
+
+_json_serializer_instances = {}
+
+def get_json_serializer(name=None):
+
+	'''
+	Returns the (shared) instance of the named JSON serializer backend, or the fastest one available if no
+	name is given. Raises ImportError if the named backend is not available.
+	'''
+
+	for backend_name in ((name,) if name is not None else JSON_SERIALIZER_PREFERENCE):
+		serializer = _json_serializer_instances.get(backend_name)
+		if serializer is None:
+			try:
+				serializer = _json_serializer_instances[backend_name] = JSON_SERIALIZERS[backend_name]()
+			except ImportError:
+				if name is not None:
+					raise
+				continue
+		return serializer
+	raise ImportError('No JSON serializer backend available')
+
+def register_json_serializer(name, serializer_class, preferred=False):
+	# Adds a JSON serializer backend, optionally making it the first choice for get_json_serializer
+	global JSON_SERIALIZER_PREFERENCE
+	JSON_SERIALIZERS[name] = serializer_class
+	if preferred:
+		JSON_SERIALIZER_PREFERENCE = (name,) + tuple([n for n in JSON_SERIALIZER_PREFERENCE if n != name])
+
+json_serializer = get_json_serializer() # Picked once at import time
+
+def iter_json_array(items, dumps, chunk_size=64):
+
+	'''
+	Serializes an iterable of items into a JSON array piece by piece, yielding UTF-8 encoded chunks of up to
+	chunk_size items, so arbitrarily large arrays are serialized with constant memory use.
+	'''
+
+	chunk = [b'[']
+	separator = b''
+	for item in items:
+		serialized = dumps(item)
+		chunk.append(separator)
+		chunk.append(serialized if isinstance(serialized, bytes) else serialized.encode('utf-8'))
+		separator = b','
+		if len(chunk) >= chunk_size * 2:
+			yield b''.join(chunk)
+			chunk = []
+	chunk.append(b']')
+	yield b''.join(chunk)
+
+def iter_ndjson(items, dumps, chunk_size=64):
+
+	'''
+	Serializes an iterable of items into newline-delimited JSON (one item per line), yielding UTF-8 encoded
+	chunks of up to chunk_size items.
+	'''
+
+	chunk = []
+	for item in items:
+		serialized = dumps(item)
+		chunk.append(serialized if isinstance(serialized, bytes) else serialized.encode('utf-8'))
+		chunk.append(b'\n')
+		if len(chunk) >= chunk_size * 2:
+			yield b''.join(chunk)
+			chunk = []
+	if chunk:
+		yield b''.join(chunk)
+
+_json_decoder = json.JSONDecoder()
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+JSON_ARRAY_SEPARATOR = re.compile(r'[ \t\n\r]*([,\]])[ \t\n\r]*') # After an array item
+
+def load_json_stream(stream, chunk_size=65536):
+
+	'''
+	Decodes a JSON document from a file-like stream (e.g. a large request body). A top-level array is decoded
+	item by item as the stream is read, chunk_size bytes at a time, so the raw document is never held in memory
+	whole (only the decoded items are); any other document is read whole, then decoded.
+	'''
+
+	decoder = codecs.getincrementaldecoder('utf-8')()
+	raw_decode = _json_decoder.raw_decode
+	match_separator = JSON_ARRAY_SEPARATOR.match
+	buffer = ''
+	pos = 0
+	eof = False
+	while not eof and pos == len(buffer):
+		data = stream.read(chunk_size)
+		eof = not data
+		buffer += decoder.decode(data, final=eof)
+		pos = JSON_WHITESPACE.match(buffer).end()
+	if buffer[pos:pos + 1] != '[':
+		# Not an array, decode the whole document
+		return _json_decoder.decode(buffer + decoder.decode(stream.read(), final=True))
+
+	items = []
+	pos = JSON_WHITESPACE.match(buffer, pos + 1).end()
+	while True:
+		separator = None
+		if buffer.startswith(']', pos) and not items:
+			pos += 1 # Empty array
+			break
+		try:
+			item, end = raw_decode(buffer, pos)
+			separator = match_separator(buffer, end) # Not found if the item (e.g. a number) may continue in the next chunk
+		except ValueError:
+			pass
+		if separator is None:
+			if eof:
+				raise ValueError('Invalid JSON array item at character %d' % (pos))
+			# Incomplete item, read more (at least as much as already buffered, so large items are not decoded over and over)
+			data = stream.read(max(chunk_size, len(buffer) - pos))
+			eof = not data
+			buffer = buffer[pos:] + decoder.decode(data, final=eof)
+			pos = JSON_WHITESPACE.match(buffer).end()
+			continue
+		items.append(item)
+		pos = separator.end()
+		if separator.group(1) == ']':
+			break
+	if buffer[pos:].strip() or decoder.decode(stream.read(), final=True).strip():
+		raise ValueError('Extra data after the JSON array')
+	return items
+
+# Data formats of response (and request) bodies, negotiated by ResponseFactory with the Accept (and Content-Type)
+# header. Each format has its mimetypes (the first one is sent as Content-Type) and dumps/loads/iter_dumps
+# methods, a load method decoding (large) request bodies incrementally from a stream, and raises ImportError when
+# constructed if its library is not installed.
+
+class JSONFormat(object):
+
+	name = 'json'
+	mimetypes = ('application/json', 'application/x-ndjson') # NDJSON is JSON too, used for streamed bodies
+	content_type = 'application/json; charset=utf-8'
+
+	def __init__(self):
+		self.dumps = json_serializer.dumps
+
+	def loads(self, data):
+		return json.loads(data.decode('utf-8') if isinstance(data, bytes) else data)
+
+	def load(self, stream):
+		return load_json_stream(stream)
+
+	def iter_dumps(self, items):
+		return iter_json_array(items, self.dumps)
+
+class MsgpackFormat(object):
+
+	'''
+	MessagePack, compact and much cheaper to encode/decode than JSON. bytes are sent as binary, other types
+	JSON does not support as json_default serializes them. Streamed bodies are collected before they are
+	serialized (a MessagePack array starts with its length).
+	'''
+
+	name = 'msgpack'
+	mimetypes = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+	content_type = 'application/msgpack'
+
+	def __init__(self):
+		import msgpack
+		self.__packb = msgpack.packb
+		self.__unpackb = msgpack.unpackb
+		self.__unpacker_class = msgpack.Unpacker
+		self.__out_of_data = msgpack.OutOfData
+
+	def dumps(self, data):
+		return self.__packb(data, default=json_default, use_bin_type=True)
+
+	def loads(self, data):
+		return self.__unpackb(data, raw=False)
+
+	def load(self, stream):
+		unpacker = self.__unpacker_class(stream, raw=False)
+		data = unpacker.unpack()
+		try:
+			unpacker.unpack()
+		except self.__out_of_data:
+			return data
+		raise ValueError('Extra data after the MessagePack object')
+
+	def iter_dumps(self, items):
+		yield self.dumps(list(items))
+
+class CBORFormat(object):
+
+	'''
+	CBOR (RFC 8949), using cbor2. Datetimes are sent as Epoch time stamps (naive ones are assumed to be UTC),
+	other types CBOR does not support as json_default serializes them. Streamed bodies are serialized item by
+	item as an indefinite-length array.
+	'''
+
+	name = 'cbor'
+	mimetypes = ('application/cbor',)
+	content_type = 'application/cbor'
+
+	def __init__(self):
+		import cbor2
+		self.__dumps = cbor2.dumps
+		self.__loads = cbor2.loads
+		self.__load = cbor2.load
+		self.__timezone = datetime.timezone.utc
+
+	def dumps(self, data):
+		return self.__dumps(data, default=self.__default, timezone=self.__timezone, datetime_as_timestamp=True)
+
+	def __default(self, encoder, obj):
+		encoder.encode(json_default(obj))
+
+	def loads(self, data):
+		return self.__loads(data)
+
+	def load(self, stream):
+		return self.__load(stream)
+
+	def iter_dumps(self, items, chunk_size=64):
+		chunk = [b'\x9f'] # Start of an indefinite-length array
+		for item in items:
+			chunk.append(self.dumps(item))
+			if len(chunk) >= chunk_size:
+				yield b''.join(chunk)
+				chunk = []
+		chunk.append(b'\xff') # End of the array
+		yield b''.join(chunk)
+
+DATA_FORMATS = {'json': JSONFormat, # {<format_name>: <format_class>}
+				'msgpack': MsgpackFormat,
+				'cbor': CBORFormat}
+
+DATA_FORMAT_PREFERENCE = ('json', 'msgpack', 'cbor') # Used in this order when the client accepts several equally (e.g. "*/*")
+
+def get_data_formats():
+
+	'''
+	Returns instances of the available data formats, in order of preference (JSON is always available).
+	'''
+
+	data_formats = []
+	for name in DATA_FORMAT_PREFERENCE:
+		try:
+			data_formats.append(DATA_FORMATS[name]())
+		except ImportError:
+			continue
+	return data_formats
+
+def register_data_format(name, format_class):
+	# Adds a data format (least preferred); takes effect for ResponseFactory instances created afterwards
+	global DATA_FORMAT_PREFERENCE
+	DATA_FORMATS[name] = format_class
+	DATA_FORMAT_PREFERENCE = tuple([n for n in DATA_FORMAT_PREFERENCE if n != name]) + (name,)
 
-# Other data serializers can be added here to provide more return data formats for the API
\ No newline at end of file
+# Other data serializers can be added here to provide more return data formats for the API
@@ -1,8 +1,10 @@
-try: import simplejson as json
-except ImportError: import json
 import socket, struct
 from flask import request, Response
-from flask_rest.utils.data_utils import FlexibleJSONEncoder
+from flask_rest.utils.data_utils import json_serializer, iter_json_array, iter_ndjson, get_data_formats
+from flask_rest.utils.compression import ResponseCompressor
+from flask_rest.utils.ip_access import client_address_resolver
+try: from flask import stream_with_context
+except ImportError: stream_with_context = None # Flask < 0.9, streamed items are generated without the request context
 
 class ResponseFactory(object):
 
@@ -18,6 +20,7 @@ class ResponseFactory(object):
 									'CREATED': (201, 'Created'),
 									'ACCEPTED': (202, 'Accepted'),
 									'DELETED': (204, ''), # Do not send body
+									'NOT_MODIFIED': (304, ''), # Do not send body
 									'BAD_REQUEST': (400, 'Bad Request'),
 									'UNAUTHORIZED': (401, 'Unauthorized'),
 									'FORBIDDEN': (403, 'Forbidden'),
@@ -26,23 +29,46 @@ class ResponseFactory(object):
 									'NOT_ACCEPTABLE': (406, 'Not Acceptable'),
 									'CONFLICT': (409, 'Conflict'),
 									'GONE': (410, 'Gone'),
+									'PRECONDITION_FAILED': (412, 'Precondition Failed'),
 									'REQUEST_ENTITY_TOO_LARGE': (413, 'Request Entity Too Large'),
 									'INTERNAL_ERROR': (500, 'Internal Server Error'),
 									'NOT_IMPLEMENTED': (501, 'Not Implemented'),
 									'THROTTLED': (503, 'Service Unavailable')}
 
+		self.__response_names = None # {<response_code>: <response_name>}, built on first use
+
+		# Serializer for JSON response data, the fastest backend available (see flask_rest.utils.data_utils)
+		self.json_serializer = json_serializer
+
+		# Formats of structured (list, dict, tuple) response data, negotiated with the Accept header (see flask_rest.utils.data_utils)
+		self.data_formats = get_data_formats() # In order of preference, JSON first
+		self.__format_mimetypes = [mimetype for data_format in self.data_formats for mimetype in data_format.mimetypes]
+		self.__formats_by_mimetype = dict([(mimetype, data_format) for data_format in self.data_formats for mimetype in data_format.mimetypes])
+
+		# Compression of large response bodies, negotiated per request (set to None to turn it off, e.g. if done by a front proxy)
+		self.compressor = ResponseCompressor()
+
 		# Content type strs used
 		self.RESPONSE_CONTENT_TYPES = {'json': 'application/json; charset=utf-8',
+									'ndjson': 'application/x-ndjson; charset=utf-8',
 									'plaintext': 'text/plain; charset=utf-8'}
 
 	def get_response(self, response_name, data=None, headers={}):
 
 		'''
 		Generates a response object that can be returned to the client, based on the response name.
-		Data that can be serialized are automatically serialized using JSON by default. Other serializers
-		can be added to flask_rest.utils.data_utils and imported here to provide more response formats.
+		Data that can be serialized are automatically serialized using JSON by default, or MessagePack or CBOR
+		if the client prefers them (per Accept) and their libraries are installed. Other data formats can be
+		added to flask_rest.utils.data_utils.
 
 		Custom headers passed in are also set to the response.
+
+		Data can also be an iterator (e.g. a generator) of items, in which case the response body is streamed
+		(chunked) as a JSON array, or as newline-delimited JSON if the client prefers application/x-ndjson (or
+		in the negotiated data format), so large results never need to be held in memory at once.
+
+		Bodies of at least compressor.min_size bytes (and streamed bodies) are compressed if the client accepts
+		gzip or brotli (see flask_rest.utils.compression).
 		'''
 
 		status, status_name = self.HTTP_RESPONSE_CODES.get(response_name, (500, 'Internal Server Error'))
@@ -51,15 +77,94 @@ class ResponseFactory(object):
 			content_type = self.RESPONSE_CONTENT_TYPES.get('plaintext')
 		elif isinstance(data, str):
 			content_type = self.RESPONSE_CONTENT_TYPES.get('plaintext')
+		elif not isinstance(data, (list, dict, tuple)) and hasattr(data, '__next__'):
+			return self.get_stream_response(status, data, headers)
 		else:
-			content_type = self.RESPONSE_CONTENT_TYPES.get('json')
-
-		# Serialized list, dict, and tuple data types
-		if isinstance(data, (list, dict, tuple)):
-			data = json.dumps(data, cls=FlexibleJSONEncoder)
+			# Serialized list, dict, and tuple data types, in the negotiated data format (JSON if none is acceptable)
+			data_format = self.get_response_format()
+			if data_format is None or data_format.name == 'json':
+				data = self.json_serializer.dumps(data)
+				content_type = self.RESPONSE_CONTENT_TYPES.get('json')
+			else:
+				data = data_format.dumps(data)
+				content_type = data_format.content_type
+			headers = self.__add_vary(headers, 'Accept') # Negotiated (even with JSON only, between JSON and NDJSON for streams, or 406)
+
+		if self.compressor is not None and len(data) >= self.compressor.min_size:
+			encoding = self.compressor.get_encoding()
+			headers = self.__get_compression_headers(headers, encoding)
+			if encoding is not None:
+				data = self.compressor.compress(data if isinstance(data, bytes) else data.encode('utf-8'), encoding)
 		response = Response(response=data, status=status, headers=headers, mimetype=content_type, content_type=content_type, direct_passthrough=False)
 		return response
 
+	def get_stream_response(self, status, items, headers={}):
+
+		'''
+		Generates a streamed response with a JSON array (or NDJSON, or negotiated data format) body, serialized
+		while it is being sent.
+		'''
+
+		mimetype = self.get_response_mimetype()
+		data_format = self.get_data_format(mimetype)
+		headers = self.__add_vary(headers, 'Accept')
+		if data_format is not None and data_format.name != 'json':
+			content_type = data_format.content_type
+			body = data_format.iter_dumps(items)
+		elif mimetype == 'application/x-ndjson':
+			content_type = self.RESPONSE_CONTENT_TYPES.get('ndjson')
+			body = iter_ndjson(items, self.json_serializer.dumps)
+		else:
+			content_type = self.RESPONSE_CONTENT_TYPES.get('json')
+			body = iter_json_array(items, self.json_serializer.dumps)
+		if stream_with_context is not None:
+			body = stream_with_context(body) # Keep the request context available to the handler's generator
+		if self.compressor is not None:
+			encoding = self.compressor.get_encoding()
+			headers = self.__get_compression_headers(headers, encoding)
+			if encoding is not None:
+				body = self.compressor.iter_compress(body, encoding)
+		return Response(response=body, status=status, headers=headers, mimetype=content_type, content_type=content_type, direct_passthrough=True)
+
+	def get_data_format(self, mimetype):
+		# Returns the data format of a mimetype, or None if it is not one of the data formats
+		return self.__formats_by_mimetype.get(mimetype)
+
+	def get_response_format(self):
+
+		'''
+		Returns the data format to serialize structured response data in for the current request, negotiated
+		with its Accept header, or None if the client accepts none of the data formats.
+		'''
+
+		return self.__formats_by_mimetype.get(self.get_response_mimetype())
+
+	def get_response_mimetype(self):
+
+		'''
+		Returns the mimetype negotiated with the Accept header of the current request among the mimetypes of the
+		data formats (e.g. application/x-ndjson, for streamed JSON bodies), or None if the client accepts none of
+		them. Responses with structured data vary by it, e.g. it is part of the response cache keys.
+		'''
+
+		if not request.accept_mimetypes:
+			return self.__format_mimetypes[0] # No preference
+		return request.accept_mimetypes.best_match(self.__format_mimetypes)
+
+	def __add_vary(self, headers, request_header_name):
+		# Returns a copy of the headers, with the request header added to Vary (the response body depends on it)
+		headers = dict(headers)
+		vary = headers.get('Vary')
+		headers['Vary'] = vary + ', ' + request_header_name if vary else request_header_name
+		return headers
+
+	def __get_compression_headers(self, headers, encoding):
+		# Returns a copy of the headers with Vary: Accept-Encoding, and the Content-Encoding used
+		headers = self.__add_vary(headers, 'Accept-Encoding')
+		if encoding is not None:
+			headers['Content-Encoding'] = encoding
+		return headers
+
 	def get_response_code(self, response_name):
 
 		'''
@@ -69,6 +174,17 @@ class ResponseFactory(object):
 
 		return self.HTTP_RESPONSE_CODES.get(response_name, (-1, ''))[0]
 
+	def get_response_name(self, response_code):
+
+		'''
+		Returns the response name that matches the response code; returns INTERNAL_ERROR if the response
+		code is not a recognized one.
+		'''
+
+		if self.__response_names is None:
+			self.__response_names = dict([(code, name) for name, (code, txt) in self.HTTP_RESPONSE_CODES.items()])
+		return self.__response_names.get(response_code, 'INTERNAL_ERROR')
+
 rf = ResponseFactory()
 
 def ipv4_str_to_int(ipv4_str):
@@ -79,13 +195,59 @@ def ipv4_int_to_str(ipv4_int):
 	# Returns the dotted string representation of the integer representation of an IPv4 address
 	return socket.inet_ntoa(struct.pack('!L', ipv4_int))
 
-def get_request_data_dict():
-	# Returns a dictionary of parsed request data (for logging purposes). Can be customized here
-	d = {'request_url': request.base_url,
-		'request_method': {'GET': 0, 'POST': 1, 'PUT': 2, 'PATCH': 3, 'DELETE': 4, 'HEAD': 5, 'OPTIONS': 6}.get(request.method.upper(), -1),
-		'extra_arg': request.path,
-		'remote_address': request.headers.get('X-Forwarded-For', request.remote_addr).split(',')[0].strip(),
-		'request_data': json.dumps(request.json) if (len(request.data) > 0 and request.json is not None) else '',
-		'request_query_str_data': json.dumps(request.args.to_dict(flat=False)),
-		}
-	return d
\ No newline at end of file
+REMOTE_ADDRESS_KEY = 'flask_rest.remote_address' # WSGI environ key of the resolved client address
+
+def get_remote_address():
+	# Returns the address of the client making the current request, through the trusted proxies (see flask_rest.utils.ip_access.ClientAddressResolver); resolved once per request
+	environ = request.environ
+	remote_address = environ.get(REMOTE_ADDRESS_KEY)
+	if remote_address is None:
+		remote_address = environ[REMOTE_ADDRESS_KEY] = client_address_resolver.resolve(environ.get('REMOTE_ADDR'), environ.get('HTTP_X_FORWARDED_FOR'))
+	return remote_address
+
+class RequestDataError(ValueError):
+	pass
+
+REQUEST_DATA_KEY = 'flask_rest.request_data' # WSGI environ key of the decoded request body, so it is only decoded once per request
+STREAM_DECODE_MIN_SIZE = 4194304 # Request bodies this large (4MB, half of the app's MAX_CONTENT_LENGTH) are decoded as they are read
+
+def get_request_data():
+
+	'''
+	Returns the decoded body of the current request, in the data format of its Content-Type (JSON, or MessagePack
+	or CBOR if installed), or None if the request has no body. Raises RequestDataError if the body can not be
+	decoded, which RESTView answers with BAD_REQUEST. The body is decoded on the first call only, later calls (e.g.
+	by the handler, after RESTView validated the body) return the same data. Large bodies (STREAM_DECODE_MIN_SIZE)
+	are decoded incrementally from the request stream, without reading the raw body into memory whole (it is not
+	available from request.get_data afterwards).
+	'''
+
+	environ = request.environ
+	if REQUEST_DATA_KEY in environ:
+		return environ[REQUEST_DATA_KEY]
+	content_length = request.content_length
+	if content_length is not None and content_length >= STREAM_DECODE_MIN_SIZE:
+		data_format = get_request_data_format()
+		try:
+			data = data_format.load(request.stream)
+		except Exception:
+			raise RequestDataError('Request body is not valid %s' % (data_format.name))
+	else:
+		body = request.get_data(cache=True)
+		if not body:
+			data = None
+		else:
+			data_format = get_request_data_format()
+			try:
+				data = data_format.loads(body)
+			except Exception:
+				raise RequestDataError('Request body is not valid %s' % (data_format.name))
+	environ[REQUEST_DATA_KEY] = data
+	return data
+
+def get_request_data_format():
+	# Returns the data format of the current request's body, from its Content-Type
+	data_format = rf.get_data_format(request.mimetype)
+	if data_format is None:
+		raise RequestDataError('Unsupported request body content type: %s' % (request.mimetype or 'none'))
+	return data_format
@@ -0,0 +1,203 @@
+import bisect, os, socket, threading, time
+
+def parse_address(address_str):
+
+	'''
+	Returns the (<IP version>, <int>) representation of an IPv4 or IPv6 address string, or None if it is not a
+	valid address. IPv4-mapped IPv6 addresses (e.g. "::ffff:10.0.0.1", from dual-stack sockets) are IPv4.
+	'''
+
+	try:
+		if ':' not in address_str:
+			return (4, int.from_bytes(socket.inet_pton(socket.AF_INET, address_str), 'big'))
+		address = int.from_bytes(socket.inet_pton(socket.AF_INET6, address_str.split('%', 1)[0]), 'big') # Without the zone (e.g. "%eth0")
+	except (OSError, ValueError, TypeError):
+		return None
+	if address >> 32 == 0xffff:
+		return (4, address & 0xffffffff)
+	return (6, address)
+
+def parse_network(network_str):
+	# Returns the (<IP version>, <first address int>, <last address int>) of a network string in CIDR notation (e.g. "10.0.0.0/8", "2001:db8::/32") or of a single address, raises ValueError if invalid
+	address_str, separator, prefix_str = network_str.strip().partition('/')
+	address = parse_address(address_str)
+	if address is None:
+		raise ValueError('Invalid IP address: %s' % (address_str))
+	version, address = address
+	bits = 32 if version == 4 else 128
+	prefix_len = int(prefix_str) if separator else bits
+	if version == 4 and ':' in address_str:
+		prefix_len = (prefix_len if separator else 128) - 96 # IPv4-mapped network, e.g. "::ffff:10.0.0.0/104"
+	if not 0 <= prefix_len <= bits:
+		raise ValueError('Invalid network prefix length: %s' % (network_str))
+	host_mask = (1 << (bits - prefix_len)) - 1
+	first = address & ~host_mask
+	return (version, first, first | host_mask)
+
+class IPRangeIndex(object):
+
+	'''
+	An index of IP networks (IPv4 and IPv6) with a value each, compiled into sorted arrays of disjoint address
+	intervals, so looking up an address is a binary search (O(log n)) whatever the number of networks (tens of
+	thousands are fine). Where networks are nested, the most specific one's value applies (e.g. a single
+	address denied in an allowed network); between identical networks, the last one given.
+
+		networks: iterable of (<network str>, <value>)
+	'''
+
+	def __init__(self, networks=()):
+		intervals = {4: [], 6: []}
+		for order, (network_str, value) in enumerate(networks):
+			version, first, last = parse_network(network_str)
+			intervals[version].append((first, -last, order, last, value))
+		self.__tables = dict([(version, self.__compile(version_intervals)) for version, version_intervals in intervals.items()])
+		self.size = sum([len(version_intervals) for version_intervals in intervals.values()])
+
+	def __compile(self, intervals):
+		# Returns (<interval starts>, <interval ends>, <values>) of the disjoint intervals covering the (possibly nested) networks
+		intervals.sort() # By first address, outer networks before the networks nested in them
+		segments = [] # [[<start>, <end>, <value>]], in address order
+		def add_segment(start, end, value):
+			if start > end:
+				return
+			if segments and segments[-1][1] + 1 == start and segments[-1][2] == value:
+				segments[-1][1] = end # Adjacent, same value: merged
+			else:
+				segments.append([start, end, value])
+		stack = [] # Networks containing the current position, innermost last: [(<last address>, <value>)]
+		position = 0
+		for first, negative_last, order, last, value in intervals:
+			while stack and stack[-1][0] < first:
+				# Networks ending before this one: the rest of them up to their end
+				outer_last, outer_value = stack.pop()
+				add_segment(position, outer_last, outer_value)
+				position = max(position, outer_last + 1)
+			if stack:
+				add_segment(position, first - 1, stack[-1][1]) # The enclosing network, up to this one
+			stack.append((last, value))
+			position = first
+		while stack:
+			outer_last, outer_value = stack.pop()
+			add_segment(position, outer_last, outer_value)
+			position = max(position, outer_last + 1)
+		return ([segment[0] for segment in segments], [segment[1] for segment in segments], [segment[2] for segment in segments])
+
+	def lookup(self, address, default=None):
+		# Returns the value of the most specific network containing the address (a (<IP version>, <int>) tuple, see parse_address), or default
+		starts, ends, values = self.__tables[address[0]]
+		i = bisect.bisect_right(starts, address[1]) - 1
+		if i >= 0 and address[1] <= ends[i]:
+			return values[i]
+		return default
+
+class ClientAddressResolver(object):
+
+	'''
+	Resolves the address of the client making a request, through the proxies it went through: starting from
+	the address of the peer (REMOTE_ADDR), as long as that address is a trusted proxy, the address it forwarded
+	the request for (the last one in X-Forwarded-For it did not add itself) is taken instead. So clients can not
+	spoof their address with an X-Forwarded-For header of their own, unlike with its first address.
+
+		trusted_proxies: networks (CIDR notation) of the proxies in front of the app, defaults to the
+						FLASK_REST_TRUSTED_PROXIES environment variable (comma separated)
+	'''
+
+	def __init__(self, trusted_proxies=None):
+		if trusted_proxies is None:
+			trusted_proxies = [network for network in os.environ.get('FLASK_REST_TRUSTED_PROXIES', '').split(',') if network.strip()]
+		self.configure(trusted_proxies)
+
+	def configure(self, trusted_proxies):
+		self.trusted_proxies = IPRangeIndex([(network, True) for network in trusted_proxies])
+
+	def resolve(self, remote_addr, forwarded_for=None):
+		# Returns the client's address str, from the peer's address and the X-Forwarded-For header (if any)
+		address_str = remote_addr or ''
+		if not forwarded_for or not self.trusted_proxies.size:
+			return address_str
+		hops = forwarded_for.split(',')
+		while hops:
+			address = parse_address(address_str)
+			if address is None or not self.trusted_proxies.lookup(address, False):
+				break
+			address_str = hops.pop().strip()
+		return address_str
+
+client_address_resolver = ClientAddressResolver()
+
+class IPAccessList(object):
+
+	'''
+	Network-based access control: allow and deny rules (IPv4 and IPv6 networks in CIDR notation, or addresses),
+	compiled into an IPRangeIndex. The most specific rule matching a client's address applies. Clients no rule
+	matches are allowed, unless there are allow rules (then only the networks allowed can access).
+
+	The rules can be loaded from a file (path, one "allow <network>" or "deny <network>" per line, "#" starts a
+	comment), which is checked for changes every reload_interval seconds and reloaded without a restart. If
+	the reloaded file is invalid, the rules in use are kept.
+	'''
+
+	def __init__(self, allow=(), deny=(), path=None, reload_interval=5.0):
+		self.path = path
+		self.reload_interval = reload_interval
+		self.__lock = threading.Lock()
+		self.__file_mtime = None
+		self.__next_check = 0.0
+		self.set_rules(allow, deny)
+		if path is not None:
+			self.reload()
+
+	@property
+	def enabled(self):
+		return self.__rules is not None or self.path is not None
+
+	def set_rules(self, allow=(), deny=()):
+		rules = [(network, True) for network in allow] + [(network, False) for network in deny]
+		index = IPRangeIndex(rules)
+		self.__rules = (index, not allow) if rules else None # (<index>, <default, for addresses no rule matches>)
+
+	def reload(self):
+		# Loads the rules file if it changed since it was loaded, returns whether it was (re)loaded
+		try:
+			mtime = os.stat(self.path).st_mtime
+		except OSError:
+			return False # Missing (e.g. being replaced), keep the rules in use
+		if mtime == self.__file_mtime:
+			return False
+		allow, deny = [], []
+		with open(self.path) as f:
+			for line_number, line in enumerate(f, 1):
+				line = line.split('#', 1)[0].strip()
+				if not line:
+					continue
+				action, separator, network = line.partition(' ')
+				if action not in ('allow', 'deny') or not network.strip():
+					raise ValueError('%s:%d: expected "allow <network>" or "deny <network>"' % (self.path, line_number))
+				(allow if action == 'allow' else deny).append(network.strip())
+		self.set_rules(allow, deny)
+		self.__file_mtime = mtime
+		return True
+
+	def is_allowed(self, address_str):
+		# Returns whether the client address str may access the resource
+		if self.path is not None and time.time() >= self.__next_check and self.__lock.acquire(False):
+			# One request per interval checks the file, the others use the rules in use meanwhile
+			try:
+				self.__next_check = time.time() + self.reload_interval
+				try:
+					self.reload()
+				except (OSError, ValueError):
+					pass # Invalid file, keep the rules in use
+			finally:
+				self.__lock.release()
+		rules = self.__rules
+		if rules is None:
+			return True
+		index, default = rules
+		address = parse_address(address_str)
+		if address is None:
+			return default
+		return index.lookup(address, default)
+
+# Access list of all REST resources, the rules file is set with the FLASK_REST_IP_ACCESS_FILE environment variable (off if not set)
+ip_access_list = IPAccessList(path=os.environ.get('FLASK_REST_IP_ACCESS_FILE') or None)
@@ -0,0 +1,278 @@
+try: import simplejson as json
+except ImportError: import json
+try: import fcntl
+except ImportError: fcntl = None
+import atexit, errno, glob, os, threading, time, uuid
+
+class MetricsShard(object):
+
+	'''
+	The metrics recorded by one thread. Only its own thread writes to it, so recording needs no locking.
+	'''
+
+	__slots__ = ('request_counts', 'histograms')
+
+	def __init__(self):
+		self.request_counts = {} # {(<endpoint>, <method>, <response_name>): <count>}
+		self.histograms = {} # {(<endpoint>, <method>, <phase>): [<bucket_0_count>, ..., <+Inf_count>, <sum>]}
+
+class Metrics(object):
+
+	'''
+	Request metrics: counts of requests per endpoint, method and response name, and latency histograms (fixed
+	buckets) per endpoint, method and request processing phase ("auth", "throttle", "handler", "serialization"
+	and "total"). Recorded by RESTView for every request, and exported in the Prometheus text format at /metrics.
+
+	Each thread records into its own shard, and shards are only merged when the metrics are exported. With
+	multiple worker processes, set the FLASK_REST_METRICS_DIR environment variable (or the metrics_dir attribute)
+	to a directory shared by the workers: each worker then periodically writes its metrics to a file there, and
+	all files are merged on export, so any worker can serve /metrics for the whole server. Files are named by a
+	process ID unique to each worker (so a recycled worker's process ID being reused does not overwrite its
+	file), and are written one last time when the worker exits (see flush_at_exit). The files of the processes
+	which have exited are then folded into a single file by the other processes (see compact).
+	'''
+
+	LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0) # In seconds
+
+	PHASES = ('auth', 'throttle', 'handler', 'serialization', 'total')
+
+	COMPACTED_FILE_NAME = 'metrics-compacted.json'
+
+	def __init__(self, metrics_dir=None, flush_interval=5.0):
+		self.metrics_dir = metrics_dir if metrics_dir is not None else os.environ.get('FLASK_REST_METRICS_DIR')
+		self.flush_interval = flush_interval
+		self.__reset()
+		if hasattr(os, 'register_at_fork'):
+			# Worker processes start with empty metrics (and their own flush thread), the parent's are not theirs
+			os.register_at_fork(after_in_child=self.__reset)
+		atexit.register(self.flush_at_exit)
+
+	def __reset(self):
+		self.__lock = threading.Lock()
+		self.__local = threading.local()
+		self.__shards = [] # [(<thread>, <MetricsShard>)]
+		self.__retired_shard = MetricsShard() # Metrics of the threads that have exited
+		self.__flusher = None
+		self.__process_id = '%d-%s' % (os.getpid(), uuid.uuid4().hex[:12]) # Names the metrics file of this process
+
+	def __get_shard(self):
+		shard = getattr(self.__local, 'shard', None)
+		if shard is None:
+			shard = self.__local.shard = MetricsShard()
+			with self.__lock:
+				if len(self.__shards) >= 64:
+					self.__retire_shards()
+				self.__shards.append((threading.current_thread(), shard))
+				if self.metrics_dir and self.__flusher is None:
+					self.__flusher = threading.Thread(target=self.__flush_periodically, name='MetricsFlusher')
+					self.__flusher.daemon = True
+					self.__flusher.start()
+		return shard
+
+	def observe_request(self, endpoint, method, response_name, phase_times):
+
+		'''
+		Records a handled request. phase_times is a sequence of the durations (in seconds) of the PHASES, in the
+		same order, with None for phases the request did not get to.
+		'''
+
+		shard = self.__get_shard()
+		count_key = (endpoint, method, response_name)
+		shard.request_counts[count_key] = shard.request_counts.get(count_key, 0) + 1
+		buckets = self.LATENCY_BUCKETS
+		for phase, duration in zip(self.PHASES, phase_times):
+			if duration is None:
+				continue
+			histogram_key = (endpoint, method, phase)
+			histogram = shard.histograms.get(histogram_key)
+			if histogram is None:
+				histogram = shard.histograms[histogram_key] = [0] * (len(buckets) + 2)
+			i = 0
+			while i < len(buckets) and duration > buckets[i]:
+				i += 1
+			histogram[i] += 1 # Counted in its own bucket only, buckets are made cumulative on export
+			histogram[-1] += duration
+
+	def __retire_shards(self):
+		# Folds the shards of exited threads into the retired shard (servers starting a thread per request would pile them up)
+		live_shards = []
+		for thread, shard in self.__shards:
+			if thread.is_alive():
+				live_shards.append((thread, shard))
+			else:
+				self.__merge(self.__retired_shard.request_counts, self.__retired_shard.histograms, shard.request_counts, shard.histograms)
+		self.__shards = live_shards
+
+	def get_process_metrics(self):
+		# Returns the metrics of this process, merged from all thread shards, as (<request_counts>, <histograms>)
+		request_counts, histograms = {}, {}
+		with self.__lock:
+			shards = [shard for thread, shard in self.__shards]
+			self.__merge(request_counts, histograms, self.__retired_shard.request_counts, self.__retired_shard.histograms)
+		for shard in shards:
+			self.__merge(request_counts, histograms, shard.request_counts.copy(), shard.histograms.copy())
+		return (request_counts, histograms)
+
+	def __merge(self, request_counts, histograms, other_request_counts, other_histograms):
+		for key, count in other_request_counts.items():
+			request_counts[key] = request_counts.get(key, 0) + count
+		for key, histogram in other_histograms.items():
+			merged = histograms.get(key)
+			if merged is None:
+				histograms[key] = list(histogram)
+			else:
+				for i in range(len(histogram)):
+					merged[i] += histogram[i]
+
+	def flush(self):
+
+		'''
+		Writes the metrics of this process to its file in the metrics directory (atomically replaced).
+		'''
+
+		request_counts, histograms = self.get_process_metrics()
+		self.__write_file(os.path.join(self.metrics_dir, 'metrics-%s.json' % (self.__process_id)), request_counts, histograms)
+
+	def compact(self):
+
+		'''
+		Folds the metrics files of the processes which have exited (e.g. recycled workers) into a single file, and
+		removes them, so the metrics directory does not grow with every worker process ever started. Files are only
+		folded once not written for 3 flush intervals, and under a file lock (so no file is folded twice).
+		'''
+
+		if fcntl is None:
+			return
+		stale_time = time.time() - 3 * self.flush_interval
+		with open(os.path.join(self.metrics_dir, 'metrics.lock'), 'a') as lock_file:
+			fcntl.flock(lock_file, fcntl.LOCK_EX) # Released when closed
+			compacted_path = os.path.join(self.metrics_dir, self.COMPACTED_FILE_NAME)
+			compacted = self.__read_file(compacted_path) or {'request_counts': [], 'histograms': [], 'files': []}
+			request_counts, histograms = self.__load(compacted)
+			# Files already folded, but whose removal failed, are only removed
+			folded_names = [name for name in compacted['files'] if os.path.exists(os.path.join(self.metrics_dir, name))]
+			new_folded_names = []
+			for path in glob.glob(os.path.join(self.metrics_dir, 'metrics-*.json')):
+				name = os.path.basename(path)
+				if name == self.COMPACTED_FILE_NAME or name in folded_names or self.__is_process_alive(name):
+					continue
+				try:
+					if os.path.getmtime(path) > stale_time:
+						continue
+				except OSError:
+					continue
+				data = self.__read_file(path)
+				if data is not None:
+					self.__merge(request_counts, histograms, *self.__load(data))
+					new_folded_names.append(name)
+			if new_folded_names:
+				self.__write_file(compacted_path, request_counts, histograms, files=folded_names + new_folded_names)
+			for name in folded_names + new_folded_names:
+				try:
+					os.remove(os.path.join(self.metrics_dir, name))
+				except OSError:
+					pass # Still listed in the compacted file, so not exported twice
+
+	def __is_process_alive(self, name):
+		# Returns whether the process whose metrics file has this name (metrics-<pid>-<unique ID>.json) is running
+		try:
+			pid = int(name.split('-')[1])
+		except (IndexError, ValueError):
+			return True # Not a process' metrics file
+		try:
+			os.kill(pid, 0)
+		except OSError as e:
+			return e.errno != errno.ESRCH
+		return True
+
+	def __read_file(self, path):
+		try:
+			with open(path) as f:
+				return json.load(f)
+		except (IOError, OSError, ValueError):
+			return None # Removed or being replaced
+
+	def __write_file(self, path, request_counts, histograms, **extra):
+		data = {'request_counts': [list(key) + [count] for key, count in request_counts.items()],
+				'histograms': [list(key) + [histogram] for key, histogram in histograms.items()]}
+		data.update(extra)
+		with open(path + '.tmp', 'w') as f:
+			json.dump(data, f)
+		os.rename(path + '.tmp', path)
+
+	def __load(self, data):
+		# Returns the metrics of a metrics file's data as (<request_counts>, <histograms>)
+		return (dict([(tuple(row[:3]), row[3]) for row in data['request_counts']]),
+				dict([(tuple(row[:3]), row[3]) for row in data['histograms']]))
+
+	def flush_at_exit(self):
+		# Writes the last metrics of an exiting process; registered with atexit, called by processes exiting without it (see flask_rest.utils.prefork)
+		if self.metrics_dir and self.__shards:
+			try:
+				self.flush()
+			except (IOError, OSError):
+				pass
+
+	def __flush_periodically(self):
+		while True:
+			time.sleep(self.flush_interval)
+			try:
+				self.flush()
+				self.compact()
+			except (IOError, OSError):
+				pass # Metrics directory not writable (yet), retried on the next flush
+
+	def get_all_metrics(self):
+		# Returns the metrics of all worker processes (or only this one, without a metrics directory)
+		if not self.metrics_dir:
+			return self.get_process_metrics()
+		try:
+			self.flush() # Export this process' latest metrics, other workers' are at most flush_interval old
+		except (IOError, OSError):
+			pass # Metrics directory not writable, the files already there are still exported
+		files_data = {}
+		for path in glob.glob(os.path.join(self.metrics_dir, 'metrics-*.json')):
+			data = self.__read_file(path)
+			if data is not None:
+				files_data[os.path.basename(path)] = data
+		# Read last: the files it lists were folded into it, whether they were read before being removed or not
+		compacted = self.__read_file(os.path.join(self.metrics_dir, self.COMPACTED_FILE_NAME))
+		if compacted is not None:
+			files_data[self.COMPACTED_FILE_NAME] = compacted
+			for name in compacted['files']:
+				files_data.pop(name, None)
+		request_counts, histograms = {}, {}
+		for data in files_data.values():
+			self.__merge(request_counts, histograms, *self.__load(data))
+		return (request_counts, histograms)
+
+	def render_prometheus(self):
+
+		'''
+		Returns all the metrics in the Prometheus text exposition format.
+		'''
+
+		request_counts, histograms = self.get_all_metrics()
+		lines = ['# HELP flask_rest_requests_total Requests handled, by endpoint, method and response name.',
+				'# TYPE flask_rest_requests_total counter']
+		for (endpoint, method, response_name), count in sorted(request_counts.items()):
+			lines.append('flask_rest_requests_total{endpoint="%s",method="%s",response="%s"} %d' % (escape_label_value(endpoint), escape_label_value(method), escape_label_value(response_name), count))
+
+		lines += ['# HELP flask_rest_request_duration_seconds Request processing time, by endpoint, method and processing phase.',
+				'# TYPE flask_rest_request_duration_seconds histogram']
+		bucket_bounds = ['%g' % (bound) for bound in self.LATENCY_BUCKETS] + ['+Inf']
+		for (endpoint, method, phase), histogram in sorted(histograms.items()):
+			labels = 'endpoint="%s",method="%s",phase="%s"' % (escape_label_value(endpoint), escape_label_value(method), escape_label_value(phase))
+			cumulative_count = 0
+			for bound, count in zip(bucket_bounds, histogram[:-1]):
+				cumulative_count += count
+				lines.append('flask_rest_request_duration_seconds_bucket{%s,le="%s"} %d' % (labels, bound, cumulative_count))
+			lines.append('flask_rest_request_duration_seconds_sum{%s} %.6f' % (labels, histogram[-1]))
+			lines.append('flask_rest_request_duration_seconds_count{%s} %d' % (labels, cumulative_count))
+		return '\n'.join(lines) + '\n'
+
+def escape_label_value(value):
+	# Escapes a label value for the Prometheus text format
+	return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+metrics = Metrics()
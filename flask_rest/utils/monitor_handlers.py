@@ -1,5 +1,7 @@
+from flask import Response
 from flask_rest import app
 from flask_rest.utils.http_utils import rf
+from flask_rest.utils.metrics import metrics
 
 @app.route('/ping')
 def health_check_ping():
@@ -10,4 +12,15 @@ def health_check_ping():
 	such as database connectivity.
 	'''
 
-	return rf.get_response('ALL_OK', '')
\ No newline at end of file
+	return rf.get_response('ALL_OK', '')
+
+@app.route('/metrics')
+def metrics_export():
+
+	'''
+	Exports the request metrics (counts and latency histograms, see flask_rest.utils.metrics) in the Prometheus
+	text format, for scraping by a Prometheus server.
+	'''
+
+	content_type = 'text/plain; version=0.0.4; charset=utf-8'
+	return Response(response=metrics.render_prometheus(), status=200, mimetype=content_type, content_type=content_type)
@@ -0,0 +1,136 @@
+try: import simplejson as json
+except ImportError: import json
+try: from urllib.parse import urlencode
+except ImportError: from urllib import urlencode
+import base64, hashlib, hmac, itertools
+from flask import request
+from flask_rest import app
+
+class InvalidCursor(ValueError):
+	pass
+
+class CursorCodec(object):
+
+	'''
+	Encodes keyset positions into opaque, signed cursor tokens (and back). The token is the URL-safe base64 of
+	the JSON encoded key values, followed by an HMAC-SHA256 signature that also covers the endpoint name, so a
+	cursor can not be forged or reused on another resource.
+
+	The secret is app.config['PAGINATION_SECRET_KEY'] or the app's secret key (set from the FLASK_REST_SECRET_KEY
+	environment variable, see flask_rest), so cursors work across worker processes and restarts; RuntimeError
+	is raised if neither is set.
+	'''
+
+	def __init__(self, secret=None):
+		self.__secret = secret
+
+	def __get_secret(self):
+		if self.__secret is None:
+			secret = app.config.get('PAGINATION_SECRET_KEY') or app.secret_key
+			if not secret:
+				raise RuntimeError('No secret to sign pagination cursors, set PAGINATION_SECRET_KEY or the app secret key')
+			self.__secret = secret if isinstance(secret, bytes) else secret.encode('utf-8')
+		return self.__secret
+
+	def __sign(self, endpoint, payload):
+		return hmac.new(self.__get_secret(), endpoint.encode('utf-8') + b'|' + payload, hashlib.sha256).digest()[:16]
+
+	def encode(self, endpoint, key_values):
+		payload = json.dumps(list(key_values), separators=(',', ':')).encode('utf-8')
+		token = base64.urlsafe_b64encode(payload) + b'.' + base64.urlsafe_b64encode(self.__sign(endpoint, payload))
+		return token.decode('ascii').replace('=', '')
+
+	def decode(self, endpoint, token):
+		try:
+			payload_b64, signature_b64 = [(part + '=' * (-len(part) % 4)).encode('ascii') for part in token.split('.')]
+			payload = base64.urlsafe_b64decode(payload_b64)
+			signature = base64.urlsafe_b64decode(signature_b64)
+		except (ValueError, TypeError, UnicodeError):
+			raise InvalidCursor('Malformed cursor')
+		if not hmac.compare_digest(signature, self.__sign(endpoint, payload)):
+			raise InvalidCursor('Invalid cursor')
+		return tuple(json.loads(payload.decode('utf-8')))
+
+class Page(object):
+
+	'''
+	The page requested by the client, passed to the resource handler as the "page" keyword argument. The handler
+	should return (up to) limit items that come after the after key values in key order, or the first items if
+	after is None; i.e. a seek such as "WHERE id > :after ORDER BY id LIMIT :limit", never an offset.
+	'''
+
+	__slots__ = ('after', 'limit')
+
+	def __init__(self, after, limit):
+		self.after = after # Tuple of the key values of the last item of the previous page, or None for the first page
+		self.limit = limit
+
+class KeysetPaginator(object):
+
+	'''
+	Cursor (keyset) pagination for a REST resource collection. Set as the paginator attribute of a RESTView
+	handler class to turn it on for GET requests on the collection URL (no resource ID or range), which accept
+	"cursor" and "limit" query parameters. Invalid cursors or limits are rejected with BAD_REQUEST before the
+	handler is called, and page sizes are capped at max_page_size.
+
+	After the handler returns, at most limit items are taken from the returned list or iterator, and if the
+	page is full, a "Link: <...>; rel=next" header and an X-Next-Cursor header pointing to the next page are
+	added to the response.
+
+	Parameters:
+		key_fields: names of the item fields making up the (unique) sort key, in sort order
+		default_page_size: page size when no limit is given
+		max_page_size: maximum page size a client can request
+	'''
+
+	def __init__(self, key_fields=('id',), default_page_size=20, max_page_size=100, cursor_codec=None, cursor_arg='cursor', limit_arg='limit'):
+		self.key_fields = tuple(key_fields)
+		self.default_page_size = default_page_size
+		self.max_page_size = max_page_size
+		self.cursor_codec = cursor_codec if cursor_codec is not None else default_cursor_codec
+		self.cursor_arg = cursor_arg
+		self.limit_arg = limit_arg
+
+	def get_page(self):
+
+		'''
+		Returns the Page requested by the current request. Raises InvalidCursor on bad cursors or limits.
+		'''
+
+		limit = request.args.get(self.limit_arg)
+		if limit is None:
+			limit = self.default_page_size
+		else:
+			try:
+				limit = int(limit)
+			except ValueError:
+				raise InvalidCursor('Invalid page size')
+			if limit < 1 or limit > self.max_page_size:
+				raise InvalidCursor('Page size must be between 1 and %d' % (self.max_page_size))
+
+		cursor = request.args.get(self.cursor_arg)
+		after = None
+		if cursor:
+			after = self.cursor_codec.decode(request.endpoint, cursor)
+			if len(after) != len(self.key_fields):
+				raise InvalidCursor('Invalid cursor')
+		return Page(after, limit)
+
+	def paginate(self, page, data):
+
+		'''
+		Returns a 2-tuple, (<page_items>, <headers>), with the page items (a list) and the pagination headers.
+		'''
+
+		items = list(itertools.islice(data, page.limit))
+		headers = {}
+		if len(items) == page.limit:
+			last_item = items[-1]
+			next_cursor = self.cursor_codec.encode(request.endpoint, [last_item[field] for field in self.key_fields])
+			query_args = [(k, v) for k, v in request.args.items(multi=True) if k not in (self.cursor_arg, self.limit_arg)]
+			query_args += [(self.cursor_arg, next_cursor), (self.limit_arg, page.limit)]
+			headers['Link'] = '<%s?%s>; rel="next"' % (request.base_url, urlencode(query_args))
+			headers['X-Next-Cursor'] = next_cursor
+		return (items, headers)
+
+default_cursor_codec = CursorCodec()
@@ -0,0 +1,276 @@
+import errno, logging, os, random, signal, socket, subprocess, sys, threading, time
+from flask_rest.utils.router import load_handlers
+from flask_rest.utils.metrics import metrics
+from flask_rest.utils.request_logger import request_logger
+
+class WorkerApp(object):
+
+	'''
+	WSGI middleware of a worker process: counts the requests, and asks the worker to stop once it handled
+	max_requests requests or its memory use (peak resident set size) exceeded max_memory bytes, so it is
+	recycled (e.g. to cap slow memory leaks).
+	'''
+
+	def __init__(self, app, max_requests=0, max_memory=0, on_recycle=None):
+		self.app = app
+		self.max_requests = max_requests
+		self.max_memory = max_memory
+		self.on_recycle = on_recycle
+		self.requests = 0
+		self.__lock = threading.Lock()
+
+	def __call__(self, environ, start_response):
+		with self.__lock:
+			self.requests += 1
+			recycle = (self.max_requests and self.requests == self.max_requests) or (self.max_memory and self.requests % 100 == 0 and get_peak_memory() > self.max_memory)
+		if recycle and self.on_recycle is not None:
+			self.on_recycle() # This request (and the others in flight) is still served
+		return self.app(environ, start_response)
+
+def get_peak_memory():
+	# Returns the peak resident set size of the process, in bytes (0 if unknown)
+	try:
+		import resource
+	except ImportError:
+		return 0
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return peak if sys.platform == 'darwin' else peak * 1024 # Bytes on macOS, kilobytes elsewhere
+
+class PreforkServer(object):
+
+	'''
+	A multi-process HTTP server for the app: the master process imports the app and all handler modules, then
+	forks the worker processes, so they share that memory (copy-on-write) instead of each importing everything.
+	The workers accept connections on the listening socket created by the master (or, with reuse_port, each on
+	its own socket bound with SO_REUSEPORT, the kernel balancing connections between them), and serve requests
+	with threads. Dead workers are replaced, and workers are recycled after max_requests requests (plus up to
+	max_requests_jitter, so they do not all restart at once) or once their memory use exceeds max_memory bytes.
+
+	Signals to the master:
+		SIGHUP:          zero-downtime reload; the master re-executes itself (same process ID, keeping the listening
+		                 socket), imports the app again (so code changes are picked up), starts new workers, then
+		                 stops the old ones gracefully. If the app can not be imported, the reload is abandoned.
+		SIGTERM/SIGINT:  graceful shutdown; the workers finish the requests in flight (up to graceful_timeout seconds)
+		SIGQUIT:         immediate shutdown
+
+	A worker failing within startup_time seconds of being started is replaced after a delay growing from
+	startup_backoff up to max_startup_backoff seconds; after max_startup_failures failures in a row, the master
+	shuts down (raising RuntimeError) instead of forking workers over and over.
+
+	Settings can be read from the environment with from_environ (see runserver_prefork.py).
+	'''
+
+	LISTEN_FD_ENV = 'FLASK_REST_LISTEN_FD' # Passed on through re-execution on reload
+	OLD_WORKERS_ENV = 'FLASK_REST_OLD_WORKERS'
+	startup_time = 5.0
+	startup_backoff = 0.5
+	max_startup_backoff = 30.0
+	max_startup_failures = 10
+
+	def __init__(self, app, host='0.0.0.0', port=5000, workers=None, max_requests=0, max_requests_jitter=0, max_memory=0,
+				reuse_port=False, graceful_timeout=30.0, backlog=2048):
+		self.app = app
+		self.host = host
+		self.port = port
+		self.workers = workers or os.cpu_count() or 1
+		self.max_requests = max_requests
+		self.max_requests_jitter = max_requests_jitter
+		self.max_memory = max_memory
+		self.reuse_port = reuse_port
+		self.graceful_timeout = graceful_timeout
+		self.backlog = backlog
+		self.logger = logging.getLogger('flask_rest.prefork')
+		self.listening_socket = None
+		self.worker_pids = set()
+		self.stopping_pids = {} # {<pid>: <time to kill it at>}, workers being stopped gracefully
+		self.starting_pids = {} # {<pid>: <time started at>}, workers started less than startup_time seconds ago
+		self.startup_failures = 0 # Workers in a row which failed during their startup
+		self.__spawn_time = 0 # Workers are not replaced before that time (backoff after startup failures)
+		self.__signal = None # Last signal received by the master, handled by its main loop
+
+	@classmethod
+	def from_environ(clss, app, environ=os.environ):
+
+		'''
+		Returns a server configured from environment variables: FLASK_REST_BIND ("<host>:<port>", default
+		"0.0.0.0:5000"), FLASK_REST_WORKERS (default: number of CPUs), FLASK_REST_MAX_REQUESTS and
+		FLASK_REST_MAX_REQUESTS_JITTER (0: never recycled), FLASK_REST_MAX_MEMORY (in MB, 0: no limit),
+		FLASK_REST_REUSE_PORT (1 to use SO_REUSEPORT) and FLASK_REST_GRACEFUL_TIMEOUT (seconds, default 30).
+		'''
+
+		host, separator, port = environ.get('FLASK_REST_BIND', '0.0.0.0:5000').rpartition(':')
+		return clss(app, host=host.strip('[]') or '0.0.0.0', port=int(port),
+					workers=int(environ.get('FLASK_REST_WORKERS', 0)) or None,
+					max_requests=int(environ.get('FLASK_REST_MAX_REQUESTS', 0)),
+					max_requests_jitter=int(environ.get('FLASK_REST_MAX_REQUESTS_JITTER', 0)),
+					max_memory=int(float(environ.get('FLASK_REST_MAX_MEMORY', 0)) * 1048576),
+					reuse_port=environ.get('FLASK_REST_REUSE_PORT', '0').lower() in ('1', 'true', 'yes'),
+					graceful_timeout=float(environ.get('FLASK_REST_GRACEFUL_TIMEOUT', 30)))
+
+	def create_socket(self):
+		# Returns a new listening socket on the server address
+		family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+		listening_socket = socket.socket(family, socket.SOCK_STREAM)
+		listening_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		if self.reuse_port:
+			listening_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+		listening_socket.bind((self.host, self.port))
+		listening_socket.listen(self.backlog)
+		return listening_socket
+
+	def run(self):
+		# Runs the master process until it is shut down
+		load_handlers() # Import everything before forking
+		if not self.reuse_port:
+			listen_fd = os.environ.pop(self.LISTEN_FD_ENV, None)
+			if listen_fd is not None:
+				# Re-executed on reload: the socket is still open, connections kept queuing on it meanwhile
+				family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+				self.listening_socket = socket.fromfd(int(listen_fd), family, socket.SOCK_STREAM)
+				os.close(int(listen_fd))
+			else:
+				self.listening_socket = self.create_socket()
+		old_pids = [int(pid) for pid in os.environ.pop(self.OLD_WORKERS_ENV, '').split(',') if pid]
+
+		for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGQUIT):
+			signal.signal(signum, self.__on_signal)
+		self.logger.info('Master %d serving on %s:%d with %d workers', os.getpid(), self.host, self.port, self.workers)
+		self.__spawn_workers()
+		for pid in old_pids:
+			# Workers of the master before the reload, still this process' children: stopped once the new ones are started
+			self.__stop_worker(pid)
+
+		while True:
+			received = self.__signal
+			self.__signal = None
+			if received == signal.SIGHUP:
+				self.__reload()
+			elif received in (signal.SIGTERM, signal.SIGINT, signal.SIGQUIT):
+				self.__shutdown(graceful=(received != signal.SIGQUIT))
+				return
+			self.__reap_workers()
+			if self.startup_failures >= self.max_startup_failures:
+				self.logger.error('Workers failed to start %d times in a row, shutting down', self.startup_failures)
+				self.__shutdown()
+				raise RuntimeError('The workers can not be started')
+			self.__spawn_workers()
+			time.sleep(0.2)
+
+	def __on_signal(self, signum, frame):
+		self.__signal = signum
+
+	def __spawn_workers(self):
+		if time.time() < self.__spawn_time:
+			return
+		while len(self.worker_pids) < self.workers:
+			pid = os.fork()
+			if pid == 0:
+				status = 1
+				try:
+					self.__run_worker()
+					status = 0
+				except:
+					self.logger.exception('Worker %d failed', os.getpid())
+				finally:
+					os._exit(status)
+			self.worker_pids.add(pid)
+			self.starting_pids[pid] = time.time()
+
+	def __reap_workers(self):
+		now = time.time()
+		while True:
+			try:
+				pid, status = os.waitpid(-1, os.WNOHANG)
+			except OSError as e:
+				if e.errno == errno.ECHILD:
+					break
+				raise
+			if pid == 0:
+				break
+			starting = self.starting_pids.pop(pid, None) is not None
+			if pid in self.worker_pids:
+				if status == 0:
+					self.logger.info('Worker %d recycled, replacing it', pid)
+				elif starting:
+					self.startup_failures += 1
+					delay = min(self.startup_backoff * 2 ** (self.startup_failures - 1), self.max_startup_backoff)
+					self.__spawn_time = now + delay
+					self.logger.error('Worker %d failed to start (status %d), replacing it in %.1fs', pid, status, delay)
+				else:
+					self.logger.warning('Worker %d exited unexpectedly (status %d), replacing it', pid, status)
+			self.worker_pids.discard(pid)
+			self.stopping_pids.pop(pid, None)
+		for pid, start_time in list(self.starting_pids.items()):
+			if now - start_time >= self.startup_time:
+				del self.starting_pids[pid] # Started
+				self.startup_failures = 0
+		for pid, kill_time in list(self.stopping_pids.items()):
+			if now >= kill_time:
+				self.__kill(pid, signal.SIGKILL) # Did not finish its requests in time
+
+	def __stop_worker(self, pid):
+		# Asks a worker to finish the requests in flight and exit, killing it after graceful_timeout
+		self.worker_pids.discard(pid)
+		self.stopping_pids[pid] = time.time() + self.graceful_timeout
+		self.__kill(pid, signal.SIGTERM)
+
+	def __kill(self, pid, signum):
+		try:
+			os.kill(pid, signum)
+		except OSError:
+			self.stopping_pids.pop(pid, None) # Already gone
+
+	def __reload(self):
+		# Re-executes the master with the new code, handing over the listening socket and the workers
+		if subprocess.call([sys.executable, '-c', 'import flask_rest; from flask_rest.utils.router import load_handlers; load_handlers()']) != 0:
+			self.logger.error('Reload abandoned, the app can not be imported')
+			return
+		self.logger.info('Reloading master %d', os.getpid())
+		environ = dict(os.environ)
+		environ[self.OLD_WORKERS_ENV] = ','.join([str(pid) for pid in list(self.worker_pids) + list(self.stopping_pids)])
+		if self.listening_socket is not None:
+			os.set_inheritable(self.listening_socket.fileno(), True)
+			environ[self.LISTEN_FD_ENV] = str(self.listening_socket.fileno())
+		os.execve(sys.executable, [sys.executable] + sys.argv, environ)
+
+	def __shutdown(self, graceful=True):
+		for pid in list(self.worker_pids):
+			if graceful:
+				self.__stop_worker(pid)
+			else:
+				self.worker_pids.discard(pid)
+				self.stopping_pids[pid] = 0
+				self.__kill(pid, signal.SIGKILL)
+		while self.stopping_pids:
+			self.__reap_workers()
+			time.sleep(0.1)
+		if self.listening_socket is not None:
+			self.listening_socket.close()
+		self.logger.info('Master %d stopped', os.getpid())
+
+	def __run_worker(self):
+		# Runs a worker process: serves requests until it is asked to stop or recycled, then finishes the requests in flight
+		from werkzeug.serving import make_server
+		for signum in (signal.SIGHUP, signal.SIGINT):
+			signal.signal(signum, signal.SIG_IGN) # The master handles these
+		signal.signal(signal.SIGQUIT, signal.SIG_DFL)
+		random.seed() # Not the master's random state
+		logging.getLogger('werkzeug').setLevel(logging.WARNING) # No access log per request (see flask_rest.utils.request_logger)
+
+		listening_socket = self.listening_socket if not self.reuse_port else self.create_socket()
+		max_requests = self.max_requests + random.randint(0, self.max_requests_jitter) if self.max_requests else 0
+		server = None
+		stop_event = threading.Event()
+		def stop():
+			if not stop_event.is_set():
+				stop_event.set()
+				threading.Thread(target=server.shutdown).start() # Stops accepting connections (serve_forever returns)
+		worker_app = WorkerApp(self.app, max_requests, self.max_memory, on_recycle=stop)
+		server = make_server(self.host, self.port, worker_app, threaded=True, fd=listening_socket.fileno())
+		server.daemon_threads = False # The connections being handled are waited for by server_close (the master kills the worker after graceful_timeout)
+		signal.signal(signal.SIGTERM, lambda signum, frame: stop())
+		server.serve_forever()
+		server.server_close()
+		# Workers exit with os._exit, without the atexit handlers
+		metrics.flush_at_exit()
+		request_logger.shutdown()
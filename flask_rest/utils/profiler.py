@@ -0,0 +1,251 @@
+try: import cProfile as profile
+except ImportError: import profile
+try: from threading import get_ident
+except ImportError: from thread import get_ident
+import hashlib, hmac, os, random, sys, threading, time
+from flask import request
+
+class StackSampler(object):
+
+	'''
+	A low overhead statistical profiler: while a function runs, a background thread samples the function's
+	thread stack every interval seconds, counting how often each (collapsed) stack is seen. The counts can be
+	written in the collapsed stack format used by flame graph tools (e.g. flamegraph.pl, speedscope).
+	'''
+
+	def __init__(self, interval=0.001):
+		self.interval = interval
+
+	def run(self, stack_counts, stack_counts_lock, func, *args, **kwargs):
+		# Runs func, adding the sampled stacks to the stack_counts dict ({<collapsed_stack>: <count>})
+		sampling, stop = self.start(stack_counts, stack_counts_lock)
+		sampling.set()
+		try:
+			return func(*args, **kwargs)
+		finally:
+			stop()
+
+	def start(self, stack_counts, stack_counts_lock):
+		# Starts sampling the current thread's stack, only while the returned event is set, until the returned function is called
+		thread_id = get_ident()
+		sampling = threading.Event()
+		stopped = threading.Event()
+		def sample_stacks():
+			while not stopped.wait(self.interval):
+				frame = sys._current_frames().get(thread_id) if sampling.is_set() else None
+				if frame is not None:
+					stack = self.collapse(frame)
+					with stack_counts_lock:
+						stack_counts[stack] = stack_counts.get(stack, 0) + 1
+		sampler = threading.Thread(target=sample_stacks, name='StackSampler')
+		sampler.daemon = True
+		sampler.start()
+		def stop():
+			stopped.set()
+			sampler.join()
+		return (sampling, stop)
+
+	def collapse(self, frame):
+		# Returns the stack of the frame as a ";" separated str of functions, outermost first
+		functions = []
+		while frame is not None:
+			code = frame.f_code
+			functions.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+			frame = frame.f_back
+		return ';'.join(reversed(functions))
+
+class SteppedCoroutine(object):
+
+	'''
+	Awaitable running a coroutine, calling on_resume before and on_suspend after each of its steps, so it can be
+	profiled while it runs but not while the event loop runs other tasks.
+	'''
+
+	def __init__(self, coroutine, on_resume, on_suspend):
+		self.coroutine = coroutine
+		self.on_resume = on_resume
+		self.on_suspend = on_suspend
+
+	def __await__(self):
+		value, exception = None, None
+		while True:
+			self.on_resume()
+			try:
+				if exception is None:
+					awaited = self.coroutine.send(value)
+				else:
+					awaited = self.coroutine.throw(exception)
+			except StopIteration as e:
+				return e.value
+			finally:
+				self.on_suspend()
+			try:
+				value, exception = (yield awaited), None
+			except BaseException as e:
+				value, exception = None, e
+
+def write_collapsed_stacks(path, stack_counts):
+	with open(path, 'w') as f:
+		for stack, count in sorted(stack_counts.items()):
+			f.write('%s %d\n' % (stack, count))
+
+class RequestProfiler(object):
+
+	'''
+	Opt-in profiling of RESTView request processing. A request is profiled if:
+
+		- it is randomly sampled, with probability sample_rate (0 by default, i.e. never), or
+		- it has a valid profiling token (see make_token) in the X-Profile header or the _profile query
+		  parameter, so authorized developers can profile specific requests in production, or
+		- its endpoint is being profiled in aggregate (see start_aggregate).
+
+	Profiled requests are run under cProfile (mode "cprofile", writing a .pstats file) or the stack sampler (mode
+	"sampling", writing a .collapsed file for flame graphs), with the output in output_dir. The response gets an
+	X-Profile-Id header with the output file name. When nothing is configured, the only per-request cost is
+	checking the enabled attribute.
+	'''
+
+	def __init__(self, output_dir=None, sample_rate=0.0, secret=None, mode='cprofile', sampling_interval=0.001):
+		self.output_dir = output_dir or os.environ.get('FLASK_REST_PROFILE_DIR', '/tmp/flask_rest_profiles')
+		self.sample_rate = sample_rate
+		self.secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+		self.mode = mode
+		self.sampler = StackSampler(sampling_interval)
+		self.__aggregates_lock = threading.Lock()
+		self.__aggregates = {} # {<endpoint>: [<requests_left>, <stack_counts>]}
+		self.__update_enabled()
+
+	def __update_enabled(self):
+		self.enabled = bool(self.sample_rate > 0 or self.secret or self.__aggregates)
+
+	def configure(self, output_dir=None, sample_rate=None, secret=None, mode=None):
+		if output_dir is not None:
+			self.output_dir = output_dir
+		if sample_rate is not None:
+			self.sample_rate = sample_rate
+		if secret is not None:
+			self.secret = secret.encode('utf-8') if isinstance(secret, str) else secret
+		if mode is not None:
+			self.mode = mode
+		self.__update_enabled()
+
+	def make_token(self, expires_in=3600):
+
+		'''
+		Returns a profiling token, valid for expires_in seconds, to be sent in the X-Profile header (or the _profile
+		query parameter) of the requests to profile.
+		'''
+
+		expires = str(int(time.time() + expires_in))
+		return '%s.%s' % (expires, hmac.new(self.secret, expires.encode('ascii'), hashlib.sha256).hexdigest())
+
+	def __is_valid_token(self, token):
+		expires, _, signature = token.partition('.')
+		if not self.secret or not expires.isdigit() or int(expires) < time.time():
+			return False
+		return hmac.compare_digest(signature.encode('ascii', 'replace'), hmac.new(self.secret, expires.encode('ascii'), hashlib.sha256).hexdigest().encode('ascii'))
+
+	def start_aggregate(self, endpoint, requests=1000):
+
+		'''
+		Profiles the next requests to the endpoint with the stack sampler, aggregating their stacks; once the number
+		of requests is reached, the aggregated stacks are written to a .collapsed file.
+		'''
+
+		with self.__aggregates_lock:
+			self.__aggregates[endpoint] = [requests, {}]
+			self.__update_enabled()
+
+	def should_profile(self):
+		# Returns whether the current request should be profiled individually
+		if self.sample_rate > 0 and random.random() < self.sample_rate:
+			return True
+		token = request.headers.get('X-Profile') or request.args.get('_profile')
+		return bool(token) and self.__is_valid_token(token)
+
+	def run(self, func, *args, **kwargs):
+
+		'''
+		Runs func (the request processing), profiled if the current request should be. Returns its return value.
+		'''
+
+		aggregate = self.__aggregates.get(request.endpoint)
+		if aggregate is not None:
+			try:
+				return self.sampler.run(aggregate[1], self.__aggregates_lock, func, *args, **kwargs)
+			finally:
+				self.__end_aggregate(request.endpoint, aggregate)
+		if not self.should_profile():
+			return func(*args, **kwargs)
+
+		profile_id = self.__get_profile_id()
+		if self.mode == 'sampling':
+			stack_counts = {}
+			result = self.sampler.run(stack_counts, threading.Lock(), func, *args, **kwargs)
+			return self.__end_profile(profile_id, result, stack_counts=stack_counts)
+		profiler = profile.Profile()
+		result = profiler.runcall(func, *args, **kwargs)
+		return self.__end_profile(profile_id, result, profiler=profiler)
+
+	async def run_async(self, func, *args, **kwargs):
+
+		'''
+		Awaits func (the request processing coroutine function), profiled if the current request should be, like
+		run. Only the steps of the request's coroutine are profiled, not the other tasks of the event loop.
+		'''
+
+		aggregate = self.__aggregates.get(request.endpoint)
+		if aggregate is not None:
+			sampling, stop = self.sampler.start(aggregate[1], self.__aggregates_lock)
+			try:
+				return await SteppedCoroutine(func(*args, **kwargs), sampling.set, sampling.clear)
+			finally:
+				stop()
+				self.__end_aggregate(request.endpoint, aggregate)
+		if not self.should_profile():
+			return await func(*args, **kwargs)
+
+		profile_id = self.__get_profile_id()
+		if self.mode == 'sampling':
+			stack_counts = {}
+			sampling, stop = self.sampler.start(stack_counts, threading.Lock())
+			try:
+				result = await SteppedCoroutine(func(*args, **kwargs), sampling.set, sampling.clear)
+			finally:
+				stop()
+			return self.__end_profile(profile_id, result, stack_counts=stack_counts)
+		profiler = profile.Profile()
+		result = await SteppedCoroutine(func(*args, **kwargs), profiler.enable, profiler.disable)
+		return self.__end_profile(profile_id, result, profiler=profiler)
+
+	def __get_profile_id(self):
+		if not os.path.isdir(self.output_dir):
+			os.makedirs(self.output_dir)
+		return '%s-%s-%d-%d-%06d' % (request.endpoint, request.method, os.getpid(), int(time.time()), random.randint(0, 999999))
+
+	def __end_profile(self, profile_id, result, profiler=None, stack_counts=None):
+		# Writes the profile of a request, returns the request's result (the response gets the profile ID)
+		if profiler is not None:
+			profile_id += '.pstats'
+			profiler.dump_stats(os.path.join(self.output_dir, profile_id))
+		else:
+			profile_id += '.collapsed'
+			write_collapsed_stacks(os.path.join(self.output_dir, profile_id), stack_counts)
+		if hasattr(result, 'headers'):
+			result.headers['X-Profile-Id'] = profile_id
+		return result
+
+	def __end_aggregate(self, endpoint, aggregate):
+		with self.__aggregates_lock:
+			aggregate[0] -= 1
+			is_done = aggregate[0] == 0
+			if is_done:
+				del self.__aggregates[endpoint]
+				self.__update_enabled()
+		if is_done:
+			if not os.path.isdir(self.output_dir):
+				os.makedirs(self.output_dir)
+			path = os.path.join(self.output_dir, '%s-aggregate-%d-%d.collapsed' % (endpoint, os.getpid(), int(time.time())))
+			write_collapsed_stacks(path, aggregate[1])
+
+request_profiler = RequestProfiler() # Disabled until configured (see flask_rest/__init__.py)
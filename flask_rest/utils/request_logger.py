@@ -0,0 +1,260 @@
+try: import simplejson as json
+except ImportError: import json
+try: import queue
+except ImportError: import Queue as queue
+try: from urllib.parse import parse_qs
+except ImportError: from urlparse import parse_qs
+import atexit, os, random, socket, sys, threading, time
+from flask import request
+from flask_rest.utils.data_utils import FlexibleJSONEncoder
+from flask_rest.utils.http_utils import get_remote_address
+
+class StreamSink(object):
+
+	'''
+	Writes request log records as newline-delimited JSON to a stream (stdout by default).
+	'''
+
+	def __init__(self, stream=None):
+		self.stream = stream if stream is not None else sys.stdout
+
+	def write_lines(self, lines):
+		self.stream.write(''.join([line + '\n' for line in lines]))
+		self.stream.flush()
+
+	def close(self):
+		pass
+
+class RotatingFileSink(object):
+
+	'''
+	Appends request log records (one JSON object per line) to a file, rotating it once it grows past max_bytes.
+	Rotated files are kept as <path>.1 ... <path>.<backup_count>, the oldest being removed.
+	'''
+
+	def __init__(self, path, max_bytes=104857600, backup_count=5):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.backup_count = backup_count
+		self.__file = None
+		self.__size = 0
+
+	def __open(self):
+		self.__file = open(self.path, 'a')
+		self.__size = self.__file.tell()
+
+	def __rotate(self):
+		self.__file.close()
+		for i in range(self.backup_count - 1, 0, -1):
+			if os.path.exists('%s.%d' % (self.path, i)):
+				os.rename('%s.%d' % (self.path, i), '%s.%d' % (self.path, i + 1))
+		if self.backup_count > 0:
+			os.rename(self.path, '%s.1' % (self.path))
+		else:
+			os.remove(self.path)
+		self.__open()
+
+	def write_lines(self, lines):
+		if self.__file is None:
+			self.__open()
+		data = ''.join([line + '\n' for line in lines])
+		if self.__size > 0 and self.__size + len(data) > self.max_bytes:
+			self.__rotate()
+		self.__file.write(data)
+		self.__file.flush()
+		self.__size += len(data)
+
+	def close(self):
+		if self.__file is not None:
+			self.__file.close()
+			self.__file = None
+
+class SyslogSink(object):
+
+	'''
+	Sends request log records to the local syslog daemon through its datagram socket, one message per record.
+	'''
+
+	def __init__(self, address='/dev/log', facility=16, severity=6, tag='flask_rest'):
+		self.address = address
+		self.priority = facility * 8 + severity # Defaults to local0.info
+		self.tag = tag
+		self.__socket = None
+
+	def write_lines(self, lines):
+		if self.__socket is None:
+			self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+			self.__socket.connect(self.address)
+		for line in lines:
+			self.__socket.send(('<%d>%s: %s' % (self.priority, self.tag, line)).encode('utf-8'))
+
+	def close(self):
+		if self.__socket is not None:
+			self.__socket.close()
+			self.__socket = None
+
+class RequestLogger(object):
+
+	'''
+	Asynchronous request logging. The request thread only captures a few raw fields of the request (no parsing
+	or serialization) and puts them on a bounded queue; a background writer thread takes them off in batches,
+	serializes them to JSON and writes them to every sink. When the queue is full, records are dropped (and
+	counted) instead of blocking the request.
+
+	Parameters:
+		sinks: list of sinks (objects with write_lines(lines) and close()), more can be added with add_sink
+		sample_rate: fraction of successful requests to log, 0.0 to 1.0 (error responses are always logged)
+		queue_size: maximum number of records waiting to be written
+		batch_size: maximum number of records written per batch
+		max_body_size: request bodies larger than this (in bytes) are not logged
+
+	Nothing is done (and the writer thread is not started) until at least one sink is added.
+	'''
+
+	SUCCESS_RESPONSE_NAMES = frozenset(('ALL_OK', 'CREATED', 'ACCEPTED', 'DELETED'))
+
+	# Numeric codes of the request methods in the log records
+	REQUEST_METHOD_CODES = {'GET': 0, 'POST': 1, 'PUT': 2, 'PATCH': 3, 'DELETE': 4, 'HEAD': 5, 'OPTIONS': 6}
+
+	def __init__(self, sinks=None, sample_rate=1.0, queue_size=10000, batch_size=500, max_body_size=65536):
+		self.sinks = list(sinks or [])
+		self.sample_rate = sample_rate
+		self.batch_size = batch_size
+		self.max_body_size = max_body_size
+		self.counters = {'logged': 0, 'sampled_out': 0, 'dropped': 0, 'written': 0, 'sink_errors': 0}
+		self.__queue = queue.Queue(queue_size)
+		self.__writer = None
+		self.__writer_pid = None
+		self.__start_lock = threading.Lock()
+		self.__stop_record = object()
+
+	def add_sink(self, sink):
+		self.sinks.append(sink)
+
+	def log(self, processing_start, response_name, request_info=None):
+
+		'''
+		Called on the request thread, when the response is known. Captures the raw request fields and queues them
+		for the writer thread.
+		'''
+
+		if not self.sinks:
+			return
+		if self.sample_rate < 1.0 and response_name in self.SUCCESS_RESPONSE_NAMES and random.random() >= self.sample_rate:
+			self.counters['sampled_out'] += 1
+			return
+		if self.__writer_pid != os.getpid():
+			# Not started yet, or running in a forked worker process that does not have the parent's thread
+			self.__start_writer()
+
+		content_length = request.content_length
+		body = request.get_data(cache=True) if content_length and content_length <= self.max_body_size else None
+		now = time.time()
+		record = (now, now - processing_start, response_name, request.method, request.base_url, request.path,
+				get_remote_address(), request.query_string, body, request_info)
+		try:
+			self.__queue.put_nowait(record)
+			self.counters['logged'] += 1
+		except queue.Full:
+			self.counters['dropped'] += 1
+
+	def serialize(self, record):
+
+		'''
+		Turns a captured record into a JSON log line (called on the writer thread). Override to customize the
+		logged data.
+		'''
+
+		logged_time, processing_time, response_name, method, base_url, path, remote_address, query_string, body, request_info = record
+		request_data = ''
+		if body:
+			try:
+				request_data = json.loads(body.decode('utf-8'))
+			except ValueError:
+				pass # Not JSON data, not logged
+		d = {'time': logged_time,
+			'processing_time': processing_time,
+			'response_name': response_name,
+			'request_url': base_url,
+			'request_method': self.REQUEST_METHOD_CODES.get(method, -1),
+			'extra_arg': path,
+			'remote_address': remote_address,
+			'request_data': request_data,
+			'request_query_str_data': parse_qs(query_string.decode('latin-1'), keep_blank_values=True),
+			}
+		if request_info:
+			d['request_info'] = request_info
+		return json.dumps(d, cls=FlexibleJSONEncoder)
+
+	def flush(self, timeout=None):
+
+		'''
+		Blocks until every queued record has been written (or the timeout, in seconds, expires).
+		'''
+
+		deadline = None if timeout is None else time.time() + timeout
+		while self.__queue.unfinished_tasks and (deadline is None or time.time() < deadline):
+			time.sleep(0.01)
+
+	def shutdown(self, timeout=5.0):
+
+		'''
+		Writes out the queued records, then stops the writer thread and closes the sinks. Registered to run at
+		interpreter exit once the writer thread is started.
+		'''
+
+		writer = self.__writer
+		if writer is None or not writer.is_alive():
+			return
+		try:
+			self.__queue.put(self.__stop_record, timeout=timeout)
+		except queue.Full:
+			return
+		writer.join(timeout)
+
+	def __start_writer(self):
+		with self.__start_lock:
+			if self.__writer_pid == os.getpid():
+				return
+			if self.__writer_pid is None:
+				atexit.register(self.shutdown)
+			self.__writer = threading.Thread(target=self.__write_records, name='RequestLogWriter')
+			self.__writer.daemon = True
+			self.__writer.start()
+			self.__writer_pid = os.getpid()
+
+	def __write_records(self):
+		stopping = False
+		while not stopping:
+			batch = [self.__queue.get()]
+			while len(batch) < self.batch_size:
+				try:
+					batch.append(self.__queue.get_nowait())
+				except queue.Empty:
+					break
+			if self.__stop_record in batch:
+				stopping = True
+				batch.remove(self.__stop_record)
+
+			lines = []
+			for record in batch:
+				try:
+					lines.append(self.serialize(record))
+				except Exception:
+					self.counters['sink_errors'] += 1
+			for sink in self.sinks:
+				try:
+					sink.write_lines(lines)
+				except Exception:
+					self.counters['sink_errors'] += 1
+			self.counters['written'] += len(lines)
+			for i in range(len(batch) + (1 if stopping else 0)):
+				self.__queue.task_done()
+
+		for sink in self.sinks:
+			try:
+				sink.close()
+			except Exception:
+				pass
+
+request_logger = RequestLogger() # Add sinks to turn on request logging (see flask_rest/__init__.py)
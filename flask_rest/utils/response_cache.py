@@ -0,0 +1,199 @@
+try: import simplejson as json
+except ImportError: import json
+try: import redis
+except ImportError: redis = None # Only needed for a shared cache (RedisCacheBackend)
+import collections, hashlib, os, struct, threading, time
+from flask import request, Response
+from flask_rest.utils.http_utils import rf
+
+class LocalCacheBackend(object):
+
+	'''
+	In-process cache storage (per worker process), a least recently used (LRU) dict with per-entry expiry time.
+	Memory use is bounded by both the number of entries and the total size of the cached bodies.
+
+	For single process servers only: the invalidation of an endpoint's responses is only seen by the process
+	that handled the modification, the other worker processes (e.g. of runserver_prefork.py) keep serving their
+	cached responses until they expire. Use RedisCacheBackend with multiple worker processes.
+	'''
+
+	def __init__(self, max_entries=10000, max_bytes=67108864):
+		self.max_entries = max_entries
+		self.max_bytes = max_bytes
+		self.__lock = threading.Lock()
+		self.__entries = collections.OrderedDict() # {<key>: (<expire_time>, <value>, <size>)}, least recently used first
+		self.__size = 0
+		self.__counters = {}
+
+	def get(self, key):
+		with self.__lock:
+			entry = self.__entries.get(key)
+			if entry is None:
+				return None
+			if entry[0] <= time.time():
+				self.__remove(key)
+				return None
+			self.__entries.move_to_end(key)
+			return entry[1]
+
+	def set(self, key, value, ttl, size):
+		with self.__lock:
+			if key in self.__entries:
+				self.__remove(key)
+			self.__entries[key] = (time.time() + ttl, value, size)
+			self.__size += size
+			while len(self.__entries) > self.max_entries or self.__size > self.max_bytes:
+				self.__remove(next(iter(self.__entries)))
+
+	def __remove(self, key):
+		self.__size -= self.__entries.pop(key)[2]
+
+	def get_counter(self, key):
+		return self.__counters.get(key, 0)
+
+	def incr_counter(self, key):
+		with self.__lock:
+			value = self.__counters[key] = self.__counters.get(key, 0) + 1
+		return value
+
+class RedisCacheBackend(object):
+
+	'''
+	Shared cache storage in Redis (used by all worker processes and servers), for a redis-py compatible client.
+	Redis should be configured with an LRU maxmemory-policy to bound its memory use.
+
+	Each entry is stored as one value: the length of its JSON encoded status and headers (4 bytes, big endian),
+	the JSON, then the raw body bytes. Nothing read from Redis is unpickled or otherwise executed, and values
+	that can not be decoded are cache misses.
+	'''
+
+	def __init__(self, client, key_prefix='response_cache:'):
+		self.client = client
+		self.key_prefix = key_prefix
+
+	def get(self, key):
+		value = self.client.get(self.key_prefix + key)
+		if value is None:
+			return None
+		try:
+			meta_size = struct.unpack_from('!I', value)[0]
+			status, headers = json.loads(value[4:4 + meta_size].decode('utf-8'))
+			return (int(status), [(str(name), str(header_value)) for name, header_value in headers], value[4 + meta_size:])
+		except (struct.error, ValueError, TypeError):
+			return None
+
+	def set(self, key, value, ttl, size):
+		status, headers, body = value
+		meta = json.dumps([status, headers], separators=(',', ':')).encode('utf-8')
+		self.client.set(self.key_prefix + key, struct.pack('!I', len(meta)) + meta + body, px=int(ttl * 1000))
+
+	def get_counter(self, key):
+		return int(self.client.get(self.key_prefix + key) or 0)
+
+	def incr_counter(self, key):
+		return self.client.incr(self.key_prefix + key)
+
+class ResponseCache(object):
+
+	'''
+	Server-side cache of GET responses, used by RESTView. Handlers turn it on per request method through
+	cache_options (like throttle_options), e.g. {'ALL': (None, 0), 'GET': (<response_cache>, <ttl_seconds>)}.
+
+	Responses are cached by endpoint, URL view arguments and query string (and by client, with per_client set,
+	for responses that depend on the authenticated user; the client is identified by the client_id_field of
+	the <auth_data_obj>), and by negotiated mimetype and content encoding (compressed variants are cached as sent, see
+	flask_rest.utils.compression). HEAD requests are answered from cached GET responses. Streamed responses are
+	cached as they are sent, unless larger than max_entry_size.
+
+	Successful PUT, PATCH, POST and DELETE requests on an endpoint invalidate all its cached responses, by bumping
+	the endpoint's generation number, which is part of every cache key (stale entries are then evicted as
+	they expire or become least recently used).
+	'''
+
+	def __init__(self, backend=None, per_client=False, client_id_field='user_name', max_entry_size=1048576):
+		self.backend = backend if backend is not None else LocalCacheBackend()
+		self.per_client = per_client
+		self.client_id_field = client_id_field
+		self.max_entry_size = max_entry_size
+		self.counters = {'hits': 0, 'misses': 0, 'stores': 0, 'invalidations': 0}
+
+	def get_key(self, auth_data_obj):
+
+		'''
+		Returns the cache key of the current request.
+		'''
+
+		generation = self.backend.get_counter('generation:' + request.endpoint)
+		key = '%s|%d|%s|%s' % (request.endpoint, generation, sorted((request.view_args or {}).items()), request.query_string)
+		if self.per_client:
+			key += '|%s' % ((auth_data_obj or {}).get(self.client_id_field))
+		# One variant per negotiated mimetype (data format, and JSON or NDJSON for streamed bodies)
+		key += '|%s' % (rf.get_response_mimetype())
+		if rf.compressor is not None:
+			# One variant per content encoding, cached compressed so it is not compressed again
+			key += '|%s' % (rf.compressor.get_encoding())
+		return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+	def get_response(self, key):
+
+		'''
+		Returns the cached response for the key as a new response object, or None if not cached.
+		'''
+
+		entry = self.backend.get(key)
+		if entry is None:
+			self.counters['misses'] += 1
+			return None
+		self.counters['hits'] += 1
+		status, headers, body = entry
+		return Response(response=body, status=status, headers=headers)
+
+	def store_response(self, key, response, ttl, excluded_headers=()):
+
+		'''
+		Caches the response for ttl seconds (headers in excluded_headers, such as rate limit status, are not
+		cached). Streamed responses are cached once completely sent.
+		'''
+
+		headers = [(name, value) for name, value in response.headers.items() if name not in excluded_headers]
+		if not response.is_streamed:
+			body = response.get_data()
+			if len(body) <= self.max_entry_size:
+				self.backend.set(key, (response.status_code, headers, body), ttl, len(body))
+				self.counters['stores'] += 1
+			return
+		response.response = self.__tee_stream(key, response.status_code, headers, response.response, ttl)
+
+	def __tee_stream(self, key, status, headers, chunks, ttl):
+		# Passes the streamed body chunks through, keeping a copy to cache unless it gets too large
+		copied_chunks, size = [], 0
+		try:
+			for chunk in chunks:
+				if copied_chunks is not None:
+					size += len(chunk)
+					copied_chunks.append(chunk)
+					if size > self.max_entry_size:
+						copied_chunks = None
+				yield chunk
+		finally:
+			if hasattr(chunks, 'close'):
+				chunks.close()
+		if copied_chunks is not None:
+			self.backend.set(key, (status, headers, b''.join(copied_chunks)), ttl, size)
+			self.counters['stores'] += 1
+
+	def invalidate(self, endpoint):
+
+		'''
+		Invalidates all the cached responses of the endpoint.
+		'''
+
+		self.backend.incr_counter('generation:' + endpoint)
+		self.counters['invalidations'] += 1
+
+# Response cache of the example handler: shared in Redis at the FLASK_REST_REDIS_URL environment variable (e.g.
+# "redis://localhost:6379/0", requires redis-py), so all worker processes see invalidations; caching is off (None) if not set
+redis_url = os.environ.get('FLASK_REST_REDIS_URL')
+if redis_url and redis is None:
+	raise RuntimeError('FLASK_REST_REDIS_URL is set, but redis-py is not installed')
+example_response_cache = ResponseCache(RedisCacheBackend(redis.Redis.from_url(redis_url))) if redis_url else None
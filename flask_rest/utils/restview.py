@@ -1,10 +1,158 @@
-import time, datetime
+import asyncio, inspect, threading, time
 from flask import request
 from flask.views import View
+from werkzeug.wsgi import ClosingIterator
 from flask_rest import app
-from flask_rest.utils.http_utils import rf, ipv4_str_to_int, get_request_data_dict
+from flask_rest.utils.http_utils import rf, RequestDataError, get_request_data, get_remote_address
+from flask_rest.utils.request_logger import request_logger
+from flask_rest.utils.metrics import metrics
+from flask_rest.utils.profiler import request_profiler
+from flask_rest.utils.pagination import InvalidCursor
+from flask_rest.utils.conditional import get_version_headers, is_not_modified, is_precondition_failed
 from flask_rest.utils.auth import NoopAuthorization
 from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.schema import compile_schema
+from flask_rest.utils.ip_access import ip_access_list
+
+BATCH_AUTH_RESULTS_KEY = 'flask_rest.batch_auth_results' # WSGI environ key of the authentication results shared by the sub-requests of a batch
+
+# URL schemes of REST resources: the URL rules (relative to the resource's base URL) and the HTTP methods they accept.
+# The rules of a scheme never overlap, so Werkzeug matches at most one of them for any URL.
+URL_SCHEMES = {'resource': (('/', ('GET', 'POST', 'PUT', 'DELETE', 'HEAD', 'OPTIONS')), # Collection (optionally cursor paginated) and creation
+							('/<%(resource_id_type)s:%(resource_id_name)s>', ('GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS')), # Single resource
+							('/<int:lower_cut>;<int:upper_cut>', ('GET', 'HEAD', 'OPTIONS'))), # Ranged query, e.g. "/url/1;5"
+				'collection': (('/', ('GET', 'POST', 'HEAD', 'OPTIONS')),),
+				'batch': (('', ('POST', 'OPTIONS')),)}
+
+def add_url_rules(view_func, endpoint_name, url, url_scheme='resource', resource_id_name=None, resource_id_type=None):
+	# Adds the URL rules of a URL scheme, for the resource at the base URL (without trailing slash), to the app
+	for rule, methods in URL_SCHEMES[url_scheme]:
+		rule = rule % {'resource_id_name': resource_id_name, 'resource_id_type': resource_id_type}
+		app.add_url_rule(url + rule, endpoint=endpoint_name, view_func=view_func, methods=methods)
+
+_event_loops = threading.local()
+
+def run_coroutine(coroutine):
+	# Runs a coroutine to completion on the calling thread's event loop (created on first use, for WSGI worker threads)
+	loop = getattr(_event_loops, 'loop', None)
+	if loop is None:
+		loop = _event_loops.loop = asyncio.new_event_loop()
+	return loop.run_until_complete(coroutine)
+
+class MethodPlan(object):
+
+	'''
+	The precompiled dispatch plan for one HTTP method of a REST resource handler: the handler function,
+	authenticator and throttle to use, all resolved ahead of time.
+	'''
+
+	__slots__ = ('handler_func', 'authenticator', 'throttler', 'throttle_override', 'paginator', 'version_func', 'response_cache', 'cache_ttl',
+				'admission_controller', 'validator', 'is_async')
+
+	def __init__(self, handler_func, authenticator, throttle_options, paginator=None, version_func=None, cache_options=(None, 0), admission_controller=None,
+				validator=None):
+		self.handler_func = handler_func # Plain function of the handler class (None if not implemented), called with the handler instance
+		self.authenticator = authenticator
+		self.throttler, self.throttle_override = throttle_options
+		self.paginator = paginator # Paginator of the resource collection, for GET (and HEAD) only
+		self.version_func = version_func # The handler's get_resource_version hook, for conditional requests
+		self.response_cache, self.cache_ttl = cache_options # Response cache used for GET (and HEAD) only
+		if not self.cache_ttl:
+			self.response_cache = None
+		self.admission_controller = admission_controller # Concurrency limit of the endpoint (see flask_rest.utils.admission), None for no limit
+		self.validator = validator # Compiled request body schema (see flask_rest.utils.schema), None if the body is not validated
+		# Whether any part of the plan is a coroutine function (async def), so the request must be processed on an event loop
+		self.is_async = any(inspect.iscoroutinefunction(func) for func in (handler_func, version_func, authenticator.is_authenticated,
+																		type(self.throttler).check, type(self.throttler).throttle))
+
+class HandlerConfig(object):
+
+	'''
+	The configuration of a REST resource handler, resolved once per handler class when it is registered
+	(instead of on every request). A MethodPlan is compiled for every accepted HTTP method, so dispatching
+	a request is a single dict lookup (a miss means the method is not allowed).
+	'''
+
+	CONDITIONAL_METHODS = frozenset(('GET', 'HEAD', 'PUT', 'PATCH', 'DELETE')) # Methods the resource version hook is used for
+	MODIFYING_METHODS = frozenset(('POST', 'PUT', 'PATCH', 'DELETE')) # Methods that invalidate the cached responses
+	MODIFIED_RESPONSE_NAMES = frozenset(('ALL_OK', 'CREATED', 'ACCEPTED', 'DELETED'))
+
+	def __init__(self, handler):
+		self.allowed_methods = tuple(handler.allowed_methods)
+		self.dispatch_plans = {} # {<HTTP method, upper case>: <MethodPlan>}
+		cache_options = getattr(handler, 'cache_options', {'ALL': (None, 0)})
+		admission_options = getattr(handler, 'admission_options', {'ALL': None})
+		for method in self.allowed_methods + ('OPTIONS', 'HEAD'):
+			handler_func = getattr(type(handler), method.lower(), None)
+			if method == 'HEAD' and handler_func is RESTView.head and inspect.iscoroutinefunction(getattr(type(handler), 'get', None)):
+				handler_func = RESTView.async_head # The default HEAD handler, awaiting an async GET handler
+			self.dispatch_plans[method] = MethodPlan(handler_func,
+													handler.auth_methods.get(method, handler.auth_methods['ALL']),
+													handler.throttle_options.get(method, handler.throttle_options['ALL']),
+													handler.paginator if method in ('GET', 'HEAD') else None,
+													getattr(type(handler), 'get_resource_version', None) if method in self.CONDITIONAL_METHODS else None,
+													cache_options.get(method, cache_options['ALL']) if method == 'GET' else (None, 0),
+													admission_options.get(method, admission_options['ALL']) if method != 'OPTIONS' else None,
+													compile_schema(handler.request_schemas[method]) if method in handler.request_schemas else None)
+		if 'HEAD' not in self.allowed_methods:
+			# HEAD requests are answered from the responses cached for GET
+			self.dispatch_plans['HEAD'].response_cache = self.dispatch_plans.get('GET', self.dispatch_plans['HEAD']).response_cache
+		# All response caches used by the resource, invalidated by successful modifications
+		self.response_caches = [cache for cache, ttl in cache_options.values() if cache is not None and ttl]
+		self.__allow_headers = {} # {<frozenset of URL rule methods>: <Allow header str>}
+
+	def get_allow_header(self, url_rule):
+		# Returns the "Allow" header value for a URL rule (the rule's methods the handler accepts), built only once per distinct set of rule methods
+		rule_methods = frozenset(url_rule.methods)
+		allow_header = self.__allow_headers.get(rule_methods)
+		if allow_header is None:
+			allow_header = self.__allow_headers[rule_methods] = ', '.join(sorted(rule_methods.intersection(self.dispatch_plans)))
+		return allow_header
+
+class RequestContext(object):
+
+	'''
+	Per-request state of RESTView's request processing, kept apart from the (possibly shared) handler instance.
+	'''
+
+	__slots__ = ('request_method', 'processing_start', 'extra_request_info', 'auth_end', 'throttle_end', 'handler_end', 'response_end', 'admission')
+
+	def __init__(self, request_method, processing_start):
+		self.request_method = request_method
+		self.processing_start = processing_start # Keep track of time used per request, can be logged for monitoring
+		self.extra_request_info = {} # Information gathered on the request that are not part of the request obj itself (e.g. client info)
+		# End times of the request processing phases, for the metrics (None if the phase was not reached)
+		self.auth_end = self.throttle_end = self.handler_end = self.response_end = None
+		self.admission = None # (<admission controller>, <admission>, <admission time>) while the request holds a concurrency slot
+
+	def release_admission(self, end):
+		# Frees the request's concurrency slot (if it was admitted), its latency adjusting the endpoint's limit
+		if self.admission is not None:
+			admission_controller, admission, admission_start = self.admission
+			self.admission = None
+			admission_controller.release(admission, end - admission_start)
+
+	def release_admission_on_close(self, response):
+		# Keeps the concurrency slot of a streamed response until the response is closed, once its body is generated and sent
+		admission = self.admission
+		if admission is not None:
+			self.admission = None
+			admission_controller, admission, admission_start = admission
+			# Released by the body's close (streamed responses are passed through as is, without Response.close being called)
+			response.response = ClosingIterator(response.response, lambda: admission_controller.release(admission, time.time() - admission_start))
+
+	def get_phase_times(self, end):
+		# Returns the durations of the auth, throttle, handler and serialization phases, and the total processing time
+		phase_times = []
+		phase_start = self.processing_start
+		for phase_end in (self.auth_end, self.throttle_end, self.handler_end, self.response_end):
+			if phase_end is None:
+				phase_times.append(None)
+			else:
+				phase_times.append(phase_end - phase_start)
+				phase_start = phase_end
+		phase_times.append(end - self.processing_start)
+		return phase_times
 
 class RESTView(View):
 
@@ -12,13 +160,70 @@ class RESTView(View):
 	Custom view for RESTful classes (similar to Flask's built-in MethodView, but more flexible).
 
 	Base class for all REST resource endpoint handlers.
+
+	The handler configuration (allowed methods, authenticators, throttle options) is resolved once per class
+	when the handler is registered. Set share_handler_instance to True in a handler class to also reuse a
+	single handler instance for all requests, instead of creating one per request; such handlers must not
+	keep any per-request state on self.
 	'''
 
+	share_handler_instance = False
+	paginator = None # Set to a flask_rest.utils.pagination.KeysetPaginator for cursor pagination of the resource collection
+	auto_etag = True # Without a get_resource_version hook, add an ETag (hash of the body) to GET responses and answer 304 on match
+	# Request body schemas per method, a dict of flask_rest.utils.schema.Field (or a Field), compiled when the handler is registered.
+	# The body is validated before authentication (BAD_REQUEST with the errors by field), the handler gets it as the request_data argument
+	request_schemas = {} # {<method_name>: <schema>}
+	ip_access_list = ip_access_list # Network-based access control (see flask_rest.utils.ip_access), None to turn it off for the resource
+	handler_config = None # HandlerConfig of the class, set by as_view (see get_handler_config)
+
 	def __init__(self):
 		self.allowed_methods = () # List of allowed HTTP methods on the resource, in upper case (e.g. "GET")
 		self.auth_methods = {'ALL': NoopAuthorization()} # Authorizatin can be customized per request method
+		# Server-side response caching of GET, with the response cache object and time to live (in seconds) per method
+		self.cache_options = {'ALL': (None, 0)} # {<method_name>: (<response_cache_obj>, <ttl>)}
 		# Default throttling options; throttle handler object and whether to override throttle On/Off (None means use default) can be set per method
 		self.throttle_options = {'ALL': (strict_throttle, False)} # {<method_name>: (<throttle_obj>, <throttle_enabled_override>)}
+		# Adaptive concurrency limit (load shedding) per method, see flask_rest.utils.admission (None means no limit)
+		self.admission_options = {'ALL': None} # {<method_name>: <admission_controller_obj>}
+
+	@classmethod
+	def as_view(clss, name, *class_args, **class_kwargs):
+
+		'''
+		Converts the handler class into a view function, resolving its configuration from an instance created
+		once here. With share_handler_instance set, that instance also handles every request.
+		'''
+
+		handler = clss.__dict__.get('_shared_handler')
+		if handler is None:
+			handler = clss(*class_args, **class_kwargs)
+			clss.handler_config = HandlerConfig(handler)
+			clss._shared_handler = handler
+
+		if clss.share_handler_instance:
+			def view(*args, **kwargs):
+				return handler.dispatch_request(*args, **kwargs)
+			async def async_view(*args, **kwargs):
+				return await handler.dispatch_request_async(*args, **kwargs)
+		else:
+			def view(*args, **kwargs):
+				return clss(*class_args, **class_kwargs).dispatch_request(*args, **kwargs)
+			async def async_view(*args, **kwargs):
+				return await clss(*class_args, **class_kwargs).dispatch_request_async(*args, **kwargs)
+
+		if clss.decorators:
+			view.__name__ = name
+			view.__module__ = clss.__module__
+			for decorator in clss.decorators:
+				view = decorator(view)
+
+		view.view_class = clss
+		view.async_view = async_view # Used by the ASGI application (see flask_rest.utils.asgi) for requests with async handlers
+		view.__name__ = name
+		view.__doc__ = clss.__doc__
+		view.__module__ = clss.__module__
+		view.methods = clss.methods
+		return view
 
 	@classmethod
 	def register_handler(clss, endpoint_name, url, resource_id_name, resource_id_type):
@@ -33,24 +238,37 @@ class RESTView(View):
 			resource_id_name: the name of the ID for this REST resource, str
 			resource_id_type: the resource ID data type (e.g. int, str...)
 
-		By default, a reasonable set of routing schemes are supported for the appropriate HTTP methods.
-		Ranged queries on GET are also supported by default, through "/url/1;5" format.
+		By default, the "resource" URL scheme (see URL_SCHEMES) is used, with a rule per URL form: "/url/" for
+		the collection, "/url/<resource_id>" for single resources, and ranged queries on GET, through "/url/1;5"
+		format. Handler methods get no resource ID argument on the collection URL, so it should default to None.
+		If the class has a paginator, GET on the plain URL is cursor paginated, through
+		"/url?cursor=<cursor>&limit=<n>".
+
+		The API's router registers resources from its route manifest instead, importing them lazily (see
+		flask_rest.utils.router).
 		'''
 
-		view_func = clss.as_view(endpoint_name)
-		app.add_url_rule(url, defaults={resource_id_name: None}, view_func=view_func, methods=['GET', 'HEAD', 'OPTIONS'])
-		app.add_url_rule('%s<%s:%s>;<%s:%s>' % (url, 'int', 'lower_cut', 'int', 'upper_cut'), view_func=view_func, methods=['GET', 'HEAD', 'OPTIONS'])
-		app.add_url_rule(url, view_func=view_func, methods=['GET', 'POST', 'HEAD', 'OPTIONS'])
-		app.add_url_rule('%s<%s:%s>' % (url, resource_id_type, resource_id_name), view_func=view_func, methods=['GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS'])
+		add_url_rules(clss.as_view(endpoint_name), endpoint_name, url.rstrip('/'), 'resource', resource_id_name, resource_id_type)
+
+	def get_handler_config(self):
+		# Returns the HandlerConfig of the handler's own class: a subclass of a registered handler class has its own methods and options
+		config = self.__class__.__dict__.get('handler_config')
+		if config is None:
+			config = self.__dict__.get('handler_config')
+			if config is None:
+				# Handler used without going through as_view, resolve its configuration now
+				config = self.handler_config = HandlerConfig(self)
+		return config
 
 	def head(self, *args, **kwargs):
 
 		'''
 		Default handler for HTTP HEAD requests. Calls GET if exists, then returns the status
-		code without response body.
+		code without response body. GET handlers that return a generator never have it run here,
+		so no body data is generated at all.
 		'''
 
-		if 'GET' in self.allowed_methods:
+		if 'GET' in self.get_handler_config().allowed_methods:
 			# Call get, then strip the body
 			if getattr(self, 'get', None):
 				response_name = self.get(*args, **kwargs)[0]
@@ -58,7 +276,20 @@ class RESTView(View):
 			else:
 				return ('NOT_IMPLEMENTED', None)
 		else:
-			headers = {'Allow': sorted(request.url_rule.methods)}
+			headers = {'Allow': self.get_handler_config().get_allow_header(request.url_rule)}
+			return ('NOT_ALLOWED', None, headers)
+
+	async def async_head(self, *args, **kwargs):
+
+		'''
+		Default handler for HTTP HEAD requests when the GET handler is a coroutine function (async def).
+		'''
+
+		if 'GET' in self.get_handler_config().allowed_methods:
+			response_name = (await self.get(*args, **kwargs))[0]
+			return (response_name, None)
+		else:
+			headers = {'Allow': self.get_handler_config().get_allow_header(request.url_rule)}
 			return ('NOT_ALLOWED', None, headers)
 
 	def options(self, *args, **kwargs):
@@ -67,20 +298,21 @@ class RESTView(View):
 		Default handler for HTTP OPTIONS requests. Returns a list of allowed methods in the header.
 		'''
 
-		headers = {'Allow': sorted(request.url_rule.methods)}
+		headers = {'Allow': self.get_handler_config().get_allow_header(request.url_rule)}
 		return ('ALL_OK', None, headers)
 
-	def __log_request(self, processing_start, request_info, response_name):
+	def __log_request(self, context, response_name):
 
 		'''
-		All incoming requests that come in can be logged, and is processed here.
+		All incoming requests that come in can be logged, and is processed here. Only the raw request data is
+		captured here, parsing, serialization and writing are done by the request logger's background thread.
+		By default nothing is logged, sinks can be added to flask_rest.utils.request_logger.request_logger.
 		'''
 
-		logging_data = get_request_data_dict() # Get some data associated with the current request for logging
-		processing_time = time.time() - processing_start
-
-		# By default nothing is logged, but can be easily added here (depending how logging is done).
-		pass
+		end = time.time()
+		context.release_admission(end) # Every request is logged once its response is built, the end of its processing (unless streamed)
+		request_logger.log(context.processing_start, response_name, context.extra_request_info)
+		metrics.observe_request(request.endpoint, context.request_method, response_name, context.get_phase_times(end))
 
 	def dispatch_request(self, *args, **kwargs):
 
@@ -88,49 +320,171 @@ class RESTView(View):
 		Main request handler method.
 		'''
 
+		if request_profiler.enabled:
+			# Profiling configured (see flask_rest.utils.profiler), the profiler decides whether to profile this request
+			return request_profiler.run(self.__process_request, *args, **kwargs)
+		return self.__process_request(*args, **kwargs)
+
+	async def dispatch_request_async(self, *args, **kwargs):
+
+		'''
+		Main request handler method for event loops (used by the ASGI application, see flask_rest.utils.asgi):
+		async handler parts are awaited on the running loop, so slow requests do not hold a thread.
+		'''
+
+		if request_profiler.enabled:
+			return await request_profiler.run_async(self.__process_request_async, *args, **kwargs)
+		return await self.__process_request_async(*args, **kwargs)
+
+	def __process_request(self, *args, **kwargs):
+		# Runs the request processing coroutine to completion. Without async handler parts it never suspends, so it is
+		# simply stepped through once, with no event loop; otherwise it runs on this thread's event loop.
+		plan = self.get_handler_config().dispatch_plans.get(request.method)
+		coroutine = self.__process_request_async(*args, **kwargs)
+		if plan is not None and plan.is_async:
+			return run_coroutine(coroutine)
+		try:
+			coroutine.send(None)
+		except StopIteration as e:
+			return e.value
+		coroutine.close()
+		return rf.get_response('INTERNAL_ERROR') # Suspended, an async handler part was not detected by the plan
+
+	async def __process_request_async(self, *args, **kwargs):
+		context = None
 		try:
-			processing_start = time.time() # Keep track of time used per request, can be logged for monitoring
-			extra_request_info = {} # A dict used to keep track of information gathered on the request that are not part of the request obj itself (e.g. client info)
+			config = self.get_handler_config()
+			request_method = request.method # Already upper case
+			context = RequestContext(request_method, time.time())
+
+			# Network-based access control, before anything else is done for the client:
+			if self.ip_access_list is not None and self.ip_access_list.enabled and not self.ip_access_list.is_allowed(get_remote_address()):
+				self.__log_request(context, 'FORBIDDEN')
+				return rf.get_response('FORBIDDEN')
 
 			# Handler method check:
-			request_method = request.method.upper()
-			if request_method not in (self.allowed_methods + ('OPTIONS', 'HEAD')):
+			plan = config.dispatch_plans.get(request_method)
+			if plan is None:
 				# HTTP method not allowed on this REST resource, log the request, then return the appropriate response with a list of allowed methods
-				self.__log_request(processing_start, extra_request_info, 'NOT_ALLOWED')
-				headers = {'Allow': sorted(request.url_rule.methods)}
+				self.__log_request(context, 'NOT_ALLOWED')
+				headers = {'Allow': config.get_allow_header(request.url_rule)}
 				return rf.get_response('NOT_ALLOWED', None, headers)
-
-			# Get the HTTP method handler function
-			handler_method = getattr(self, request_method.lower(), None)
-			if handler_method is None:
+			if plan.handler_func is None:
 				# The HTTP method handler function has not yet been created, but the method is allowed for the resource
-				self.__log_request(processing_start, extra_request_info, 'NOT_IMPLEMENTED')
+				self.__log_request(context, 'NOT_IMPLEMENTED')
 				return rf.get_response('NOT_IMPLEMENTED')
 
+			# Request body validation, if the handler declares a schema for the method:
+			request_data = None
+			if plan.validator is not None:
+				try:
+					request_data, errors = plan.validator(get_request_data())
+				except RequestDataError as e:
+					self.__log_request(context, 'BAD_REQUEST')
+					return rf.get_response('BAD_REQUEST', str(e))
+				if errors is not None:
+					self.__log_request(context, 'BAD_REQUEST')
+					return rf.get_response('BAD_REQUEST', {'errors': errors})
+
 			# Handle authentication:
-			authenticator = self.auth_methods.get(request_method, self.auth_methods['ALL'])
-			is_authorized, auth_data_obj = authenticator.is_authenticated()
-			extra_request_info['auth_data_obj'] = auth_data_obj # Attach the data obj returned by the authenticator for potential use and logging
+			authenticator = plan.authenticator
+			batch_auth_results = request.environ.get(BATCH_AUTH_RESULTS_KEY)
+			if batch_auth_results is not None and authenticator in batch_auth_results:
+				# Sub-request of a batch (see flask_rest.utils.batch_handler), already authenticated by this authenticator
+				is_authorized, auth_data_obj = batch_auth_results[authenticator]
+			else:
+				auth_result = authenticator.is_authenticated()
+				is_authorized, auth_data_obj = (await auth_result) if plan.is_async and inspect.isawaitable(auth_result) else auth_result
+				if batch_auth_results is not None:
+					batch_auth_results[authenticator] = (is_authorized, auth_data_obj)
+			context.auth_end = time.time()
+			context.extra_request_info['auth_data_obj'] = auth_data_obj # Attach the data obj returned by the authenticator for potential use and logging
 			if not is_authorized:
+				if auth_data_obj and auth_data_obj.get('retry_after'):
+					# Rate limited by the authenticator (e.g. credential lookups, see flask_rest.utils.auth.CachedAuthorization)
+					self.__log_request(context, 'THROTTLED')
+					return rf.get_response('THROTTLED', None, {'Retry-After': str(auth_data_obj['retry_after'])})
 				# Access denied, log the request and return the corresponding auth challenge response
-				self.__log_request(processing_start, extra_request_info, 'UNAUTHORIZED')
+				self.__log_request(context, 'UNAUTHORIZED')
 				return authenticator.get_challenge()
 
 			# Handle request throttling:
-			method_throttle_options = self.throttle_options.get(request_method, self.throttle_options['ALL'])
-			throttler, throttle_override = method_throttle_options
-			is_throttled = throttler.throttle(self.__class__.__name__, throttle_override)
+			throttle_result = plan.throttler.check(self.__class__.__name__, request_method, plan.throttle_override, auth_data_obj)
+			is_throttled, throttle_headers = (await throttle_result) if plan.is_async and inspect.isawaitable(throttle_result) else throttle_result
+			context.throttle_end = time.time()
 			if is_throttled:
-				self.__log_request(processing_start, extra_request_info, 'THROTTLED')
-				return rf.get_response('THROTTLED')
+				self.__log_request(context, 'THROTTLED')
+				return rf.get_response('THROTTLED', None, throttle_headers)
+
+			# Cursor pagination of the collection (when no resource ID or range is in the URL), the decoded page is passed to the handler
+			page = None
+			if plan.paginator is not None and all(value is None for value in kwargs.values()):
+				try:
+					page = kwargs['page'] = plan.paginator.get_page()
+				except InvalidCursor as e:
+					self.__log_request(context, 'BAD_REQUEST')
+					return rf.get_response('BAD_REQUEST', str(e))
+
+			# Serve GET (and HEAD) from the response cache if possible:
+			cache_key = None
+			if plan.response_cache is not None:
+				cache_key = plan.response_cache.get_key(auth_data_obj)
+				response = plan.response_cache.get_response(cache_key)
+				if response is not None:
+					response.headers.extend(throttle_headers)
+					if response.status_code == 200:
+						response.make_conditional(request)
+					self.__log_request(context, 'NOT_MODIFIED' if response.status_code == 304 else 'ALL_OK')
+					return response
+
+			# Adaptive load shedding, if the endpoint has a concurrency limit (cache hits above do not count against it):
+			if plan.admission_controller is not None:
+				admission, admission_headers = plan.admission_controller.admit(request.endpoint, auth_data_obj)
+				if admission is None:
+					self.__log_request(context, 'THROTTLED')
+					admission_headers.update(throttle_headers)
+					return rf.get_response('THROTTLED', None, admission_headers)
+				context.admission = (plan.admission_controller, admission, time.time())
+
+			# Conditional requests, if the handler has a resource version hook (see flask_rest.utils.conditional):
+			version_headers = {}
+			if plan.version_func is not None:
+				try:
+					version = plan.version_func(self, auth_data_obj, *args, **kwargs)
+					version = (await version) if plan.is_async and inspect.isawaitable(version) else version
+					etag, last_modified = version if version is not None else (None, None) # None: the resource does not exist
+				except:
+					self.__log_request(context, 'INTERNAL_ERROR')
+					return rf.get_response('INTERNAL_ERROR')
+				if request_method in ('GET', 'HEAD'):
+					version_headers = get_version_headers(etag, last_modified)
+					if version_headers and is_not_modified(etag, last_modified):
+						# The client already has the current version, skip the handler and the serialization
+						self.__log_request(context, 'NOT_MODIFIED')
+						version_headers.update(throttle_headers)
+						return rf.get_response('NOT_MODIFIED', None, version_headers)
+				elif is_precondition_failed(etag, last_modified, version is not None):
+					# The client's copy of the resource is outdated, do not modify it
+					self.__log_request(context, 'PRECONDITION_FAILED')
+					return rf.get_response('PRECONDITION_FAILED', None, throttle_headers)
 
 			# Response processing by the HTTP method handler function (actual API called here):
 			try:
-				handler_return = handler_method(auth_data_obj, *args, **kwargs)
+				if plan.validator is not None:
+					handler_return = plan.handler_func(self, auth_data_obj, *args, request_data=request_data, **kwargs)
+				else:
+					handler_return = plan.handler_func(self, auth_data_obj, *args, **kwargs)
+				if plan.is_async and inspect.isawaitable(handler_return):
+					handler_return = await handler_return
+				context.handler_end = time.time()
+			except RequestDataError as e:
+				# The handler could not decode the request body (see flask_rest.utils.http_utils.get_request_data)
+				self.__log_request(context, 'BAD_REQUEST')
+				return rf.get_response('BAD_REQUEST', str(e))
 			except:
 				# Something went wrong with the handler's processing of the request. Log the error (possibly more detailed logging and
 				# notification can be added here) and return an error response.
-				self.__log_request(processing_start, extra_request_info, 'INTERNAL_ERROR')
+				self.__log_request(context, 'INTERNAL_ERROR')
 				return rf.get_response('INTERNAL_ERROR')
 
 			# Get API handler return data
@@ -138,21 +492,48 @@ class RESTView(View):
 
 			if response_name == 'UNAUTHORIZED' and response_data is None:
 				# The more advanced auth system in the handler denied access, log it, then propagate this to the client
-				self.__log_request(processing_start, extra_request_info, 'UNAUTHORIZED')
+				self.__log_request(context, 'UNAUTHORIZED')
 				return authenticator.get_challenge()
 
-			response_headers = {}
+			response_headers = dict(throttle_headers) # Rate limit status headers (if any) are passed on to the client
+			if response_name == 'ALL_OK':
+				response_headers.update(version_headers)
+			if page is not None and response_name == 'ALL_OK' and response_data is not None:
+				# Cut the returned items to the page size, and link to the next page
+				response_data, page_headers = plan.paginator.paginate(page, response_data)
+				response_headers.update(page_headers)
+			if response_data is not None and not isinstance(response_data, str) and rf.get_response_format() is None:
+				# Content negotiation: structured data (or streamed items) in none of the data formats the client accepts
+				self.__log_request(context, 'NOT_ACCEPTABLE')
+				return rf.get_response('NOT_ACCEPTABLE')
 			# Check if the API handler pass along any custom headers to add to the response
 			if len(handler_return) == 3:
-				response_headers = handler_return[2]
+				response_headers.update(handler_return[2])
 			response = rf.get_response(response_name, response_data, response_headers)
+			context.response_end = time.time() # Streamed responses are serialized later, while being sent
+			if request_method == 'GET' and response_name == 'ALL_OK' and not version_headers and self.auto_etag and not response.is_streamed:
+				# No cheap version available, use the hash of the body to avoid sending it again (saves bandwidth, not processing)
+				response.add_etag()
+				response.make_conditional(request)
+				if response.status_code == 304:
+					response_name = 'NOT_MODIFIED'
+
+			if cache_key is not None and response_name == 'ALL_OK' and request_method == 'GET':
+				plan.response_cache.store_response(cache_key, response, plan.cache_ttl, throttle_headers)
+			elif request_method in config.MODIFYING_METHODS and response_name in config.MODIFIED_RESPONSE_NAMES:
+				for response_cache in config.response_caches:
+					response_cache.invalidate(request.endpoint)
 
+			if response.is_streamed:
+				context.release_admission_on_close(response) # Its items are generated and serialized while it is sent
 			# Log this request (response_data can be added to extra_request_info if response data should be logged)
-			self.__log_request(processing_start, extra_request_info, response_name)
+			self.__log_request(context, response_name)
 			if app.debug:
 				# In debug mode, return the request processing time as a special header for reference
-				response.headers['Processing-Time'] = time.time() - processing_start
+				response.headers['Processing-Time'] = time.time() - context.processing_start
 			return response
 		except:
 			# Something went wrong with the RestView itself (very bad). Notification of the error can be added here.
-			return rf.get_response('INTERNAL_ERROR')
\ No newline at end of file
+			if context is not None:
+				context.release_admission(time.time())
+			return rf.get_response('INTERNAL_ERROR')
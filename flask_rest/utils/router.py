@@ -1,23 +1,64 @@
+import importlib, threading
 from flask_rest import app
+from flask_rest.utils.restview import add_url_rules
 
-def register_handlers(api_ver):
+'''
+Route manifest of the API: all REST resources of each API version, with their handler class and URL scheme.
+Resources are served at "/<api_ver>/<resource_name>" (endpoint "<api_ver>_<resource_name>"), with the URL
+rules of their URL scheme (see flask_rest.utils.restview.URL_SCHEMES). Add or remove resources here.
+
+	{<api_ver>: {<resource_name>: (<handler class path>, <URL scheme>, <resource ID name>, <resource ID type>)}}
+'''
+
+ROUTE_MANIFEST = {'v1': {'rest_example': ('flask_rest.example_api_v1.example_handler.ExampleHandler', 'collection', None, None),
+						'batch': ('flask_rest.utils.batch_handler.BatchHandler', 'batch', None, None)}, # Runs several requests on the version's resources in one round trip
+				'v2': {'rest_example': ('flask_rest.example_api_v2.example_handler.ExampleHandler', 'resource', 'example_resource_id', 'int'),
+						'batch': ('flask_rest.utils.batch_handler.BatchHandler', 'batch', None, None)}}
+
+def import_handler(handler_path):
+	# Returns the handler class at a dotted path (i.e. "<module>.<class name>"), importing its module
+	module_name, class_name = handler_path.rsplit('.', 1)
+	return getattr(importlib.import_module(module_name), class_name)
+
+def get_lazy_view(endpoint_name, handler_path):
 
 	'''
-	All REST endpoint handlers are registered for routing here. The actual sub-URL routing for each
-	RESTful resource is specified within each resource's implementation. Here the register_handler
-	method is called with the base resource name in the API.
+	Returns a view function standing in for a handler's until its first request: the handler module is only
+	imported then, and its real view function replaces this one in the app. The load_view attribute loads it
+	without handling a request (returning the real view function).
 	'''
 
-	if api_ver == 'v1':
-		# Register REST handlers for API version 1
-		from flask_rest.example_api_v1.example_handler import *
+	lock = threading.Lock()
+	def load_view():
+		with lock:
+			view_func = app.view_functions[endpoint_name]
+			if view_func is lazy_view:
+				view_func = app.view_functions[endpoint_name] = import_handler(handler_path).as_view(endpoint_name)
+		return view_func
+	def lazy_view(*args, **kwargs):
+		return load_view()(*args, **kwargs)
+	lazy_view.__name__ = endpoint_name
+	lazy_view.load_view = load_view
+	return lazy_view
 
-		# Example handler v1
-		ExampleHandler.register_handler('rest_example', '/%s/rest_example/' % (api_ver), None, None)
+def register_handlers(api_ver, lazy=True):
+
+	'''
+	All REST endpoint handlers are registered for routing here, from the route manifest. URL rules are added
+	for every resource of the API version, but the handler modules are imported on their first request (or
+	right away, if lazy is False), so starting a server with a large API does not import all of it.
+	'''
 
-	elif api_ver == 'v2':
-		# Register REST handlers for API version 2
-		from flask_rest.example_api_v2.example_handler import *
+	for resource_name, (handler_path, url_scheme, resource_id_name, resource_id_type) in ROUTE_MANIFEST[api_ver].items():
+		endpoint_name = '%s_%s' % (api_ver, resource_name)
+		if lazy:
+			view_func = get_lazy_view(endpoint_name, handler_path)
+		else:
+			view_func = import_handler(handler_path).as_view(endpoint_name)
+		add_url_rules(view_func, endpoint_name, '/%s/%s' % (api_ver, resource_name), url_scheme, resource_id_name, resource_id_type)
 
-		# Example handler v2
-		ExampleHandler.register_handler('rest_example', '/%s/rest_example/' % (api_ver), None, None)
\ No newline at end of file
+def load_handlers():
+	# Replaces all lazy views by the real ones (importing all handler modules), e.g. before forking worker processes
+	for view_func in list(app.view_functions.values()):
+		if hasattr(view_func, 'load_view'):
+			view_func.load_view()
@@ -0,0 +1,148 @@
+import copy
+
+class Field(object):
+
+	'''
+	Declaration of a request body field (or of the whole body), for RESTView.request_schemas. The checks are
+	applied in order: type (str, int, float, bool, list, dict, or None for any), then the range/length checks
+	and choices configured. A missing field gets its default if it is not required, and null is only accepted
+	if nullable is set. The default can be a callable (e.g. list), called for each request; list, dict and set
+	defaults are copied for each request, so handlers modifying the validated data do not change them.
+
+		items: Field of the list's items
+		fields: {<name>: <Field>} of the dict's fields; fields not declared are errors, unless allow_unknown is set
+	'''
+
+	def __init__(self, field_type=None, required=True, default=None, nullable=False, min_value=None, max_value=None,
+				min_length=None, max_length=None, choices=None, items=None, fields=None, allow_unknown=False):
+		self.field_type = field_type
+		self.required = required
+		self.default = default
+		self.nullable = nullable
+		self.min_value = min_value
+		self.max_value = max_value
+		self.min_length = min_length
+		self.max_length = max_length
+		self.choices = choices
+		self.items = items
+		self.fields = fields
+		self.allow_unknown = allow_unknown
+
+# Type checks and the error messages of their failures. bool is not accepted as a number (it is an int subclass)
+TYPE_CHECKS = {str: (lambda value: type(value) is str, 'must be a string'),
+				int: (lambda value: type(value) is int, 'must be an integer'),
+				float: (lambda value: type(value) in (float, int), 'must be a number'),
+				bool: (lambda value: type(value) is bool, 'must be a boolean'),
+				list: (lambda value: type(value) is list, 'must be an array'),
+				dict: (lambda value: type(value) is dict, 'must be an object')}
+
+ROOT_PATH = 'body' # Path of the whole request body in the errors
+
+def compile_field(field):
+
+	'''
+	Compiles a Field into a validator function, validate(value, path, errors), which returns the validated value
+	(with the defaults of missing fields filled in) and adds the errors found to the errors dict, by field path
+	(e.g. "address.zip", "tags.2"). Only the checks the field declares are part of the function.
+	'''
+
+	checks = [] # [(<predicate>, <error message>)]
+	if field.field_type is not None:
+		if field.field_type not in TYPE_CHECKS:
+			raise ValueError('Unsupported field type: %r' % (field.field_type,))
+		checks.append(TYPE_CHECKS[field.field_type])
+	if field.min_value is not None:
+		checks.append((lambda value, min_value=field.min_value: value >= min_value, 'must be at least %s' % (field.min_value)))
+	if field.max_value is not None:
+		checks.append((lambda value, max_value=field.max_value: value <= max_value, 'must be at most %s' % (field.max_value)))
+	if field.min_length is not None:
+		checks.append((lambda value, min_length=field.min_length: len(value) >= min_length, 'must have a length of at least %d' % (field.min_length)))
+	if field.max_length is not None:
+		checks.append((lambda value, max_length=field.max_length: len(value) <= max_length, 'must have a length of at most %d' % (field.max_length)))
+	if field.choices is not None:
+		choices = frozenset(field.choices)
+		checks.append((lambda value: value in choices, 'must be one of: %s' % (', '.join(sorted([str(choice) for choice in choices])))))
+	checks = tuple(checks)
+	validate_items = compile_field(field.items) if field.items is not None else None
+	validate_fields = compile_fields(field.fields, field.allow_unknown) if field.fields is not None else None
+	nullable = field.nullable
+
+	def validate(value, path, errors):
+		if value is None:
+			if not nullable:
+				errors[path] = 'must not be null'
+			return value
+		for predicate, message in checks:
+			try:
+				if not predicate(value):
+					errors[path] = message
+					return value
+			except TypeError:
+				errors[path] = message # e.g. a length check on a number, without a type check
+				return value
+		if validate_items is not None and type(value) is list:
+			value = [validate_items(item, '%s.%d' % (path, i), errors) for i, item in enumerate(value)]
+		if validate_fields is not None and type(value) is dict:
+			value = validate_fields(value, path, errors)
+		return value
+	return validate
+
+def get_default_factory(default):
+	# Returns the function making a field's default for each request, or None if the default can be shared (immutable)
+	if callable(default):
+		return default
+	if isinstance(default, (list, dict, set)):
+		return lambda: copy.deepcopy(default)
+	return None
+
+def compile_fields(fields, allow_unknown=False):
+	# Compiles the fields of an object into a validator function, validate(value, path, errors), see compile_field
+	compiled_fields = tuple([(name, field.required, field.default, get_default_factory(field.default), compile_field(field)) for name, field in fields.items()])
+	field_names = frozenset(fields)
+
+	def validate(value, path, errors):
+		prefix = path + '.' if path != ROOT_PATH else ''
+		validated = {}
+		present = 0
+		for name, required, default, default_factory, validate_field in compiled_fields:
+			if name in value:
+				validated[name] = validate_field(value[name], prefix + name, errors)
+				present += 1
+			elif required:
+				errors[prefix + name] = 'is required'
+			else:
+				validated[name] = default if default_factory is None else default_factory()
+		if len(value) > present:
+			# Fields that are not declared
+			for name in value:
+				if name not in field_names:
+					if allow_unknown:
+						validated[name] = value[name]
+					else:
+						errors[prefix + str(name)] = 'is not a known field'
+		return validated
+	return validate
+
+def compile_schema(schema):
+
+	'''
+	Compiles a request body schema, either a Field or a dict of Fields (the body is an object with these fields),
+	into a validator function: validate(data) returns a 2-tuple, (<validated data>, <errors>), where <errors> is
+	a dict of error messages by field path, or None if the data is valid. Called once per handler class and
+	method, when the handler is registered.
+	'''
+
+	if not isinstance(schema, Field):
+		schema = Field(dict, fields=schema)
+	validate_body = compile_field(schema)
+	required = schema.required
+
+	def validate(data):
+		errors = {}
+		if data is None:
+			if required:
+				errors[ROOT_PATH] = 'is required'
+			return (data, errors or None)
+		data = validate_body(data, ROOT_PATH, errors)
+		return (data, errors or None)
+	return validate
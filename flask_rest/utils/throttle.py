@@ -1,23 +1,26 @@
+import collections, inspect, itertools, math, os, threading, time
+from flask_rest.utils.http_utils import get_remote_address
+
 class CommonThrottle(object):
 
 	'''
 	The base class for all throttles. Throttling is processed before each request reaches the REST endpoint.
 	'''
 
-	def __init__(self):
-		# Simple, 1-letter codes for request methods, can be used to do HTTP request method based throttling
-		self.THROTTLE_METHOD_TYPE_MAP = {'get': 'g',
-										'head': 'g',
-										'post': 'p',
-										'put': 'u',
-										'patch': 'a',
-										'delete': 'd',
-										'options': 'o'}
+	# Simple, 1-letter codes for request methods, can be used to do HTTP request method based throttling (shared by all throttles)
+	THROTTLE_METHOD_TYPE_MAP = {'get': 'g',
+								'head': 'g',
+								'post': 'p',
+								'put': 'u',
+								'patch': 'a',
+								'delete': 'd',
+								'options': 'o'}
 
+	def __init__(self):
 		# Simple codes for REST resources that need throttling, can be used to do resource based throttling
 		self.THROTTLE_RESOURCE_MAP = {} # {<REST_resource_class_name>: <short_code>}
 
-	def throttle(self, throttle_override=None):
+	def throttle(self, resource_name, throttle_override=None):
 
 		'''
 		The throttle handling function. Returns a boolean of whether the request should be throttled or not.
@@ -27,6 +30,23 @@ class CommonThrottle(object):
 
 		return False
 
+	def check(self, resource_name, request_method, throttle_override=None, auth_data_obj=None):
+
+		'''
+		Called by RESTView for every request. Returns a 2-tuple, (<is_throttled>, <headers>), where <headers>
+		is a dict of extra headers to add to the response (e.g. rate limit status). The default implementation
+		simply calls throttle and adds no headers, so existing throttles only need to override throttle.
+		Either can be a coroutine function (async def), RESTView then awaits the result.
+		'''
+
+		is_throttled = self.throttle(resource_name, throttle_override)
+		if inspect.isawaitable(is_throttled):
+			return self.__check_async(is_throttled)
+		return (is_throttled, {})
+
+	async def __check_async(self, is_throttled):
+		return (await is_throttled, {})
+
 class StrictThrottle(CommonThrottle):
 
 	'''
@@ -34,12 +54,219 @@ class StrictThrottle(CommonThrottle):
 	are throttled.
 	'''
 
-	def __init__(self):
+	def __init__(self, throttle_enabled=False):
+		CommonThrottle.__init__(self)
+		self.throttle_enabled = throttle_enabled
+
+	def throttle(self, resource_name, throttle_override=None):
+		throttle_enabled = self.throttle_enabled
+		if throttle_override is not None:
+			throttle_enabled = (throttle_override == 1)
+		return throttle_enabled
+
+strict_throttle = StrictThrottle()
+
+class LocalThrottleBackend(object):
+
+	'''
+	In-process rate limiting state, suitable for single worker deployments (each worker process keeps its
+	own counters). Keys are spread over a fixed set of stripes, each with its own lock and tables, so
+	concurrent requests for different clients rarely contend. Each stripe keeps at most max_keys / lock_stripes
+	keys, evicting the least recently used one to make room (an evicted client starts over with a full bucket
+	or an empty log), so memory use is bounded and every operation is O(1) (amortized for the sliding window log).
+
+	Both algorithm methods return a 3-tuple, (<allowed>, <remaining>, <retry_after>), with <retry_after> in
+	seconds (0 when allowed).
+	'''
+
+	def __init__(self, lock_stripes=64, max_keys=100000):
+		# [(<lock>, OrderedDict({<key>: [<tokens>, <last_refill_time>]}), OrderedDict({<key>: deque([<request_time>, ...])}))], in LRU order
+		self.__stripes = [(threading.Lock(), collections.OrderedDict(), collections.OrderedDict()) for i in range(lock_stripes)]
+		self.max_keys = max_keys
+		self.__stripe_max_keys = max(1, max_keys // lock_stripes)
+
+	def __stripe_for(self, key):
+		return self.__stripes[hash(key) % len(self.__stripes)]
+
+	def token_bucket(self, key, capacity, refill_rate, now, cost=1):
+		lock, buckets, logs = self.__stripe_for(key)
+		with lock:
+			state = buckets.get(key)
+			if state is None:
+				if len(buckets) >= self.__stripe_max_keys:
+					buckets.popitem(last=False)
+				state = buckets[key] = [float(capacity), now]
+			else:
+				buckets.move_to_end(key)
+			tokens = min(capacity, state[0] + max(0.0, now - state[1]) * refill_rate)
+			allowed = tokens >= cost
+			if allowed:
+				tokens -= cost
+			state[0], state[1] = tokens, now
+		retry_after = 0 if allowed else (cost - tokens) / refill_rate
+		return (allowed, int(tokens), retry_after)
+
+	def sliding_window(self, key, limit, window, now):
+		lock, buckets, logs = self.__stripe_for(key)
+		with lock:
+			log = logs.get(key)
+			if log is None:
+				if len(logs) >= self.__stripe_max_keys:
+					logs.popitem(last=False)
+				log = logs[key] = collections.deque()
+			else:
+				logs.move_to_end(key)
+			while log and log[0] <= now - window:
+				log.popleft()
+			allowed = len(log) < limit
+			if allowed:
+				log.append(now)
+			retry_after = 0 if allowed else log[0] + window - now
+			remaining = limit - len(log)
+		return (allowed, remaining, retry_after)
+
+# Lua scripts used by RedisThrottleBackend, each runs atomically on the Redis server in a single round trip
+TOKEN_BUCKET_SCRIPT = '''
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(state[1])
+local last = tonumber(state[2])
+if tokens == nil then
+	tokens = capacity
+	last = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - last) * refill_rate)
+local allowed = 0
+if tokens >= cost then
+	tokens = tokens - cost
+	allowed = 1
+end
+redis.call('HSET', KEYS[1], 't', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / refill_rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+'''
+
+SLIDING_WINDOW_SCRIPT = '''
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local allowed = 0
+if count < limit then
+	redis.call('ZADD', KEYS[1], now, ARGV[4])
+	count = count + 1
+	allowed = 1
+end
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+local oldest_time = now
+if oldest[2] then
+	oldest_time = oldest[2]
+end
+return {allowed, count, tostring(oldest_time)}
+'''
+
+class RedisThrottleBackend(object):
+
+	'''
+	Shared rate limiting state kept in Redis, so limits hold across all worker processes and servers. Takes a
+	redis-py compatible client (anything with register_script). Each check is a single script call doing O(1)
+	work for the token bucket (O(log n) for the sliding window log's sorted set).
+	'''
+
+	def __init__(self, client, key_prefix='throttle:'):
+		self.key_prefix = key_prefix
+		self.__token_bucket = client.register_script(TOKEN_BUCKET_SCRIPT)
+		self.__sliding_window = client.register_script(SLIDING_WINDOW_SCRIPT)
+		self.__member_counter = itertools.count()
+
+	def token_bucket(self, key, capacity, refill_rate, now, cost=1):
+		allowed, tokens = self.__token_bucket(keys=[self.key_prefix + key], args=[capacity, refill_rate, now, cost])
+		allowed, tokens = bool(int(allowed)), float(tokens)
+		retry_after = 0 if allowed else (cost - tokens) / refill_rate
+		return (allowed, int(tokens), retry_after)
+
+	def sliding_window(self, key, limit, window, now):
+		# Log members must be unique across processes, or concurrent requests at the same time stamp would collapse
+		member = '%r-%d-%d' % (now, os.getpid(), next(self.__member_counter))
+		allowed, count, oldest = self.__sliding_window(keys=[self.key_prefix + key], args=[limit, window, now, member])
+		allowed = bool(int(allowed))
+		retry_after = 0 if allowed else max(0.0, float(oldest) + window - now)
+		return (allowed, limit - int(count), retry_after)
+
+class RateLimitThrottle(CommonThrottle):
+
+	'''
+	A real rate limiting throttle. Requests are counted per client, per resource and per request method, so
+	each client gets its own allowance on each resource. The client is identified by a field of the
+	<auth_data_obj> returned by the authenticator if present (e.g. the user name), or by IP address otherwise.
+
+	Parameters:
+		rate: number of requests allowed per period, int
+		per: the period length in seconds, float
+		algorithm: 'token_bucket' (allows bursts of up to burst requests, refilling at rate/per) or
+					'sliding_window' (exact count of requests in the last per seconds)
+		burst: token bucket capacity, defaults to rate
+		backend: LocalThrottleBackend (default, per process) or a shared backend such as RedisThrottleBackend
+
+	Throttled requests get a Retry-After header, and all checked requests get X-RateLimit-* headers. Throttling
+	is on by default, and can be forced off (or on) per method with the throttle override.
+	'''
+
+	def __init__(self, rate, per=1.0, algorithm='token_bucket', burst=None, backend=None, client_id_field='user_name'):
 		CommonThrottle.__init__(self)
+		if algorithm not in ('token_bucket', 'sliding_window'):
+			raise ValueError('Unknown rate limiting algorithm: %s' % (algorithm))
+		self.rate = rate
+		self.per = float(per)
+		self.algorithm = algorithm
+		self.burst = burst if burst is not None else rate
+		self.backend = backend if backend is not None else LocalThrottleBackend()
+		self.client_id_field = client_id_field
+		self.throttle_enabled = True
+
+	def get_client_key(self, auth_data_obj):
+
+		'''
+		Returns the key identifying the client making the request. Override to identify clients differently.
+		'''
+
+		if auth_data_obj and auth_data_obj.get(self.client_id_field) is not None:
+			return 'u:%s' % (auth_data_obj[self.client_id_field])
+		return 'i:%s' % (get_remote_address())
 
-	def throttle(self, throttle_override=None):
+	def throttle(self, resource_name, throttle_override=None):
+		return self.check(resource_name, 'GET', throttle_override)[0]
+
+	def check(self, resource_name, request_method, throttle_override=None, auth_data_obj=None):
+		throttle_enabled = self.throttle_enabled
 		if throttle_override is not None:
 			throttle_enabled = (throttle_override == 1)
-		return not throttle_enabled
+		if not throttle_enabled:
+			return (False, {})
+
+		key = '%s:%s:%s' % (self.THROTTLE_RESOURCE_MAP.get(resource_name, resource_name),
+							self.THROTTLE_METHOD_TYPE_MAP.get(request_method.lower(), request_method),
+							self.get_client_key(auth_data_obj))
+		now = time.time()
+		if self.algorithm == 'token_bucket':
+			limit = self.burst
+			allowed, remaining, retry_after = self.backend.token_bucket(key, self.burst, self.rate / self.per, now)
+			reset_after = (self.burst - remaining) * self.per / self.rate # Time until the bucket is full again
+		else:
+			limit = self.rate
+			allowed, remaining, retry_after = self.backend.sliding_window(key, self.rate, self.per, now)
+			reset_after = max(retry_after, self.per if remaining < limit else 0)
+
+		headers = {'X-RateLimit-Limit': str(limit),
+					'X-RateLimit-Remaining': str(max(0, remaining)),
+					'X-RateLimit-Reset': str(int(math.ceil(reset_after)))} # Seconds until the allowance is fully restored
+		if not allowed:
+			headers['Retry-After'] = str(max(1, int(math.ceil(retry_after))))
+		return (not allowed, headers)
 
-strict_throttle = StrictThrottle()
\ No newline at end of file
+example_rate_limit_throttle = RateLimitThrottle(100, per=1.0, burst=200) # 100 requests/s per client and resource, bursts of up to 200
@@ -0,0 +1,8 @@
+from flask_rest import app
+from flask_rest.utils.asgi import ASGIApp
+
+application = ASGIApp(app) # For ASGI servers, e.g. "uvicorn runserver_asgi:application"
+
+if __name__ == '__main__':
+	import uvicorn
+	uvicorn.run(application, host='0.0.0.0', port=5000)
\ No newline at end of file
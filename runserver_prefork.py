@@ -0,0 +1,14 @@
+import os, logging, tempfile
+os.environ.setdefault('FLASK_REST_ENV', 'production')
+os.environ.setdefault('FLASK_REST_METRICS_DIR', tempfile.mkdtemp(prefix='flask_rest_metrics_')) # Metrics of all workers merged (see flask_rest.utils.metrics), kept through reloads
+
+from flask_rest import app
+from flask_rest.utils.prefork import PreforkServer
+
+# Multi-process server, configured with FLASK_REST_BIND, FLASK_REST_WORKERS, FLASK_REST_MAX_REQUESTS, etc. (see PreforkServer.from_environ),
+# e.g. "FLASK_REST_SECRET_KEY=<secret> FLASK_REST_WORKERS=8 FLASK_REST_MAX_REQUESTS=10000 python runserver_prefork.py"; "kill -HUP <master PID>" reloads it without downtime
+server = PreforkServer.from_environ(app)
+
+if __name__ == '__main__':
+	logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(process)d] %(message)s')
+	server.run()
@@ -0,0 +1,152 @@
+import os, threading, time
+try: from lupa import lua51 as lua
+except ImportError: lua = None
+try: import redis
+except ImportError: redis = None
+
+class FakeRedis(object):
+
+	'''
+	A minimal in-memory stand-in for a Redis client, implementing only what the shared backends use
+	(flask_rest.utils.throttle.RedisThrottleBackend and flask_rest.utils.response_cache.RedisCacheBackend).
+	Registered scripts are run by Lua 5.1 (the version embedded in Redis) through lupa, with redis.call backed by
+	the same store, so the shared rate limiting scripts are tested as Redis would run them.
+	'''
+
+	def __init__(self):
+		self.__lock = threading.Lock()
+		self.__store = {} # {<key>: [<value>, <expire_time>]}, values are bytes, dicts (hashes) or dicts of scores (sorted sets)
+		self.__commands = {'HMGET': self.__hmget, 'HSET': self.__hset, 'PEXPIRE': self.__pexpire, 'ZADD': self.__zadd,
+							'ZCARD': self.__zcard, 'ZRANGE': self.__zrange, 'ZREMRANGEBYSCORE': self.__zremrangebyscore}
+		self.__lua = None
+
+	def register_script(self, script):
+		if lua is None:
+			raise RuntimeError('lupa is required to run scripts')
+		if self.__lua is None:
+			self.__lua = lua.LuaRuntime(unpack_returned_tuples=True)
+			self.__lua.globals().redis = self.__lua.table(call=self.__call)
+		function = self.__lua.eval('function(KEYS, ARGV)\n%s\nend' % (script))
+		def script_callable(keys=[], args=[]):
+			with self.__lock:
+				result = function(self.__lua.table_from(keys), self.__lua.table_from([self.__encode(arg) for arg in args]))
+				return self.__to_reply(result)
+		return script_callable
+
+	def get(self, key):
+		with self.__lock:
+			return self.__get(key, None)
+
+	def set(self, key, value, px=None):
+		with self.__lock:
+			self.__store[key] = [self.__encode(value), time.time() + px / 1000.0 if px else float('inf')]
+		return True
+
+	def incr(self, key):
+		with self.__lock:
+			value = int(self.__get(key, 0)) + 1
+			self.__store[key] = [str(value).encode('ascii'), float('inf')]
+			return value
+
+	def delete(self, *keys):
+		with self.__lock:
+			return len([self.__store.pop(key) for key in keys if key in self.__store])
+
+	def __get(self, key, default):
+		entry = self.__store.get(key)
+		if entry is None or entry[1] <= time.time():
+			return default
+		return entry[0]
+
+	def __encode(self, value):
+		# Returns the value as Redis stores it (bytes)
+		if isinstance(value, bytes):
+			return value
+		return (repr(value) if isinstance(value, float) else str(value)).encode('utf-8')
+
+	def __to_reply(self, value):
+		# Converts a script's return value like Redis does: numbers are truncated to integers, tables become lists (up to the first nil)
+		if lua.lua_type(value) == 'table':
+			items = []
+			for i in range(1, len(value) + 1):
+				if value[i] is None:
+					break
+				items.append(self.__to_reply(value[i]))
+			return items
+		if isinstance(value, bool):
+			return 1 if value else None
+		if isinstance(value, (int, float)):
+			return int(value)
+		return value.encode('utf-8') if isinstance(value, str) else value
+
+	def __call(self, command, key, *args):
+		# redis.call of the scripts, run with the store lock held by the script call
+		key = key.decode('utf-8') if isinstance(key, bytes) else key
+		entry = self.__store.get(key)
+		if entry is not None and entry[1] <= time.time():
+			del self.__store[key]
+		result = self.__commands[command.upper()](key, [arg.decode('utf-8') if isinstance(arg, bytes) else arg for arg in args])
+		return self.__lua.table_from(result) if isinstance(result, list) else result
+
+	def __get_container(self, key, create):
+		entry = self.__store.get(key)
+		if entry is None:
+			if not create:
+				return {}
+			entry = self.__store[key] = [{}, float('inf')]
+		return entry[0]
+
+	def __hmget(self, key, fields):
+		values = self.__get_container(key, False)
+		return [values[field] if field in values else False for field in fields] # Nil replies are false in Lua
+
+	def __hset(self, key, args):
+		values = self.__get_container(key, True)
+		for i in range(0, len(args), 2):
+			values[args[i]] = str(args[i + 1])
+		return len(args) // 2
+
+	def __pexpire(self, key, args):
+		if key not in self.__store:
+			return 0
+		self.__store[key][1] = time.time() + float(args[0]) / 1000.0
+		return 1
+
+	def __zadd(self, key, args):
+		scores = self.__get_container(key, True)
+		added = 0
+		for i in range(0, len(args), 2):
+			added += args[i + 1] not in scores
+			scores[args[i + 1]] = float(args[i])
+		return added
+
+	def __zcard(self, key, args):
+		return len(self.__get_container(key, False))
+
+	def __zrange(self, key, args):
+		members = sorted(self.__get_container(key, False).items(), key=lambda item: (item[1], item[0]))
+		start, stop = int(args[0]), int(args[1])
+		members = members[start:(stop + 1) or None]
+		if len(args) > 2 and args[2].upper() == 'WITHSCORES':
+			return [str(value) for member, score in members for value in (member, repr(score))]
+		return [member for member, score in members]
+
+	def __zremrangebyscore(self, key, args):
+		scores = self.__get_container(key, False)
+		low, high = [float(arg) for arg in args]
+		removed = [member for member, score in scores.items() if low <= score <= high]
+		for member in removed:
+			del scores[member]
+		return len(removed)
+
+def get_test_redis():
+
+	'''
+	Returns a client to test the shared backends with: a real Redis server if the FLASK_REST_TEST_REDIS_URL
+	environment variable is set (and redis-py is installed), else a FakeRedis if lupa is installed, else None.
+	'''
+
+	redis_url = os.environ.get('FLASK_REST_TEST_REDIS_URL')
+	if redis_url and redis is not None:
+		return redis.Redis.from_url(redis_url)
+	return FakeRedis() if lua is not None else None
@@ -0,0 +1,101 @@
+import time, unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.admission import AdmissionController
+
+single_admission_controller = AdmissionController('aimd', initial_limit=1, max_limit=1)
+
+class AdmittedHandler(RESTView):
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+		self.admission_options = {'ALL': single_admission_controller} # One request at a time
+
+	def get(self, auth_data_obj, kind=None):
+		if kind == 'streamed':
+			return ('ALL_OK', iter([{'id': i} for i in range(3)]))
+		if kind == 'error':
+			raise ValueError('Handler failure')
+		return ('ALL_OK', {'kind': kind})
+
+app.add_url_rule('/tests/admitted/<kind>', view_func=AdmittedHandler.as_view('tests_admitted'), methods=['GET'])
+
+class AdmissionControllerTest(unittest.TestCase):
+
+	def admit_all(self, admission_controller, auth_data_obj, count=10):
+		admissions = []
+		for i in range(count):
+			admission, headers = admission_controller.admit('tests_endpoint', auth_data_obj)
+			if admission is None:
+				self.assertEqual(headers, {'Retry-After': '1'})
+				break
+			admissions.append(admission)
+		return admissions
+
+	def test_priorities(self):
+		admission_controller = AdmissionController(initial_limit=10, priority_shares=(0.5, 0.8, 1.0))
+		anonymous = self.admit_all(admission_controller, {})
+		authenticated = self.admit_all(admission_controller, {'user_name': 'Jane'})
+		premium = self.admit_all(admission_controller, {'user_name': 'John', 'premium': True})
+		self.assertEqual([len(anonymous), len(authenticated), len(premium)], [5, 3, 2]) # Lower priorities shed first
+		self.assertEqual(admission_controller.get_limits()['tests_endpoint'], (10.0, 10))
+		admission_controller.release(premium[0], 0.01)
+		self.assertEqual(len(self.admit_all(admission_controller, {'user_name': 'John', 'premium': True})), 1)
+
+	def test_aimd(self):
+		admission_controller = AdmissionController('aimd', initial_limit=10, latency_threshold=0.5, backoff_ratio=0.5)
+		admissions = self.admit_all(admission_controller, {'premium': True})
+		for admission in admissions[:5]:
+			admission_controller.release(admission, 0.01) # Fast and busy: grows
+		limit = admission_controller.get_limits()['tests_endpoint'][0]
+		self.assertGreater(limit, 10.0)
+		for admission in admissions[5:]:
+			admission_controller.release(admission, 1.0) # Slow: halved once for the slow requests in flight together
+		self.assertAlmostEqual(admission_controller.get_limits()['tests_endpoint'][0], limit / 2)
+
+	def test_gradient(self):
+		admission_controller = AdmissionController('gradient', initial_limit=20, max_limit=100)
+		limits = []
+		for latency in (0.01, 0.2):
+			for i in range(50):
+				for admission in self.admit_all(admission_controller, {'premium': True}, count=100):
+					admission_controller.release(admission, latency)
+			limits.append(admission_controller.get_limits()['tests_endpoint'][0])
+		self.assertGreater(limits[0], 20.0) # Latency stayed normal: grew
+		self.assertLess(limits[1], limits[0] / 2) # Requests got slower: shrunk
+
+	def test_queue_time(self):
+		admission_controller = AdmissionController(max_queue_time=1.0)
+		for request_start, is_admitted in (('t=%d' % (int((time.time() - 5) * 1000)), False), ('t=%f' % (time.time() - 5), False),
+											('%d' % (int(time.time() * 1000000)), True), ('garbage', True), (None, True)):
+			headers = {'X-Request-Start': request_start} if request_start else {}
+			with app.test_request_context('/', headers=headers):
+				admission, headers = admission_controller.admit('tests_queue_time', {})
+			self.assertEqual(admission is not None, is_admitted, request_start)
+
+class AdmissionTest(unittest.TestCase):
+
+	def test_rejected(self):
+		client = app.test_client()
+		self.assertEqual(client.get('/tests/admitted/single').status_code, 200)
+		response = client.get('/tests/admitted/streamed') # Holds the slot until the body is sent and closed
+		second_response = client.get('/tests/admitted/single')
+		self.assertEqual(second_response.status_code, 503)
+		self.assertEqual(second_response.headers['Retry-After'], '1')
+		self.assertEqual(len(response.get_json()), 3)
+		response.close()
+		self.assertEqual(client.get('/tests/admitted/single').status_code, 200)
+
+	def test_released_on_error(self):
+		client = app.test_client()
+		self.assertEqual(client.get('/tests/admitted/error').status_code, 500)
+		self.assertEqual(client.get('/tests/admitted/single').status_code, 200)
+		self.assertEqual(single_admission_controller.get_limits()['tests_admitted'][1], 0)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,114 @@
+import asyncio, threading, time, unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.asgi import ASGIApp
+
+class AsyncHandler(RESTView):
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET', 'PUT')
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	async def get(self, auth_data_obj, delay=None):
+		await asyncio.sleep(delay / 1000.0) # Waiting on I/O, without blocking the event loop
+		return ('ALL_OK', {'delay': delay, 'thread': threading.current_thread().name})
+
+	def put(self, auth_data_obj, delay=None):
+		return ('ALL_OK', {'thread': threading.current_thread().name})
+
+app.add_url_rule('/tests/async/<int:delay>', view_func=AsyncHandler.as_view('tests_async'), methods=['GET', 'PUT', 'HEAD'])
+
+def call_asgi(asgi_app, method, path, headers=(), body=b'', chunk_size=None):
+	# Returns (<coroutine function sending an HTTP request to the ASGI app>, <list of the messages the app sent>)
+	chunk_size = chunk_size or max(len(body), 1)
+	messages = [{'type': 'http.request', 'body': body[i:i + chunk_size], 'more_body': i + chunk_size < len(body)} for i in range(0, max(len(body), 1), chunk_size)]
+	sent = []
+	async def receive():
+		return messages.pop(0)
+	async def send(message):
+		sent.append(message)
+	path, _, query_string = path.partition('?')
+	scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query_string.encode('latin-1'), 'http_version': '1.1',
+			'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers], 'client': ('127.0.0.1', 50000)}
+	async def run():
+		await asgi_app(scope, receive, send)
+	return run, sent
+
+def get_response(sent):
+	# Returns the (<status>, <headers dict>, <body>) of the response messages
+	headers = dict([(name.decode('latin-1'), value.decode('latin-1')) for name, value in sent[0]['headers']])
+	body = b''.join([message.get('body', b'') for message in sent[1:]])
+	assert not sent[-1].get('more_body') # The response was ended
+	return (sent[0]['status'], headers, body)
+
+class ASGIAppTest(unittest.TestCase):
+
+	def setUp(self):
+		self.asgi_app = ASGIApp(app, max_threads=2)
+
+	def tearDown(self):
+		self.asgi_app.executor.shutdown()
+
+	def request(self, method, path, **kwargs):
+		run, sent = call_asgi(self.asgi_app, method, path, **kwargs)
+		asyncio.run(run())
+		return get_response(sent)
+
+	def test_async_handler(self):
+		status, headers, body = self.request('GET', '/tests/async/1')
+		self.assertEqual(status, 200)
+		self.assertEqual(headers['content-type'], 'application/json; charset=utf-8')
+		self.assertIn(b'"thread":"MainThread"', body) # Run on the event loop
+
+	def test_sync_handler(self):
+		status, headers, body = self.request('PUT', '/tests/async/1')
+		self.assertEqual(status, 200)
+		self.assertNotIn(b'"thread":"MainThread"', body) # Run in the thread pool
+		status, headers, body = self.request('GET', '/v2/rest_example/1;3') # Streamed
+		self.assertEqual(status, 200)
+		self.assertEqual(body.count(b'example_obj_id'), 2)
+
+	def test_concurrent_requests(self):
+		runs = [call_asgi(self.asgi_app, 'GET', '/tests/async/200') for i in range(20)]
+		async def run_all():
+			await asyncio.gather(*[run() for run, sent in runs])
+		start_time = time.time()
+		asyncio.run(run_all())
+		self.assertLess(time.time() - start_time, 2.0) # Not one after the other, and not limited by the thread pool
+		self.assertEqual([get_response(sent)[0] for run, sent in runs], [200] * 20)
+
+	def test_head(self):
+		status, headers, body = self.request('HEAD', '/tests/async/1')
+		self.assertEqual(status, 200)
+		self.assertEqual(body, b'')
+		status, headers, body = self.request('HEAD', '/v2/rest_example/1', headers=[('Authorization', 'ExampleAuth not-so-random-access-key-qwerty')])
+		self.assertEqual(status, 200)
+		self.assertEqual(body, b'')
+
+	def test_request_body(self):
+		body = b'{"a": "' + b'x' * 1000 + b'"}'
+		status, headers, response_body = self.request('PUT', '/tests/async/1', headers=[('Content-Type', 'application/json')], body=body, chunk_size=100)
+		self.assertEqual(status, 200)
+		too_large = b'x' * (app.config['MAX_CONTENT_LENGTH'] + 1)
+		self.assertEqual(self.request('PUT', '/tests/async/1', body=too_large, chunk_size=1048576)[0], 413)
+		self.assertEqual(self.request('PUT', '/tests/async/1', headers=[('Content-Length', str(len(too_large)))], body=b'x')[0], 413)
+
+	def test_not_found(self):
+		self.assertEqual(self.request('GET', '/tests/missing')[0], 404)
+
+	def test_lifespan(self):
+		messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+		sent = []
+		async def receive():
+			return messages.pop(0)
+		async def send(message):
+			sent.append(message['type'])
+		asyncio.run(self.asgi_app({'type': 'lifespan'}, receive, send))
+		self.assertEqual(sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete'])
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,135 @@
+import threading, time, unittest
+from flask import request
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import AuthCache, CachedAuthorization, ExampleAuthorization, credential_digest
+from flask_rest.utils.throttle import strict_throttle
+
+class CountingAuthorization(CachedAuthorization):
+
+	'''
+	Valid credentials start with "valid", lookups are counted (and can be held up to test single-flight).
+	'''
+
+	lookups = 0
+	lookup_started = None
+	release_lookup = None
+
+	def get_credential(self):
+		return request.headers.get('Authorization', None)
+
+	def lookup_credential(self, credential):
+		type(self).lookups += 1
+		if self.release_lookup is not None:
+			self.lookup_started.set()
+			self.release_lookup.wait(5.0)
+		return {'user_name': credential} if credential.startswith('valid') else None
+
+class LimitedAuthorization(CountingAuthorization):
+
+	lookups = 0
+
+	def __init__(self):
+		CountingAuthorization.__init__(self, lookup_rate=0.001, lookup_burst=2)
+
+class LimitedAuthHandler(RESTView):
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': LimitedAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj):
+		return ('ALL_OK', auth_data_obj)
+
+app.add_url_rule('/tests/limited_auth', view_func=LimitedAuthHandler.as_view('tests_limited_auth'), methods=['GET'])
+
+class AuthCacheTest(unittest.TestCase):
+
+	def test_ttl(self):
+		auth_cache = AuthCache(ttl=0.1, negative_ttl=0.05)
+		auth_cache.set(b'valid', {'user_name': 'John'})
+		auth_cache.set(b'invalid', None)
+		self.assertEqual(auth_cache.get(b'valid'), (True, {'user_name': 'John'}))
+		self.assertEqual(auth_cache.get(b'invalid'), (True, None)) # Negative caching
+		time.sleep(0.06)
+		self.assertEqual(auth_cache.get(b'invalid'), (False, None))
+		self.assertEqual(auth_cache.get(b'valid'), (True, {'user_name': 'John'}))
+		time.sleep(0.05)
+		self.assertEqual(auth_cache.get(b'valid'), (False, None))
+
+	def test_least_recently_used(self):
+		auth_cache = AuthCache(max_entries=2)
+		auth_cache.set(b'a', {})
+		auth_cache.set(b'b', {})
+		auth_cache.get(b'a') # "b" is evicted next
+		auth_cache.set(b'c', {})
+		self.assertEqual([auth_cache.get(digest)[0] for digest in (b'a', b'b', b'c')], [True, False, True])
+
+class CachedAuthorizationTest(unittest.TestCase):
+
+	def setUp(self):
+		CountingAuthorization().revoke_all()
+
+	def is_authenticated(self, authorization, credential):
+		with app.test_request_context('/', headers={'Authorization': credential}):
+			return authorization.is_authenticated()
+
+	def test_lookups_cached(self):
+		lookups = CountingAuthorization.lookups
+		for i in range(3):
+			# A new instance every time, as with handlers created per request
+			self.assertEqual(self.is_authenticated(CountingAuthorization(), 'valid-1'), (True, {'user_name': 'valid-1'}))
+			self.assertEqual(self.is_authenticated(CountingAuthorization(), 'guess'), (False, {}))
+		self.assertEqual(CountingAuthorization.lookups, lookups + 2)
+		CountingAuthorization().revoke('valid-1')
+		self.is_authenticated(CountingAuthorization(), 'valid-1')
+		self.assertEqual(CountingAuthorization.lookups, lookups + 3)
+
+	def test_shared_per_class(self):
+		self.assertIs(CountingAuthorization().auth_cache, CountingAuthorization().auth_cache)
+		self.assertIsNot(CountingAuthorization().auth_cache, ExampleAuthorization().auth_cache)
+		self.assertIsNot(CountingAuthorization().auth_cache, LimitedAuthorization().auth_cache)
+
+	def test_single_flight(self):
+		CountingAuthorization.lookup_started = threading.Event()
+		CountingAuthorization.release_lookup = threading.Event()
+		lookups = CountingAuthorization.lookups
+		results = []
+		def authenticate():
+			results.append(self.is_authenticated(CountingAuthorization(), 'valid-2'))
+		try:
+			threads = [threading.Thread(target=authenticate) for i in range(5)]
+			threads[0].start()
+			CountingAuthorization.lookup_started.wait(5.0)
+			for thread in threads[1:]:
+				thread.start()
+			time.sleep(0.05) # The other requests wait on the lookup in progress
+			CountingAuthorization.release_lookup.set()
+			for thread in threads:
+				thread.join()
+		finally:
+			CountingAuthorization.release_lookup = None
+		self.assertEqual(results, [(True, {'user_name': 'valid-2'})] * 5)
+		self.assertEqual(CountingAuthorization.lookups, lookups + 1)
+
+	def test_lookups_rate_limited(self):
+		client = app.test_client()
+		lookups = LimitedAuthorization.lookups
+		self.assertEqual(client.get('/tests/limited_auth', headers={'Authorization': 'valid-3'}).status_code, 200)
+		self.assertEqual(client.get('/tests/limited_auth', headers={'Authorization': 'guess-1'}).status_code, 401)
+		response = client.get('/tests/limited_auth', headers={'Authorization': 'guess-2'})
+		self.assertEqual(response.status_code, 503) # Throttled without a lookup
+		self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+		self.assertEqual(LimitedAuthorization.lookups, lookups + 2)
+		self.assertEqual(client.get('/tests/limited_auth', headers={'Authorization': 'valid-3'}).status_code, 200) # Cached
+
+	def test_example_authorization(self):
+		self.assertEqual(self.is_authenticated(ExampleAuthorization(), 'ExampleAuth not-so-random-access-key-123456')[1]['user_name'], 'Jane')
+		for credential in ('ExampleAuth not-so-random-access-key', 'OtherAuth not-so-random-access-key-123456', 'not-so-random-access-key-123456'):
+			self.assertEqual(self.is_authenticated(ExampleAuthorization(), credential), (False, {}))
+		self.assertEqual(len(credential_digest('key')), 32)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from flask import request
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import CommonAuthorization
+from flask_rest.utils.throttle import strict_throttle
+
+class CountingAuthorization(CommonAuthorization):
+
+	calls = 0
+
+	def is_authenticated(self):
+		type(self).calls += 1
+		if request.headers.get('Authorization') != 'tests-key':
+			return (False, {})
+		return (True, {'user_name': 'tests'})
+
+class BatchedHandler(RESTView):
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET', 'PUT')
+		self.auth_methods = {'ALL': CountingAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, resource_id=None):
+		return ('ALL_OK', {'id': resource_id, 'user_name': auth_data_obj['user_name']})
+
+	def put(self, auth_data_obj, resource_id=None):
+		return ('ALL_OK', {'id': resource_id, 'data': request.get_json()})
+
+# Under the v2 API, so it can be batched through /v2/batch
+app.add_url_rule('/v2/tests_batched/<int:resource_id>', view_func=BatchedHandler.as_view('tests_batched'), methods=['GET', 'PUT'])
+
+class BatchTest(unittest.TestCase):
+
+	def post_batch(self, batch, **kwargs):
+		response = app.test_client().post('/v2/batch', json=batch, **kwargs)
+		self.assertEqual(response.status_code, 200)
+		return response.get_json()
+
+	def test_results(self):
+		results = self.post_batch({'requests': [{'method': 'GET', 'path': '/v2/rest_example/1'},
+												{'method': 'PUT', 'path': '/v2/tests_batched/2', 'body': {'a': 1}},
+												{'method': 'GET', 'path': '/v2/tests_batched/3'}]}, headers={'Authorization': 'tests-key'})
+		self.assertEqual([(result['status'], result['response']) for result in results], [(200, 'ALL_OK')] * 3)
+		self.assertEqual(results[0]['body']['example_obj_id'], 1)
+		self.assertEqual(results[1]['body'], {'id': 2, 'data': {'a': 1}})
+		self.assertEqual(results[2]['body'], {'id': 3, 'user_name': 'tests'})
+
+	def test_authenticated_once(self):
+		calls = CountingAuthorization.calls
+		results = self.post_batch([{'path': '/v2/tests_batched/%d' % (i)} for i in range(5)], headers={'Authorization': 'tests-key'})
+		self.assertEqual([result['status'] for result in results], [200] * 5)
+		self.assertEqual(CountingAuthorization.calls, calls + 1)
+		# Sub-requests can not authenticate differently than the batch
+		results = self.post_batch([{'path': '/v2/tests_batched/1', 'headers': {'Authorization': 'tests-key'}}])
+		self.assertEqual(results[0]['status'], 401)
+
+	def test_invalid_sub_requests(self):
+		results = self.post_batch([{'path': '/v1/rest_example/1'}, {'path': '/v2/missing'}, {'method': 'DELETE', 'path': '/v2/tests_batched/1'},
+									{'method': 'POST', 'path': '/v2/batch', 'body': []}, {'method': 'GET'}, 'GET /v2/rest_example/1'])
+		self.assertEqual([result['status'] for result in results], [404, 404, 405, 404, 400, 400])
+
+	def test_concurrent(self):
+		sub_requests = [{'path': '/v2/tests_batched/%d' % (i)} for i in range(8)]
+		results = self.post_batch({'requests': sub_requests, 'concurrent': True}, headers={'Authorization': 'tests-key'})
+		self.assertEqual([result['body']['id'] for result in results], list(range(8))) # In order
+
+	def test_batch_limits(self):
+		client = app.test_client()
+		response = client.post('/v2/batch', json=[{'path': '/v2/rest_example/1'}] * 21)
+		self.assertEqual(response.status_code, 413)
+		self.assertEqual(client.post('/v2/batch', json={'calls': []}).status_code, 400)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,73 @@
+import gzip, json, unittest, zlib
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.compression import ResponseCompressor, brotli
+
+class SizedHandler(RESTView):
+
+	auto_etag = False
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, size=None):
+		return ('ALL_OK', {'data': 'x' * size})
+
+app.add_url_rule('/tests/sized/<int:size>', view_func=SizedHandler.as_view('tests_sized'), methods=['GET'])
+
+class CompressionTest(unittest.TestCase):
+
+	def test_gzip(self):
+		response = app.test_client().get('/tests/sized/5000', headers={'Accept-Encoding': 'gzip, deflate'})
+		self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+		self.assertIn('Accept-Encoding', response.headers['Vary'])
+		self.assertEqual(int(response.headers['Content-Length']), len(response.data))
+		self.assertLess(len(response.data), 1000)
+		self.assertEqual(json.loads(gzip.decompress(response.data)), {'data': 'x' * 5000})
+
+	def test_identity(self):
+		client = app.test_client()
+		for size, accept_encoding in ((5000, None), (5000, 'gzip;q=0, identity'), (5000, 'compress'), (10, 'gzip')):
+			headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+			response = client.get('/tests/sized/%d' % (size), headers=headers)
+			self.assertNotIn('Content-Encoding', response.headers)
+			self.assertEqual(response.get_json(), {'data': 'x' * size})
+		self.assertIn('Accept-Encoding', client.get('/tests/sized/5000').headers['Vary']) # Could have been compressed
+		self.assertNotIn('Accept-Encoding', client.get('/tests/sized/10').headers['Vary']) # Too small either way
+
+	def test_streamed(self):
+		response = app.test_client().get('/v2/rest_example/1;300', headers={'Accept-Encoding': 'gzip'})
+		self.assertTrue(response.is_streamed)
+		self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+		self.assertEqual(len(json.loads(gzip.decompress(response.data))), 299)
+
+	def test_chunks_flushed(self):
+		# Every compressed chunk decompresses to its data right away, so streamed items are not held back
+		compressor = ResponseCompressor()
+		decompressor = zlib.decompressobj(31)
+		chunks = [b'[1,2,3', b',4,5,6', b']']
+		compressed_chunks = compressor.iter_compress(iter(chunks), 'gzip')
+		for chunk in chunks:
+			self.assertEqual(decompressor.decompress(next(compressed_chunks)), chunk)
+		decompressor.decompress(b''.join(compressed_chunks))
+		self.assertTrue(decompressor.eof)
+
+	def test_deterministic(self):
+		compressor = ResponseCompressor()
+		self.assertEqual(compressor.compress(b'x' * 5000, 'gzip'), compressor.compress(b'x' * 5000, 'gzip')) # No time stamp
+
+	@unittest.skipIf(brotli is None, 'Needs the brotli package')
+	def test_brotli(self):
+		response = app.test_client().get('/tests/sized/5000', headers={'Accept-Encoding': 'gzip, br'})
+		self.assertEqual(response.headers['Content-Encoding'], 'br')
+		self.assertEqual(json.loads(brotli.decompress(response.data)), {'data': 'x' * 5000})
+		response = app.test_client().get('/v2/rest_example/1;300', headers={'Accept-Encoding': 'br'})
+		self.assertEqual(len(json.loads(brotli.decompress(response.data))), 299)
+
+if __name__ == '__main__':
+	unittest.main()
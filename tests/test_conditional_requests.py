@@ -0,0 +1,83 @@
+import datetime, unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+
+RESOURCES = {1: ['v1', datetime.datetime(2016, 3, 27, 12, 0, 0)]} # {<resource_id>: [<etag>, <last_modified>]}
+
+class VersionedHandler(RESTView):
+
+	calls = 0 # Handler calls, by every request
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET', 'PUT')
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get_resource_version(self, auth_data_obj, resource_id=None):
+		return RESOURCES.get(resource_id)
+
+	def get(self, auth_data_obj, resource_id=None):
+		type(self).calls += 1
+		return ('ALL_OK', {'id': resource_id})
+
+	def put(self, auth_data_obj, resource_id=None):
+		type(self).calls += 1
+		return ('ALL_OK', {'id': resource_id})
+
+class UnversionedHandler(VersionedHandler):
+
+	get_resource_version = None
+
+app.add_url_rule('/tests/versioned/<int:resource_id>', view_func=VersionedHandler.as_view('tests_versioned'), methods=['GET', 'PUT', 'HEAD'])
+app.add_url_rule('/tests/unversioned/<int:resource_id>', view_func=UnversionedHandler.as_view('tests_unversioned'), methods=['GET'])
+
+class ConditionalRequestsTest(unittest.TestCase):
+
+	def test_version_headers(self):
+		response = app.test_client().get('/tests/versioned/1')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.headers['ETag'], '"v1"')
+		self.assertEqual(response.headers['Last-Modified'], 'Sun, 27 Mar 2016 12:00:00 GMT')
+
+	def test_not_modified(self):
+		client = app.test_client()
+		calls = VersionedHandler.calls
+		for method in (client.get, client.head):
+			self.assertEqual(method('/tests/versioned/1', headers={'If-None-Match': '"v0", "v1"'}).status_code, 304)
+			self.assertEqual(method('/tests/versioned/1', headers={'If-Modified-Since': 'Sun, 27 Mar 2016 12:00:00 GMT'}).status_code, 304)
+		self.assertEqual(VersionedHandler.calls, calls) # Answered without running the handler
+		self.assertEqual(client.get('/tests/versioned/1', headers={'If-None-Match': '"v0"'}).status_code, 200)
+		self.assertEqual(client.get('/tests/versioned/1', headers={'If-Modified-Since': 'Sun, 27 Mar 2016 11:59:59 GMT'}).status_code, 200)
+		# If-None-Match takes precedence over If-Modified-Since
+		response = client.get('/tests/versioned/1', headers={'If-None-Match': '"v0"', 'If-Modified-Since': 'Sun, 27 Mar 2016 12:00:00 GMT'})
+		self.assertEqual(response.status_code, 200)
+
+	def test_preconditions(self):
+		client = app.test_client()
+		calls = VersionedHandler.calls
+		self.assertEqual(client.put('/tests/versioned/1', headers={'If-Match': '"v0"'}).status_code, 412)
+		self.assertEqual(client.put('/tests/versioned/1', headers={'If-Match': 'W/"v1"'}).status_code, 412) # Strong comparison
+		self.assertEqual(client.put('/tests/versioned/1', headers={'If-Unmodified-Since': 'Sun, 27 Mar 2016 11:59:59 GMT'}).status_code, 412)
+		self.assertEqual(client.put('/tests/versioned/2', headers={'If-Match': '*'}).status_code, 412) # Does not exist
+		self.assertEqual(VersionedHandler.calls, calls) # Rejected without running the handler
+		self.assertEqual(client.put('/tests/versioned/1', headers={'If-Match': '"v1"'}).status_code, 200)
+		self.assertEqual(client.put('/tests/versioned/1', headers={'If-Match': '*'}).status_code, 200)
+		self.assertEqual(client.put('/tests/versioned/1', headers={'If-Unmodified-Since': 'Sun, 27 Mar 2016 12:00:00 GMT'}).status_code, 200)
+		self.assertEqual(client.put('/tests/versioned/2').status_code, 200) # Unconditional
+
+	def test_auto_etag(self):
+		client = app.test_client()
+		response = client.get('/tests/unversioned/1')
+		etag = response.headers['ETag'] # Hash of the body
+		self.assertNotIn('Last-Modified', response.headers)
+		self.assertEqual(client.get('/tests/unversioned/2').status_code, 200)
+		self.assertNotEqual(client.get('/tests/unversioned/2').headers['ETag'], etag)
+		response = client.get('/tests/unversioned/1', headers={'If-None-Match': etag})
+		self.assertEqual(response.status_code, 304)
+		self.assertEqual(response.data, b'')
+
+if __name__ == '__main__':
+	unittest.main()
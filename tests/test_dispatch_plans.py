@@ -0,0 +1,65 @@
+import unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization, CommonAuthorization
+from flask_rest.utils.throttle import strict_throttle
+
+class PlansHandler(RESTView):
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET', 'PUT', 'DELETE')
+		self.auth_methods = {'ALL': CommonAuthorization(), # Denies every request...
+							'GET': NoopAuthorization()} # ... except GET
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, resource_id=None):
+		return ('ALL_OK', {'id': resource_id})
+
+	def put(self, auth_data_obj, resource_id=None):
+		return ('ALL_OK', {'id': resource_id})
+
+	# DELETE is allowed but not implemented
+
+class ReadOnlyPlansHandler(PlansHandler):
+
+	def __init__(self):
+		PlansHandler.__init__(self)
+		self.allowed_methods = ('GET',)
+
+app.add_url_rule('/tests/plans/<int:resource_id>', view_func=PlansHandler.as_view('tests_plans'), methods=['GET', 'POST', 'PUT', 'DELETE', 'HEAD', 'OPTIONS'])
+
+class DispatchPlansTest(unittest.TestCase):
+
+	def test_plans(self):
+		plans = PlansHandler.handler_config.dispatch_plans
+		self.assertEqual(sorted(plans), ['DELETE', 'GET', 'HEAD', 'OPTIONS', 'PUT'])
+		self.assertIsInstance(plans['GET'].authenticator, NoopAuthorization)
+		self.assertNotIsInstance(plans['PUT'].authenticator, NoopAuthorization)
+		self.assertIsNone(plans['DELETE'].handler_func)
+
+	def test_dispatch(self):
+		client = app.test_client()
+		self.assertEqual(client.get('/tests/plans/3').get_json(), {'id': 3})
+		response = client.put('/tests/plans/3')
+		self.assertEqual(response.status_code, 401) # Authenticator of the method
+		self.assertEqual(response.headers['WWW-Authenticate'], 'CommonAuth')
+		response = client.post('/tests/plans/3')
+		self.assertEqual(response.status_code, 405)
+		self.assertEqual(response.headers['Allow'], 'DELETE, GET, HEAD, OPTIONS, PUT')
+
+	def test_not_implemented(self):
+		# Allowed, but with no handler function: answered before authentication
+		self.assertEqual(app.test_client().delete('/tests/plans/3').status_code, 501)
+
+	def test_unregistered_subclass(self):
+		# Not registered itself, the subclass must not dispatch with the plans of its registered base class
+		with app.test_request_context('/tests/plans/3', method='GET'):
+			self.assertEqual(ReadOnlyPlansHandler().dispatch_request(resource_id=3).status_code, 200)
+		with app.test_request_context('/tests/plans/3', method='PUT'):
+			response = ReadOnlyPlansHandler().dispatch_request(resource_id=3)
+			self.assertEqual(response.status_code, 405)
+			self.assertEqual(response.headers['Allow'], 'GET, HEAD, OPTIONS')
+
+if __name__ == '__main__':
+	unittest.main()
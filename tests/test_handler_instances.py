@@ -0,0 +1,55 @@
+import unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+
+class CountingHandler(RESTView):
+
+	instances = 0
+
+	def __init__(self):
+		RESTView.__init__(self)
+		type(self).instances += 1
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj):
+		return ('ALL_OK', {'handler': id(self)})
+
+class PerRequestHandler(CountingHandler):
+	instances = 0
+
+class SharedHandler(CountingHandler):
+	instances = 0
+	share_handler_instance = True
+
+# Registered when the module is imported, before the app handles its first request
+app.add_url_rule('/tests/per_request_handler', view_func=PerRequestHandler.as_view('tests_per_request_handler'), methods=['GET'])
+app.add_url_rule('/tests/shared_handler', view_func=SharedHandler.as_view('tests_shared_handler'), methods=['GET'])
+
+class HandlerInstancesTest(unittest.TestCase):
+
+	def test_configuration_resolved_once(self):
+		# as_view resolved the configuration from one instance
+		self.assertIsNotNone(PerRequestHandler.__dict__.get('handler_config'))
+		self.assertEqual(PerRequestHandler.handler_config.allowed_methods, ('GET',))
+		self.assertIsNot(PerRequestHandler.handler_config, SharedHandler.handler_config)
+
+	def test_per_request_instances(self):
+		client = app.test_client()
+		instances = PerRequestHandler.instances
+		for i in range(3):
+			self.assertEqual(client.get('/tests/per_request_handler').status_code, 200)
+		self.assertEqual(PerRequestHandler.instances, instances + 3)
+
+	def test_shared_instance(self):
+		client = app.test_client()
+		instances = SharedHandler.instances
+		handler_ids = set([client.get('/tests/shared_handler').get_json()['handler'] for i in range(3)])
+		self.assertEqual(SharedHandler.instances, instances) # The instance created by as_view handles every request
+		self.assertEqual(handler_ids, set([id(SharedHandler._shared_handler)]))
+
+if __name__ == '__main__':
+	unittest.main()
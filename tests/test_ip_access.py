@@ -0,0 +1,107 @@
+import os, shutil, tempfile, unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.ip_access import IPAccessList, IPRangeIndex, ClientAddressResolver, client_address_resolver, parse_address, parse_network
+
+class RestrictedHandler(RESTView):
+
+	ip_access_list = IPAccessList(allow=('10.0.0.0/8', '2001:db8::/32'), deny=('10.1.0.0/16',))
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj):
+		return ('ALL_OK', {'allowed': True})
+
+app.add_url_rule('/tests/restricted', view_func=RestrictedHandler.as_view('tests_restricted'), methods=['GET'])
+
+class IPRangeIndexTest(unittest.TestCase):
+
+	def test_parse(self):
+		self.assertEqual(parse_address('10.0.0.1'), (4, 0x0a000001))
+		self.assertEqual(parse_address('::ffff:10.0.0.1'), (4, 0x0a000001)) # IPv4-mapped
+		self.assertEqual(parse_address('fe80::1%eth0'), (6, (0xfe80 << 112) + 1))
+		for invalid_address in ('10.0.0.256', 'example.com', '', '1::2::3'):
+			self.assertIsNone(parse_address(invalid_address))
+		self.assertEqual(parse_network('10.1.2.3/16'), (4, 0x0a010000, 0x0a01ffff))
+		self.assertEqual(parse_network('::ffff:10.0.0.0/104'), (4, 0x0a000000, 0x0affffff))
+		self.assertRaises(ValueError, parse_network, '10.0.0.0/33')
+		self.assertRaises(ValueError, parse_network, 'garbage/8')
+
+	def test_most_specific(self):
+		index = IPRangeIndex([('10.0.0.0/8', 'a'), ('10.1.0.0/16', 'b'), ('10.1.2.3', 'c'), ('10.2.0.0/16', 'd'), ('2001:db8::/32', 'e')])
+		lookups = [index.lookup(parse_address(address), '-') for address in
+					('9.255.255.255', '10.0.0.1', '10.1.0.0', '10.1.2.2', '10.1.2.3', '10.1.2.4', '10.1.255.255', '10.2.0.1', '10.3.0.1', '11.0.0.0', '2001:db8::1', '2001:db9::1')]
+		self.assertEqual(lookups, ['-', 'a', 'b', 'b', 'c', 'b', 'b', 'd', 'a', '-', 'e', '-'])
+		self.assertEqual(IPRangeIndex([('10.0.0.0/8', 'a'), ('10.0.0.0/8', 'b')]).lookup(parse_address('10.0.0.1')), 'b') # The last one given
+
+	def test_many_networks(self):
+		index = IPRangeIndex([('10.%d.%d.0/24' % (i // 256, i % 256), i) for i in range(20000)])
+		self.assertEqual(index.size, 20000)
+		self.assertEqual(index.lookup(parse_address('10.78.31.7')), 78 * 256 + 31)
+		self.assertIsNone(index.lookup(parse_address('10.79.0.1'))) # Past the last one (20000 = 78 * 256 + 32)
+
+class IPAccessListTest(unittest.TestCase):
+
+	def test_rules(self):
+		allow_list = IPAccessList(allow=('10.0.0.0/8',), deny=('10.1.0.0/16',))
+		self.assertEqual([allow_list.is_allowed(address) for address in ('10.0.0.1', '10.1.0.1', '11.0.0.1', 'unknown')], [True, False, False, False])
+		deny_list = IPAccessList(deny=('10.1.0.0/16',))
+		self.assertEqual([deny_list.is_allowed(address) for address in ('10.0.0.1', '10.1.0.1', '11.0.0.1', 'unknown')], [True, False, True, True])
+		self.assertFalse(IPAccessList().enabled)
+
+	def test_rules_file(self):
+		directory = tempfile.mkdtemp()
+		try:
+			path = os.path.join(directory, 'ip_access')
+			with open(path, 'w') as f:
+				f.write('# Office\nallow 10.0.0.0/8\ndeny 10.1.0.0/16 # Guests\n')
+			access_list = IPAccessList(path=path, reload_interval=0)
+			self.assertEqual([access_list.is_allowed(address) for address in ('10.0.0.1', '10.1.0.1')], [True, False])
+			with open(path, 'w') as f:
+				f.write('allow 10.1.0.0/16\n')
+			os.utime(path, (1, 1)) # Changed
+			self.assertEqual([access_list.is_allowed(address) for address in ('10.0.0.1', '10.1.0.1')], [False, True])
+			with open(path, 'w') as f:
+				f.write('permit 10.0.0.0/8\n')
+			os.utime(path, (2, 2))
+			self.assertEqual([access_list.is_allowed(address) for address in ('10.0.0.1', '10.1.0.1')], [False, True]) # Invalid, rules kept
+		finally:
+			shutil.rmtree(directory)
+
+	def test_forbidden(self):
+		client = app.test_client()
+		for address, status_code in (('10.0.0.1', 200), ('10.1.0.1', 403), ('192.168.0.1', 403), ('2001:db8::1', 200), ('::ffff:10.0.0.1', 200)):
+			response = client.get('/tests/restricted', environ_base={'REMOTE_ADDR': address})
+			self.assertEqual(response.status_code, status_code, address)
+
+class ClientAddressResolverTest(unittest.TestCase):
+
+	def test_resolve(self):
+		resolver = ClientAddressResolver(['10.0.0.0/8', '::1'])
+		self.assertEqual(resolver.resolve('10.0.0.2', '1.2.3.4'), '1.2.3.4')
+		self.assertEqual(resolver.resolve('10.0.0.2', '6.6.6.6, 1.2.3.4, 10.0.0.3'), '1.2.3.4') # Spoofed first address ignored
+		self.assertEqual(resolver.resolve('1.2.3.4', '6.6.6.6'), '1.2.3.4') # Not from a proxy
+		self.assertEqual(resolver.resolve('::1', '10.0.0.3'), '10.0.0.3') # Only proxies
+		self.assertEqual(ClientAddressResolver([]).resolve('10.0.0.2', '1.2.3.4'), '10.0.0.2')
+
+	def test_forwarded_request(self):
+		client = app.test_client()
+		client_address_resolver.configure(['127.0.0.0/8'])
+		try:
+			response = client.get('/tests/restricted', environ_base={'REMOTE_ADDR': '127.0.0.1'}, headers={'X-Forwarded-For': '192.168.0.1, 10.0.0.1'})
+			self.assertEqual(response.status_code, 200)
+			response = client.get('/tests/restricted', environ_base={'REMOTE_ADDR': '127.0.0.1'}, headers={'X-Forwarded-For': '10.0.0.1, 192.168.0.1'})
+			self.assertEqual(response.status_code, 403)
+		finally:
+			client_address_resolver.configure([])
+		response = client.get('/tests/restricted', environ_base={'REMOTE_ADDR': '127.0.0.1'}, headers={'X-Forwarded-For': '10.0.0.1'})
+		self.assertEqual(response.status_code, 403) # No trusted proxies, the header is ignored
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,45 @@
+import datetime, decimal, json, time, unittest, uuid
+from flask_rest.utils.data_utils import JSON_SERIALIZERS, JSON_SERIALIZER_PREFERENCE, get_json_serializer, datetime_to_epoch
+
+def get_available_serializers():
+	serializers = []
+	for name in sorted(JSON_SERIALIZERS):
+		try:
+			serializers.append(get_json_serializer(name))
+		except ImportError:
+			pass
+	return serializers
+
+class JSONSerializersTest(unittest.TestCase):
+
+	def test_datetime_to_epoch(self):
+		for obj in (datetime.datetime(2016, 3, 27, 1, 59, 59), datetime.datetime(2016, 10, 30, 23, 5, 7), datetime.datetime(1999, 12, 31, 23, 59, 59)):
+			self.assertEqual(datetime_to_epoch(obj), int(time.mktime(obj.timetuple())))
+		self.assertEqual(datetime_to_epoch(datetime.date(2016, 3, 27)), int(time.mktime(datetime.date(2016, 3, 27).timetuple())))
+
+	def test_same_data(self):
+		# Every available backend serializes the types json_default supports to the same data
+		created = datetime.datetime(2016, 3, 27, 12, 30, 15)
+		data = [{'id': 1, 'created': created, 'day': created.date(), 'price': decimal.Decimal('10.25'), 'uuid': uuid.UUID(int=1),
+				'tags': set(['a']), 'raw': b'\x00\xff', 'big': 2 ** 70, 'text': 'caf\xe9'}]
+		expected = [{'id': 1, 'created': datetime_to_epoch(created), 'day': datetime_to_epoch(created.date()), 'price': 10.25,
+					'uuid': '00000000-0000-0000-0000-000000000001', 'tags': ['a'], 'raw': 'AP8=', 'big': 2 ** 70, 'text': 'caf\xe9'}]
+		serializers = get_available_serializers()
+		self.assertIn('json', [serializer.name for serializer in serializers])
+		for serializer in serializers:
+			serialized = serializer.dumps(data)
+			self.assertEqual(json.loads(serialized), expected, serializer.name)
+
+	def test_unsupported_objects(self):
+		for serializer in get_available_serializers():
+			self.assertRaises(TypeError, serializer.dumps, {'obj': object()})
+
+	def test_default_backend(self):
+		# The fastest available backend, one shared instance per backend
+		available = [serializer.name for serializer in get_available_serializers()]
+		fastest = [name for name in JSON_SERIALIZER_PREFERENCE if name in available][0]
+		self.assertIs(get_json_serializer(), get_json_serializer(fastest))
+		self.assertRaises(KeyError, get_json_serializer, 'missing')
+
+if __name__ == '__main__':
+	unittest.main()
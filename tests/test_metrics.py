@@ -0,0 +1,98 @@
+import json, os, shutil, subprocess, sys, tempfile, threading, time, unittest
+from flask_rest import app
+from flask_rest.utils.metrics import Metrics, escape_label_value, fcntl
+
+def get_dead_pid():
+	# The process ID of a process which has exited
+	process = subprocess.Popen([sys.executable, '-c', 'pass'])
+	process.wait()
+	return process.pid
+
+class MetricsTest(unittest.TestCase):
+
+	def setUp(self):
+		self.metrics_dir = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.metrics_dir)
+
+	def test_render(self):
+		metrics = Metrics(metrics_dir='')
+		metrics.observe_request('tests_endpoint', 'GET', 'ALL_OK', (0.0002, 0.0001, 0.003, None, 0.004))
+		metrics.observe_request('tests_endpoint', 'GET', 'ALL_OK', (0.0002, 0.0001, 20.0, None, 20.1))
+		metrics.observe_request('tests_endpoint', 'PUT', 'BAD_REQUEST', (None, None, None, None, 0.0001))
+		lines = metrics.render_prometheus().splitlines()
+		self.assertIn('flask_rest_requests_total{endpoint="tests_endpoint",method="GET",response="ALL_OK"} 2', lines)
+		self.assertIn('flask_rest_requests_total{endpoint="tests_endpoint",method="PUT",response="BAD_REQUEST"} 1', lines)
+		labels = 'endpoint="tests_endpoint",method="GET",phase="handler"'
+		self.assertIn('flask_rest_request_duration_seconds_bucket{%s,le="0.0025"} 0' % (labels), lines)
+		self.assertIn('flask_rest_request_duration_seconds_bucket{%s,le="0.005"} 1' % (labels), lines) # Cumulative
+		self.assertIn('flask_rest_request_duration_seconds_bucket{%s,le="10"} 1' % (labels), lines)
+		self.assertIn('flask_rest_request_duration_seconds_bucket{%s,le="+Inf"} 2' % (labels), lines)
+		self.assertIn('flask_rest_request_duration_seconds_sum{%s} 20.003000' % (labels), lines)
+		self.assertIn('flask_rest_request_duration_seconds_count{%s} 2' % (labels), lines)
+		self.assertNotIn('phase="serialization"', '\n'.join(lines)) # Not reached
+
+	def test_escaping(self):
+		self.assertEqual(escape_label_value('a"b\\c\nd'), 'a\\"b\\\\c\\nd')
+		metrics = Metrics(metrics_dir='')
+		metrics.observe_request('tests_"endpoint"', 'GET', 'ALL_OK', (None, None, None, None, 0.001))
+		self.assertIn('endpoint="tests_\\"endpoint\\""', metrics.render_prometheus())
+
+	def test_threads(self):
+		metrics = Metrics(metrics_dir='')
+		def observe():
+			for i in range(100):
+				metrics.observe_request('tests_endpoint', 'GET', 'ALL_OK', (None, None, None, None, 0.001))
+		threads = [threading.Thread(target=observe) for i in range(4)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		observe() # And this thread
+		request_counts, histograms = metrics.get_process_metrics()
+		self.assertEqual(request_counts, {('tests_endpoint', 'GET', 'ALL_OK'): 500})
+
+	def test_worker_files(self):
+		workers = [Metrics(metrics_dir=self.metrics_dir) for i in range(2)] # As the metrics of two worker processes
+		for i, worker in enumerate(workers):
+			for j in range(i + 1):
+				worker.observe_request('tests_endpoint', 'GET', 'ALL_OK', (None, None, None, None, 0.001))
+			worker.flush()
+		self.assertEqual(workers[0].get_all_metrics()[0], {('tests_endpoint', 'GET', 'ALL_OK'): 3})
+		self.assertEqual(len([name for name in os.listdir(self.metrics_dir) if name.startswith('metrics-')]), 2)
+
+	@unittest.skipIf(fcntl is None, 'Needs file locking (POSIX)')
+	def test_compaction(self):
+		metrics = Metrics(metrics_dir=self.metrics_dir, flush_interval=1.0)
+		metrics.observe_request('tests_endpoint', 'GET', 'ALL_OK', (None, None, None, None, 0.001))
+		# Files of exited workers: one not written for a while, one written recently (may be written again)
+		old_time = time.time() - 10.0
+		for name, mtime in (('metrics-%d-old.json' % (get_dead_pid()), old_time), ('metrics-%d-new.json' % (get_dead_pid()), None)):
+			path = os.path.join(self.metrics_dir, name)
+			with open(path, 'w') as f:
+				json.dump({'request_counts': [['tests_endpoint', 'GET', 'ALL_OK', 2]], 'histograms': []}, f)
+			if mtime is not None:
+				os.utime(path, (mtime, mtime))
+		metrics.flush()
+		expected = {('tests_endpoint', 'GET', 'ALL_OK'): 5}
+		self.assertEqual(metrics.get_all_metrics()[0], expected)
+		metrics.compact()
+		names = sorted(os.listdir(self.metrics_dir))
+		self.assertIn(Metrics.COMPACTED_FILE_NAME, names)
+		self.assertEqual(len([name for name in names if name.endswith('-old.json')]), 0) # Folded
+		self.assertEqual(len([name for name in names if name.endswith('-new.json')]), 1)
+		self.assertEqual(len([name for name in names if name.startswith('metrics-%d-' % (os.getpid()))]), 1) # Alive
+		self.assertEqual(metrics.get_all_metrics()[0], expected)
+		metrics.compact() # Nothing more to fold
+		self.assertEqual(metrics.get_all_metrics()[0], expected)
+
+	def test_endpoint(self):
+		client = app.test_client()
+		client.get('/v2/rest_example/1')
+		response = client.get('/metrics')
+		self.assertEqual(response.status_code, 200)
+		self.assertIn('method="GET",response="ALL_OK"', response.get_data(as_text=True))
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.http_utils import get_request_data
+try: import msgpack
+except ImportError: msgpack = None
+try: import cbor2
+except ImportError: cbor2 = None
+
+class EchoHandler(RESTView):
+
+	auto_etag = False
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET', 'PUT', 'DELETE')
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, kind=None):
+		if kind == 'text':
+			return ('ALL_OK', 'plain text')
+		return ('ALL_OK', {'kind': kind, 'raw': b'\x00\x01'})
+
+	def put(self, auth_data_obj, kind=None):
+		return ('ALL_OK', {'received': get_request_data()})
+
+	def delete(self, auth_data_obj, kind=None):
+		return ('DELETED', None)
+
+app.add_url_rule('/tests/echo/<kind>', view_func=EchoHandler.as_view('tests_echo'), methods=['GET', 'PUT', 'DELETE', 'OPTIONS'])
+
+class NegotiationTest(unittest.TestCase):
+
+	def test_json(self):
+		client = app.test_client()
+		for accept in (None, '*/*', 'application/json', 'application/msgpack;q=0.5, application/json', 'text/html, application/*;q=0.1'):
+			response = client.get('/tests/echo/data', headers={'Accept': accept} if accept else {})
+			self.assertEqual(response.mimetype, 'application/json', accept)
+			self.assertEqual(response.get_json(), {'kind': 'data', 'raw': 'AAE='}) # bytes in base64
+			self.assertIn('Accept', response.headers['Vary'])
+
+	def test_not_acceptable(self):
+		client = app.test_client()
+		headers = {'Accept': 'text/plain'}
+		self.assertEqual(client.get('/tests/echo/data', headers=headers).status_code, 406) # Structured data
+		self.assertEqual(client.get('/tests/echo/text', headers=headers).get_data(as_text=True), 'plain text')
+		self.assertEqual(client.delete('/tests/echo/data', headers=headers).status_code, 204) # No data
+		self.assertEqual(client.options('/tests/echo/data', headers=headers).status_code, 200)
+		self.assertEqual(client.put('/tests/echo/data', json={'a': 1}, headers=headers).status_code, 406)
+
+	def test_request_data(self):
+		client = app.test_client()
+		self.assertEqual(client.put('/tests/echo/data', json={'a': [1, 2]}).get_json(), {'received': {'a': [1, 2]}})
+		self.assertEqual(client.put('/tests/echo/data').get_json(), {'received': None}) # No body
+		self.assertEqual(client.put('/tests/echo/data', data='{"a": ', content_type='application/json').status_code, 400)
+		response = client.put('/tests/echo/data', data='<a/>', content_type='text/xml')
+		self.assertEqual(response.status_code, 400)
+		self.assertIn('text/xml', response.get_data(as_text=True))
+
+	@unittest.skipIf(msgpack is None, 'Needs the msgpack package')
+	def test_msgpack(self):
+		client = app.test_client()
+		response = client.get('/tests/echo/data', headers={'Accept': 'application/msgpack'})
+		self.assertEqual(response.mimetype, 'application/msgpack')
+		self.assertEqual(msgpack.unpackb(response.data, raw=False), {'kind': 'data', 'raw': b'\x00\x01'}) # bytes as binary
+		response = client.put('/tests/echo/data', data=msgpack.packb({'a': 1}), content_type='application/msgpack', headers={'Accept': 'application/msgpack'})
+		self.assertEqual(msgpack.unpackb(response.data, raw=False), {'received': {'a': 1}})
+		response = client.get('/v2/rest_example/1;3', headers={'Accept': 'application/msgpack'}) # Streamed
+		self.assertEqual(len(msgpack.unpackb(response.data, raw=False)), 2)
+
+	@unittest.skipIf(cbor2 is None, 'Needs the cbor2 package')
+	def test_cbor(self):
+		client = app.test_client()
+		response = client.get('/tests/echo/data', headers={'Accept': 'application/cbor'})
+		self.assertEqual(response.mimetype, 'application/cbor')
+		self.assertEqual(cbor2.loads(response.data), {'kind': 'data', 'raw': b'\x00\x01'})
+		response = client.put('/tests/echo/data', data=cbor2.dumps({'a': 1}), content_type='application/cbor', headers={'Accept': 'application/cbor'})
+		self.assertEqual(cbor2.loads(response.data), {'received': {'a': 1}})
+		response = client.get('/v2/rest_example/1;3', headers={'Accept': 'application/cbor'}) # Streamed
+		self.assertEqual(len(cbor2.loads(response.data)), 2)
+
+if __name__ == '__main__':
+	unittest.main()
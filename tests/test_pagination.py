@@ -0,0 +1,67 @@
+import unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.pagination import KeysetPaginator, CursorCodec, InvalidCursor
+
+ITEMS = [{'name': name, 'id': i} for i, name in enumerate(['a', 'b', 'b', 'c', 'd', 'e', 'f'])]
+
+class PagedHandler(RESTView):
+
+	paginator = KeysetPaginator(key_fields=('name', 'id'), default_page_size=3, max_page_size=5)
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, page=None):
+		# Seek past the last item of the previous page, one more item than a page is returned to check that it is cut
+		items = [item for item in ITEMS if page.after is None or (item['name'], item['id']) > page.after]
+		return ('ALL_OK', iter(items[:page.limit + 1]))
+
+app.add_url_rule('/tests/paged', view_func=PagedHandler.as_view('tests_paged'), methods=['GET'])
+
+class PaginationTest(unittest.TestCase):
+
+	def test_follow_next_links(self):
+		client = app.test_client()
+		url = '/tests/paged?filter=x'
+		pages = []
+		while url:
+			response = client.get(url)
+			self.assertEqual(response.status_code, 200)
+			pages.append([item['id'] for item in response.get_json()])
+			url = None
+			if 'Link' in response.headers:
+				url = response.headers['Link'].split('>')[0][1:]
+				self.assertIn('filter=x', url) # Other query arguments are kept
+				self.assertIn('cursor=' + response.headers['X-Next-Cursor'], url)
+		self.assertEqual(pages, [[0, 1, 2], [3, 4, 5], [6]])
+
+	def test_page_size(self):
+		client = app.test_client()
+		self.assertEqual(len(client.get('/tests/paged?limit=5').get_json()), 5)
+		for limit in ('0', '6', 'x'):
+			self.assertEqual(client.get('/tests/paged?limit=' + limit).status_code, 400)
+
+	def test_invalid_cursors(self):
+		client = app.test_client()
+		cursor = client.get('/tests/paged').headers['X-Next-Cursor']
+		payload, signature = cursor.split('.')
+		forged = CursorCodec(b'other secret').encode('tests_paged', ['b', 2])
+		other_endpoint = CursorCodec().encode('tests_other', ['b', 2])
+		for invalid_cursor in ('garbage', payload + '.' + signature[::-1], forged, other_endpoint, CursorCodec().encode('tests_paged', ['b'])):
+			self.assertEqual(client.get('/tests/paged?cursor=' + invalid_cursor).status_code, 400, invalid_cursor)
+
+	def test_codec(self):
+		codec = CursorCodec(b'secret')
+		token = codec.encode('endpoint', ['b', 2])
+		self.assertNotIn('=', token) # URL safe, without padding
+		self.assertEqual(codec.decode('endpoint', token), ('b', 2))
+		self.assertRaises(InvalidCursor, codec.decode, 'other_endpoint', token)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,53 @@
+import contextlib, importlib.util, io, json, os, shutil, subprocess, sys, tempfile, unittest
+
+BENCHMARK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'pipeline_benchmark.py')
+
+def import_benchmark():
+	spec = importlib.util.spec_from_file_location('pipeline_benchmark', BENCHMARK_PATH)
+	module = importlib.util.module_from_spec(spec)
+	spec.loader.exec_module(module)
+	return module
+
+pipeline_benchmark = import_benchmark()
+
+def get_results(throughput=1000.0, p50_ms=1.0, p99_ms=2.0, alloc_kib=10.0):
+	return dict([(name, {'throughput': throughput, 'p50_ms': p50_ms, 'p99_ms': p99_ms, 'alloc_kib': alloc_kib}) for name, method, path, headers, expected_status in pipeline_benchmark.CASES])
+
+class PipelineBenchmarkTest(unittest.TestCase):
+
+	def compare(self, results, baseline):
+		with contextlib.redirect_stdout(io.StringIO()) as output:
+			regressions = pipeline_benchmark.compare('client', results, baseline, 0.15)
+		return (regressions, output.getvalue())
+
+	def test_no_baseline(self):
+		regressions, output = self.compare(get_results(), {})
+		self.assertEqual(regressions, 0)
+		self.assertEqual(output.count('no baseline'), len(pipeline_benchmark.CASES))
+
+	def test_regressions(self):
+		baseline = {'client': get_results()}
+		self.assertEqual(self.compare(get_results(throughput=900.0, p99_ms=2.2), baseline)[0], 0) # Within the tolerance
+		self.assertEqual(self.compare(get_results(throughput=2000.0, p50_ms=0.5), baseline)[0], 0) # Faster
+		regressions, output = self.compare(get_results(throughput=500.0, alloc_kib=20.0), baseline)
+		self.assertEqual(regressions, 2 * len(pipeline_benchmark.CASES))
+		self.assertIn('req/s REGRESSED +100%', output)
+		self.assertIn('alloc REGRESSED +100%', output)
+		self.assertEqual(self.compare(get_results(), {'server': get_results(throughput=1e9)})[0], 0) # Other mode
+
+	def test_exit_status(self):
+		# A run slower than the baseline by far fails (the baseline is a run 1000 times faster)
+		directory = tempfile.mkdtemp()
+		try:
+			baseline_path = os.path.join(directory, 'baseline.json')
+			with open(baseline_path, 'w') as f:
+				json.dump({'client': get_results(throughput=1e9, p50_ms=1e-6, p99_ms=1e-6, alloc_kib=1e-3)}, f)
+			process = subprocess.run([sys.executable, BENCHMARK_PATH, '--mode', 'client', '--duration', '0.02', '--baseline', baseline_path],
+									stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+			self.assertEqual(process.returncode, 1, process.stdout)
+			self.assertIn(b'regression(s) beyond 15%', process.stdout)
+		finally:
+			shutil.rmtree(directory)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,120 @@
+import http.client, os, signal, socket, subprocess, sys, time, unittest
+from flask_rest.utils.prefork import PreforkServer, WorkerApp, get_peak_memory
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs a prefork server in its own process (the master installs signal handlers and forks), with a route answering the worker's process ID
+SERVER_SCRIPT = '''
+import os, socket, sys
+from flask_rest import app
+from flask_rest.utils.prefork import PreforkServer
+
+@app.route('/tests/pid')
+def tests_pid():
+	return str(os.getpid())
+
+port = int(sys.argv[1])
+if sys.argv[2] == 'failing':
+	# The workers can not bind their own socket (SO_REUSEPORT) while this one, without it, is bound
+	blocking_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	blocking_socket.bind(('127.0.0.1', port))
+	server = PreforkServer(app, host='127.0.0.1', port=port, workers=1, reuse_port=True)
+	server.startup_backoff = 0.05
+	server.max_startup_failures = 3
+else:
+	server = PreforkServer(app, host='127.0.0.1', port=port, workers=2, max_requests=3, graceful_timeout=5.0)
+server.run()
+'''
+
+def get_free_port():
+	probe_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	probe_socket.bind(('127.0.0.1', 0))
+	port = probe_socket.getsockname()[1]
+	probe_socket.close()
+	return port
+
+def get(port, path):
+	connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+	try:
+		connection.request('GET', path)
+		response = connection.getresponse()
+		return (response.status, response.read())
+	finally:
+		connection.close()
+
+class WorkerAppTest(unittest.TestCase):
+
+	def test_max_requests(self):
+		recycled = []
+		worker_app = WorkerApp(lambda environ, start_response: [b'ok'], max_requests=3, on_recycle=lambda: recycled.append(worker_app.requests))
+		responses = [worker_app({}, None) for i in range(5)]
+		self.assertEqual(responses, [[b'ok']] * 5) # Still served
+		self.assertEqual(recycled, [3]) # Asked once
+
+	def test_max_memory(self):
+		recycled = []
+		worker_app = WorkerApp(lambda environ, start_response: [b'ok'], max_memory=1, on_recycle=lambda: recycled.append(worker_app.requests))
+		for i in range(200):
+			worker_app({}, None)
+		if get_peak_memory():
+			self.assertEqual(recycled, [100, 200]) # Checked every 100 requests
+
+class PreforkServerTest(unittest.TestCase):
+
+	def test_from_environ(self):
+		server = PreforkServer.from_environ(None, {'FLASK_REST_BIND': '[::1]:8080', 'FLASK_REST_WORKERS': '3', 'FLASK_REST_MAX_REQUESTS': '1000',
+												'FLASK_REST_MAX_REQUESTS_JITTER': '50', 'FLASK_REST_MAX_MEMORY': '256', 'FLASK_REST_REUSE_PORT': 'yes',
+												'FLASK_REST_GRACEFUL_TIMEOUT': '10'})
+		self.assertEqual((server.host, server.port, server.workers), ('::1', 8080, 3))
+		self.assertEqual((server.max_requests, server.max_requests_jitter, server.max_memory), (1000, 50, 268435456))
+		self.assertEqual((server.reuse_port, server.graceful_timeout), (True, 10.0))
+		server = PreforkServer.from_environ(None, {})
+		self.assertEqual((server.host, server.port, server.max_requests, server.reuse_port), ('0.0.0.0', 5000, 0, False))
+		self.assertGreaterEqual(server.workers, 1)
+
+	def start_server(self, mode):
+		port = get_free_port()
+		environ = dict(os.environ, FLASK_REST_ENV='development')
+		environ.pop('FLASK_REST_METRICS_DIR', None)
+		process = subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT, str(port), mode], cwd=PACKAGE_DIR, env=environ,
+									stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+		return (port, process)
+
+	@unittest.skipIf(not hasattr(os, 'fork'), 'Needs fork (POSIX)')
+	def test_serve_and_recycle(self):
+		port, process = self.start_server('serving')
+		try:
+			deadline = time.time() + 20.0
+			while True:
+				try:
+					self.assertEqual(get(port, '/ping')[0], 200)
+					break
+				except (OSError, http.client.HTTPException):
+					if time.time() > deadline or process.poll() is not None:
+						raise
+					time.sleep(0.1)
+			pids = set()
+			for i in range(20):
+				status, body = get(port, '/tests/pid')
+				self.assertEqual(status, 200) # Served without interruption while workers are recycled
+				pids.add(int(body))
+			self.assertGreater(len(pids), 2) # Workers were recycled, after 3 requests each
+			self.assertEqual(get(port, '/v2/rest_example/1')[0], 200)
+		finally:
+			process.send_signal(signal.SIGTERM)
+			output = process.communicate(timeout=20)[0]
+		self.assertEqual(process.returncode, 0, output)
+
+	@unittest.skipIf(not hasattr(os, 'fork') or not hasattr(socket, 'SO_REUSEPORT'), 'Needs fork and SO_REUSEPORT')
+	def test_startup_failures(self):
+		port, process = self.start_server('failing')
+		try:
+			output = process.communicate(timeout=30)[0]
+		finally:
+			if process.poll() is None:
+				process.kill()
+		self.assertNotEqual(process.returncode, 0)
+		self.assertIn(b'RuntimeError: The workers can not be started', output)
+
+if __name__ == '__main__':
+	unittest.main()
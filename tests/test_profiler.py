@@ -0,0 +1,77 @@
+import os, pstats, shutil, tempfile, time, unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.profiler import request_profiler
+
+class ProfiledHandler(RESTView):
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj):
+		time.sleep(0.02) # Long enough to be sampled
+		return ('ALL_OK', {'profiled': True})
+
+app.add_url_rule('/tests/profiled', view_func=ProfiledHandler.as_view('tests_profiled'), methods=['GET'])
+
+class RequestProfilerTest(unittest.TestCase):
+
+	def setUp(self):
+		self.output_dir = tempfile.mkdtemp()
+		request_profiler.configure(output_dir=self.output_dir, secret='tests secret', mode='cprofile')
+
+	def tearDown(self):
+		request_profiler.secret = None
+		request_profiler.configure(sample_rate=0.0, mode='cprofile') # Disabled again
+		shutil.rmtree(self.output_dir)
+
+	def test_token(self):
+		client = app.test_client()
+		response = client.get('/tests/profiled', headers={'X-Profile': request_profiler.make_token()})
+		self.assertEqual(response.get_json(), {'profiled': True})
+		profile_id = response.headers['X-Profile-Id']
+		self.assertTrue(profile_id.startswith('tests_profiled-GET-') and profile_id.endswith('.pstats'))
+		stats = pstats.Stats(os.path.join(self.output_dir, profile_id))
+		self.assertIn('get', [function_name for filename, line, function_name in stats.stats])
+		response = client.get('/tests/profiled?_profile=' + request_profiler.make_token()) # Or as a query parameter
+		self.assertIn('X-Profile-Id', response.headers)
+
+	def test_invalid_tokens(self):
+		client = app.test_client()
+		token = request_profiler.make_token()
+		expired_token = request_profiler.make_token(expires_in=-1)
+		for invalid_token in (token[:-1] + ('0' if token[-1] != '0' else '1'), expired_token, 'garbage', str(int(time.time()) + 60)):
+			response = client.get('/tests/profiled', headers={'X-Profile': invalid_token})
+			self.assertEqual(response.status_code, 200)
+			self.assertNotIn('X-Profile-Id', response.headers)
+		self.assertEqual(os.listdir(self.output_dir), [])
+
+	def test_sampling_mode(self):
+		request_profiler.configure(mode='sampling')
+		response = app.test_client().get('/tests/profiled', headers={'X-Profile': request_profiler.make_token()})
+		profile_id = response.headers['X-Profile-Id']
+		self.assertTrue(profile_id.endswith('.collapsed'))
+		with open(os.path.join(self.output_dir, profile_id)) as f:
+			lines = f.read().splitlines()
+		self.assertTrue(lines)
+		self.assertTrue([line for line in lines if 'get (test_profiler.py' in line]) # "<stack> <count>" lines, outermost first
+
+	def test_aggregate(self):
+		request_profiler.secret = None
+		request_profiler.start_aggregate('tests_profiled', requests=2)
+		self.assertTrue(request_profiler.enabled)
+		client = app.test_client()
+		for i in range(2):
+			self.assertNotIn('X-Profile-Id', client.get('/tests/profiled').headers)
+		self.assertFalse(request_profiler.enabled) # Done
+		names = os.listdir(self.output_dir)
+		self.assertEqual(len(names), 1)
+		self.assertTrue(names[0].startswith('tests_profiled-aggregate-') and names[0].endswith('.collapsed'))
+
+if __name__ == '__main__':
+	unittest.main()
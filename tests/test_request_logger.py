@@ -0,0 +1,89 @@
+import json, os, shutil, tempfile, time, unittest
+from flask_rest import app
+from flask_rest.utils.request_logger import RequestLogger, RotatingFileSink
+
+class ListSink(object):
+
+	def __init__(self):
+		self.lines = []
+		self.closed = False
+
+	def write_lines(self, lines):
+		self.lines.extend(lines)
+
+	def close(self):
+		self.closed = True
+
+class RequestLoggerTest(unittest.TestCase):
+
+	def log_request(self, request_logger, response_name='ALL_OK', **request_kwargs):
+		with app.test_request_context('/v2/rest_example/3', **request_kwargs):
+			request_logger.log(time.time() - 0.01, response_name, {'auth_data_obj': {'user_name': 'Jane'}})
+
+	def test_records(self):
+		sink = ListSink()
+		request_logger = RequestLogger([sink])
+		self.log_request(request_logger, 'CREATED', method='PUT', json={'example_obj_data': 'a'}, query_string='x=1&x=2')
+		request_logger.flush(5.0)
+		self.assertEqual(len(sink.lines), 1)
+		record = json.loads(sink.lines[0])
+		self.assertEqual(record['response_name'], 'CREATED')
+		self.assertEqual(record['request_method'], 2)
+		self.assertEqual(record['extra_arg'], '/v2/rest_example/3')
+		self.assertEqual(record['request_data'], {'example_obj_data': 'a'})
+		self.assertEqual(record['request_query_str_data'], {'x': ['1', '2']})
+		self.assertEqual(record['request_info'], {'auth_data_obj': {'user_name': 'Jane'}})
+		self.assertGreaterEqual(record['processing_time'], 0.01)
+		request_logger.shutdown()
+		self.assertTrue(sink.closed)
+
+	def test_no_sinks(self):
+		request_logger = RequestLogger()
+		self.log_request(request_logger)
+		self.assertEqual(request_logger.counters['logged'], 0)
+
+	def test_sampling(self):
+		sink = ListSink()
+		request_logger = RequestLogger([sink], sample_rate=0.0)
+		self.log_request(request_logger, 'ALL_OK')
+		self.log_request(request_logger, 'INTERNAL_ERROR') # Errors are always logged
+		request_logger.flush(5.0)
+		self.assertEqual([json.loads(line)['response_name'] for line in sink.lines], ['INTERNAL_ERROR'])
+		self.assertEqual(request_logger.counters['sampled_out'], 1)
+		request_logger.shutdown()
+
+	def test_large_bodies_not_logged(self):
+		sink = ListSink()
+		request_logger = RequestLogger([sink], max_body_size=10)
+		self.log_request(request_logger, method='PUT', json={'example_obj_data': 'a' * 100})
+		request_logger.shutdown()
+		self.assertEqual(json.loads(sink.lines[0])['request_data'], '')
+
+	def test_full_queue(self):
+		request_logger = RequestLogger([ListSink()], queue_size=1)
+		request_logger.sinks[0].write_lines = lambda lines: time.sleep(0.2) # Keeps the writer busy
+		for i in range(5):
+			self.log_request(request_logger)
+		self.assertGreater(request_logger.counters['dropped'], 0) # Dropped, the requests did not wait
+		request_logger.shutdown()
+
+class RotatingFileSinkTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def test_rotation(self):
+		path = os.path.join(self.directory, 'requests.log')
+		sink = RotatingFileSink(path, max_bytes=30, backup_count=2)
+		for i in range(4):
+			sink.write_lines(['%d' % (i) * 20])
+		sink.close()
+		self.assertEqual(sorted(os.listdir(self.directory)), ['requests.log', 'requests.log.1', 'requests.log.2'])
+		self.assertEqual(open(path).read(), '3' * 20 + '\n')
+		self.assertEqual(open(path + '.2').read(), '1' * 20 + '\n') # The oldest one was removed
+
+if __name__ == '__main__':
+	unittest.main()
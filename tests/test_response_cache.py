@@ -0,0 +1,97 @@
+import time, unittest, uuid
+from flask import Response
+from flask_rest import app
+from flask_rest.utils.router import load_handlers
+from flask_rest.utils.response_cache import LocalCacheBackend, RedisCacheBackend, ResponseCache
+from fake_redis import FakeRedis, get_test_redis
+
+def get_redis_backend():
+	# A Redis server if one is set for the tests, else FakeRedis (the cache backend uses no scripts)
+	return RedisCacheBackend(get_test_redis() or FakeRedis(), key_prefix='test_response_cache:%s:' % (uuid.uuid4().hex))
+
+class CacheBackendsTest(unittest.TestCase):
+
+	'''
+	The shared (Redis) backend must cache exactly like the local backend.
+	'''
+
+	def get_backends(self):
+		return [LocalCacheBackend(), get_redis_backend()]
+
+	def test_get_set(self):
+		entry = (200, [('Content-Type', 'application/json'), ('ETag', '"v1"')], b'{"a":1}\x00\xff')
+		for backend in self.get_backends():
+			self.assertIsNone(backend.get('key'))
+			backend.set('key', entry, 30, len(entry[2]))
+			self.assertEqual(backend.get('key'), entry)
+
+	def test_ttl(self):
+		for backend in self.get_backends():
+			backend.set('key', (200, [], b'body'), 0.05, 4)
+			self.assertEqual(backend.get('key'), (200, [], b'body'))
+			time.sleep(0.1)
+			self.assertIsNone(backend.get('key'))
+
+	def test_counters(self):
+		for backend in self.get_backends():
+			self.assertEqual(backend.get_counter('generation:endpoint'), 0)
+			self.assertEqual([backend.incr_counter('generation:endpoint') for i in range(2)], [1, 2])
+			self.assertEqual(backend.get_counter('generation:endpoint'), 2)
+
+	def test_shared_backend_ignores_invalid_values(self):
+		client = FakeRedis()
+		backend = RedisCacheBackend(client)
+		client.set('response_cache:key', b'\x80\x04not an entry')
+		self.assertIsNone(backend.get('key'))
+
+class ResponseCacheTest(unittest.TestCase):
+
+	def setUp(self):
+		load_handlers()
+
+	def test_invalidation(self):
+		for backend in (LocalCacheBackend(), get_redis_backend()):
+			response_cache = ResponseCache(backend)
+			with app.test_request_context('/v2/rest_example/1'):
+				key = response_cache.get_key(None)
+				self.assertIsNone(response_cache.get_response(key))
+				response_cache.store_response(key, Response('cached', headers={'X-RateLimit-Remaining': '9'}), 30, ('X-RateLimit-Remaining',))
+				response = response_cache.get_response(key)
+				self.assertEqual(response.get_data(), b'cached')
+				self.assertNotIn('X-RateLimit-Remaining', response.headers)
+				self.assertEqual(response_cache.get_key(None), key)
+
+				response_cache.invalidate('v2_rest_example')
+				self.assertNotEqual(response_cache.get_key(None), key) # New generation
+				self.assertIsNone(response_cache.get_response(response_cache.get_key(None)))
+			self.assertEqual(response_cache.counters, {'hits': 1, 'misses': 2, 'stores': 1, 'invalidations': 1})
+
+	def test_negotiated_variants(self):
+		# JSON and NDJSON (or other data format) bodies of the same resource are cached separately
+		response_cache = ResponseCache(LocalCacheBackend())
+		keys = []
+		for accept in ('application/json', 'application/x-ndjson', '*/*', None):
+			with app.test_request_context('/v2/rest_example/1;3', headers={'Accept': accept} if accept else {}):
+				keys.append(response_cache.get_key(None))
+		self.assertNotEqual(keys[0], keys[1])
+		self.assertEqual(keys[0], keys[2]) # JSON is preferred
+		self.assertEqual(keys[0], keys[3])
+
+		with app.test_request_context('/v2/rest_example/1;3', headers={'Accept': 'application/x-ndjson'}):
+			response_cache.store_response(keys[1], Response(b'{"a":1}\n', mimetype='application/x-ndjson'), 30)
+		with app.test_request_context('/v2/rest_example/1;3', headers={'Accept': 'application/json'}):
+			self.assertIsNone(response_cache.get_response(response_cache.get_key(None)))
+
+	def test_streamed_response(self):
+		for backend in (LocalCacheBackend(), get_redis_backend()):
+			response_cache = ResponseCache(backend)
+			with app.test_request_context('/v2/rest_example/1;3'):
+				key = response_cache.get_key(None)
+				response = Response(iter([b'[1,', b'2]']))
+				response_cache.store_response(key, response, 30)
+				self.assertIsNone(response_cache.get_response(key)) # Cached once completely sent
+				self.assertEqual(b''.join(response.response), b'[1,2]')
+				self.assertEqual(response_cache.get_response(key).get_data(), b'[1,2]')
+
+if __name__ == '__main__':
+	unittest.main()
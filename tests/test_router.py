@@ -0,0 +1,45 @@
+import os, subprocess, sys, unittest
+from flask_rest import app
+from flask_rest.utils.router import ROUTE_MANIFEST, import_handler
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(code):
+	# Runs the code in a new interpreter (nothing imported yet), returns its output lines
+	output = subprocess.check_output([sys.executable, '-c', code], cwd=PACKAGE_DIR)
+	return output.decode('utf-8').splitlines()
+
+class RouterTest(unittest.TestCase):
+
+	def test_lazy_import(self):
+		lines = run_python('\n'.join(['import sys',
+									'from flask_rest import app',
+									'module_name = "flask_rest.example_api_v2.example_handler"',
+									'print(module_name in sys.modules, hasattr(app.view_functions["v2_rest_example"], "load_view"))',
+									'print(app.test_client().get("/v2/rest_example/1").status_code)',
+									'print(module_name in sys.modules, hasattr(app.view_functions["v2_rest_example"], "load_view"))',
+									'print("flask_rest.example_api_v1.example_handler" in sys.modules)']))
+		self.assertEqual(lines, ['False True', '200', 'True False', 'False']) # Only the requested handler's module is imported
+
+	def test_load_handlers(self):
+		lines = run_python('\n'.join(['import sys',
+									'from flask_rest import app',
+									'from flask_rest.utils.router import load_handlers',
+									'load_handlers()',
+									'print(len([view_func for view_func in app.view_functions.values() if hasattr(view_func, "load_view")]))',
+									'print("flask_rest.example_api_v1.example_handler" in sys.modules, "flask_rest.utils.batch_handler" in sys.modules)']))
+		self.assertEqual(lines, ['0', 'True True'])
+
+	def test_url_rules(self):
+		rules = dict([(rule.rule, rule.endpoint) for rule in app.url_map.iter_rules() if rule.endpoint.startswith('v2_')])
+		self.assertEqual(rules['/v2/rest_example/'], 'v2_rest_example')
+		self.assertEqual(rules['/v2/rest_example/<int:example_resource_id>'], 'v2_rest_example')
+		self.assertEqual(rules['/v2/rest_example/<int:lower_cut>;<int:upper_cut>'], 'v2_rest_example')
+		self.assertEqual(rules['/v2/batch'], 'v2_batch')
+		for api_ver, resources in ROUTE_MANIFEST.items():
+			for resource_name, (handler_path, url_scheme, resource_id_name, resource_id_type) in resources.items():
+				self.assertIn('%s_%s' % (api_ver, resource_name), app.view_functions)
+				self.assertTrue(hasattr(import_handler(handler_path), 'as_view'))
+
+if __name__ == '__main__':
+	unittest.main()
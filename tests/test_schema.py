@@ -0,0 +1,91 @@
+import unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.schema import Field, compile_schema
+
+ADDRESS_SCHEMA = {'name': Field(str, min_length=1, max_length=20),
+				'age': Field(int, required=False, nullable=True, min_value=0, max_value=150),
+				'role': Field(str, required=False, default='user', choices=('user', 'admin')),
+				'tags': Field(list, required=False, default=[], max_length=3, items=Field(str)),
+				'address': Field(dict, required=False, fields={'zip': Field(str), 'city': Field(str, required=False)}),
+				'extra': Field(dict, required=False, default=dict, fields={}, allow_unknown=True)}
+
+class ValidatedHandler(RESTView):
+
+	request_schemas = {'PUT': ADDRESS_SCHEMA}
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('PUT',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def put(self, auth_data_obj, request_data=None):
+		request_data['tags'].append('modified') # Must not change the default of the next requests
+		return ('ALL_OK', request_data)
+
+app.add_url_rule('/tests/validated', view_func=ValidatedHandler.as_view('tests_validated'), methods=['PUT'])
+
+class SchemaTest(unittest.TestCase):
+
+	def setUp(self):
+		self.validate = compile_schema(ADDRESS_SCHEMA)
+
+	def test_valid(self):
+		data, errors = self.validate({'name': 'Jane', 'age': None, 'address': {'zip': '12345'}, 'extra': {'any': 1}})
+		self.assertIsNone(errors)
+		self.assertEqual(data, {'name': 'Jane', 'age': None, 'role': 'user', 'tags': [], 'address': {'zip': '12345', 'city': None}, 'extra': {'any': 1}}) # Defaults filled in
+
+	def test_errors_by_path(self):
+		data, errors = self.validate({'age': True, 'role': 'root', 'tags': ['a', 2, 'c'], 'address': {'city': 3, 'street': 'x'}, 'unknown': 1})
+		self.assertEqual(errors, {'name': 'is required',
+								'age': 'must be an integer', # Not a bool
+								'role': 'must be one of: admin, user',
+								'tags.1': 'must be a string',
+								'address.zip': 'is required',
+								'address.city': 'must be a string',
+								'address.street': 'is not a known field',
+								'unknown': 'is not a known field'})
+		self.assertEqual(self.validate({'name': '', 'age': 200, 'tags': ['a'] * 4})[1],
+						{'name': 'must have a length of at least 1', 'age': 'must be at most 150', 'tags': 'must have a length of at most 3'})
+		self.assertEqual(self.validate({'name': None, 'address': []})[1], {'name': 'must not be null', 'address': 'must be an object'})
+
+	def test_body(self):
+		self.assertEqual(self.validate(None)[1], {'body': 'is required'})
+		self.assertEqual(self.validate([1])[1], {'body': 'must be an object'})
+		validate = compile_schema(Field(list, required=False, items=Field(float, min_value=0)))
+		self.assertEqual(validate(None), (None, None))
+		self.assertEqual(validate([1, 2.5, -1, 'x'])[1], {'body.2': 'must be at least 0', 'body.3': 'must be a number'})
+		self.assertRaises(ValueError, compile_schema, {'name': Field(bytes)})
+
+	def test_defaults_not_shared(self):
+		first_data = self.validate({'name': 'Jane'})[0]
+		first_data['tags'].append('modified')
+		first_data['extra']['modified'] = True
+		self.assertEqual(self.validate({'name': 'John'})[0]['tags'], [])
+		self.assertEqual(self.validate({'name': 'John'})[0]['extra'], {}) # Callable default, called every time
+
+	def test_validated_request(self):
+		client = app.test_client()
+		for i in range(2):
+			response = client.put('/tests/validated', json={'name': 'Jane'})
+			self.assertEqual(response.status_code, 200)
+			self.assertEqual(response.get_json()['tags'], ['modified'])
+		response = client.put('/tests/validated', json={'name': 'Jane', 'tags': [1]})
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.get_json(), {'errors': {'tags.0': 'must be a string'}})
+		self.assertEqual(client.put('/tests/validated').get_json(), {'errors': {'body': 'is required'}})
+		self.assertEqual(client.put('/tests/validated', data='{', content_type='application/json').status_code, 400)
+
+	def test_validated_before_authentication(self):
+		# The example resource checks the body before authenticating (invalid requests are cheap to reject)
+		client = app.test_client()
+		response = client.put('/v2/rest_example/1', json={'example_obj_data': 3})
+		self.assertEqual(response.status_code, 400)
+		self.assertEqual(response.get_json(), {'errors': {'example_obj_data': 'must be a string'}})
+		self.assertEqual(client.put('/v2/rest_example/1', json={'example_obj_data': 'a'}).status_code, 401)
+
+if __name__ == '__main__':
+	unittest.main()
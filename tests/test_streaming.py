@@ -0,0 +1,63 @@
+import json, unittest
+from flask_rest import app
+from flask_rest.utils.restview import RESTView
+from flask_rest.utils.auth import NoopAuthorization
+from flask_rest.utils.throttle import strict_throttle
+from flask_rest.utils.data_utils import iter_json_array, iter_ndjson
+
+class StreamingHandler(RESTView):
+
+	generated = 0 # Items generated so far, by every request
+
+	def __init__(self):
+		RESTView.__init__(self)
+		self.allowed_methods = ('GET',)
+		self.auth_methods = {'ALL': NoopAuthorization()}
+		self.throttle_options = {'ALL': (strict_throttle, False)}
+
+	def get(self, auth_data_obj, count=None):
+		return ('ALL_OK', self.__iter_items(count))
+
+	def __iter_items(self, count):
+		for i in range(count):
+			type(self).generated += 1
+			yield {'id': i}
+
+app.add_url_rule('/tests/streaming/<int:count>', view_func=StreamingHandler.as_view('tests_streaming'), methods=['GET', 'HEAD'])
+
+class StreamingTest(unittest.TestCase):
+
+	def test_json_array(self):
+		response = app.test_client().get('/tests/streaming/200')
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.is_streamed)
+		self.assertNotIn('Content-Length', response.headers)
+		self.assertEqual(response.mimetype, 'application/json')
+		self.assertEqual(json.loads(response.data), [{'id': i} for i in range(200)])
+
+	def test_ndjson(self):
+		response = app.test_client().get('/tests/streaming/3', headers={'Accept': 'application/x-ndjson'})
+		self.assertEqual(response.mimetype, 'application/x-ndjson')
+		self.assertEqual(response.data, b'{"id":0}\n{"id":1}\n{"id":2}\n')
+
+	def test_empty(self):
+		self.assertEqual(app.test_client().get('/tests/streaming/0').get_json(), [])
+
+	def test_head_generates_nothing(self):
+		generated = StreamingHandler.generated
+		response = app.test_client().head('/tests/streaming/100')
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.data, b'')
+		self.assertEqual(StreamingHandler.generated, generated)
+
+	def test_chunks(self):
+		items = [{'id': i} for i in range(5)]
+		chunks = list(iter_json_array(iter(items), json.dumps, chunk_size=2))
+		self.assertEqual(len(chunks), 3) # Serialized a few items at a time
+		self.assertEqual(json.loads(b''.join(chunks)), items)
+		chunks = list(iter_ndjson(iter(items), json.dumps, chunk_size=2))
+		self.assertEqual(len(chunks), 3)
+		self.assertEqual([json.loads(line) for line in b''.join(chunks).splitlines()], items)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,63 @@
+import unittest, uuid
+from flask_rest.utils.throttle import LocalThrottleBackend, RedisThrottleBackend, RateLimitThrottle
+from fake_redis import get_test_redis
+
+class ThrottleBackendTests(object):
+
+	'''
+	Rate limiting checks every backend must pass with the same results (the shared backend runs its Lua scripts).
+	'''
+
+	def get_backend(self):
+		raise NotImplementedError
+
+	def test_token_bucket(self):
+		backend = self.get_backend()
+		checks = [backend.token_bucket('client', 3, 1.0, 1000.0) for i in range(4)] # Burst of 3, then throttled
+		checks.append(backend.token_bucket('client', 3, 1.0, 1001.5)) # 1.5 tokens refilled
+		checks.append(backend.token_bucket('client', 3, 1.0, 1001.5))
+		checks.append(backend.token_bucket('other', 3, 1.0, 1001.5)) # Keys are independent
+		self.assertEqual(checks, [(True, 2, 0), (True, 1, 0), (True, 0, 0), (False, 0, 1.0), (True, 0, 0), (False, 0, 0.5), (True, 2, 0)])
+
+	def test_sliding_window(self):
+		backend = self.get_backend()
+		checks = [backend.sliding_window('client', 2, 10.0, now) for now in (1000.0, 1001.0, 1002.0)]
+		checks.append(backend.sliding_window('client', 2, 10.0, 1010.5)) # The first request left the window
+		checks.append(backend.sliding_window('client', 2, 10.0, 1010.6))
+		expected = [(True, 1, 0), (True, 0, 0), (False, 0, 8.0), (True, 0, 0), (False, 0, 0.4)]
+		self.assertEqual(len(checks), len(expected))
+		for check, expected_check in zip(checks, expected):
+			self.assertEqual(check[:2], expected_check[:2])
+			self.assertAlmostEqual(check[2], expected_check[2], places=6)
+
+	def test_rate_limit_headers(self):
+		throttle = RateLimitThrottle(1, per=60.0, burst=2, backend=self.get_backend())
+		checks = [throttle.check('ExampleHandler', 'GET', auth_data_obj={'user_name': 'user'}) for i in range(3)]
+		self.assertEqual([is_throttled for is_throttled, headers in checks], [False, False, True])
+		self.assertEqual(checks[1][1]['X-RateLimit-Remaining'], '0')
+		self.assertEqual(checks[2][1]['Retry-After'], '60')
+		self.assertEqual(checks[2][1]['X-RateLimit-Limit'], '2')
+
+class LocalThrottleBackendTest(ThrottleBackendTests, unittest.TestCase):
+
+	def get_backend(self):
+		return LocalThrottleBackend()
+
+	def test_eviction(self):
+		backend = LocalThrottleBackend(lock_stripes=1, max_keys=2)
+		backend.token_bucket('a', 2, 1.0, 1000.0)
+		backend.token_bucket('a', 2, 1.0, 1000.0)
+		backend.token_bucket('b', 2, 1.0, 1000.0)
+		backend.token_bucket('a', 2, 1.0, 1000.0) # Most recently used, "b" is evicted next
+		self.assertEqual(backend.token_bucket('c', 2, 1.0, 1000.0), (True, 1, 0))
+		self.assertEqual(backend.token_bucket('a', 2, 1.0, 1000.0), (False, 0, 1.0)) # Kept, still empty
+		self.assertEqual(backend.token_bucket('b', 2, 1.0, 1000.0), (True, 1, 0)) # Evicted, starts over
+
+@unittest.skipIf(get_test_redis() is None, 'Needs a Redis server (FLASK_REST_TEST_REDIS_URL) or lupa to run the Lua scripts')
+class RedisThrottleBackendTest(ThrottleBackendTests, unittest.TestCase):
+
+	def get_backend(self):
+		return RedisThrottleBackend(get_test_redis(), key_prefix='test_throttle:%s:' % (uuid.uuid4().hex)) # Not sharing state with other runs
+
+if __name__ == '__main__':
+	unittest.main()